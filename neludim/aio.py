@@ -0,0 +1,18 @@
+
+import asyncio
+
+
+# asyncio.gather leaves siblings running when one fails. Here first
+# error cancels the rest and waits for them to finish, so no write
+# outlives the handler that started it. Results in argument order
+
+
+async def gather(*aws):
+    tasks = [asyncio.ensure_future(_) for _ in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+        raise
@@ -0,0 +1,192 @@
+# python -m neludim.bench.callbacks --updates 100000
+#
+# Callback query routing + data parsing, handlers are no op, only
+# parse data. Same data mix as user taps: edit profile, participate,
+# feedback, cancel, manual match. No Bot API, no DB, no middlewares
+#
+# dispatch         us/update  parse us
+# filters               38.2       2.4
+# router                 5.5       1.7
+#
+# filters = text/text_startswith filter per handler, aiogram checks
+# them one by one, fields() reflection per parse. router =
+# neludim.bot.handlers.QueryRouter, two dict lookups, parser per
+# Data class cached
+
+import sys
+import asyncio
+import argparse
+from time import perf_counter
+from dataclasses import fields
+from itertools import cycle, islice
+
+from aiogram.types import CallbackQuery
+
+from neludim.const import (
+    NAME_FIELD,
+    CITY_FIELD,
+    LINKS_FIELD,
+    ABOUT_FIELD,
+    CANCEL_EDIT_DATA,
+    CANCEL_FEEDBACK_DATA,
+    CONFIRM_STATE,
+    GREAT_SCORE,
+)
+from neludim.bot.bot import (
+    Bot,
+    Dispatcher,
+)
+from neludim.bot.data import (
+    EditProfileData,
+    ParticipateData,
+    FeedbackData,
+    ManualMatchData,
+    serialize_data,
+    deserialize_data,
+)
+from neludim.bot.handlers import QueryRouter
+
+
+DATA = [
+    serialize_data(EditProfileData()),
+    serialize_data(EditProfileData(NAME_FIELD)),
+    serialize_data(EditProfileData(ABOUT_FIELD)),
+    CANCEL_EDIT_DATA,
+    serialize_data(ParticipateData(120, agreed=1)),
+    serialize_data(FeedbackData(119, 113947584)),
+    serialize_data(FeedbackData(119, 113947584, CONFIRM_STATE, GREAT_SCORE)),
+    CANCEL_FEEDBACK_DATA,
+    serialize_data(ManualMatchData('confirm', 113947584, 5326213467)),
+]
+
+
+# neludim.bot.data.deserialize_data before parser cache
+
+
+def reflect_deserialize_data(data, cls):
+    _, *parts = data.split(':')
+    kwargs = {}
+    for field, part in zip(fields(cls), parts):
+        if not part:
+            value = None
+        else:
+            value = field.type(part)
+        kwargs[field.name] = value
+    return cls(**kwargs)
+
+
+def parse_handler(cls, deserialize):
+    async def handler(query):
+        return deserialize(query.data, cls)
+
+    return handler
+
+
+async def no_parse_handler(query):
+    pass
+
+
+def handler_specs(deserialize):
+    # (data or None, prefix or None, handler), same order as old
+    # setup_handlers
+    edit_profile = parse_handler(EditProfileData, deserialize)
+    return [
+        (serialize_data(EditProfileData()), None, edit_profile),
+        (serialize_data(EditProfileData(NAME_FIELD)), None, edit_profile),
+        (serialize_data(EditProfileData(CITY_FIELD)), None, edit_profile),
+        (serialize_data(EditProfileData(LINKS_FIELD)), None, edit_profile),
+        (serialize_data(EditProfileData(ABOUT_FIELD)), None, edit_profile),
+        (CANCEL_EDIT_DATA, None, no_parse_handler),
+        (None, ParticipateData.prefix, parse_handler(ParticipateData, deserialize)),
+        (None, FeedbackData.prefix, parse_handler(FeedbackData, deserialize)),
+        (CANCEL_FEEDBACK_DATA, None, no_parse_handler),
+        (None, ManualMatchData.prefix, parse_handler(ManualMatchData, deserialize)),
+    ]
+
+
+def filters_dispatcher():
+    dispatcher = Dispatcher(Bot('123:bench'))
+    for data, prefix, handler in handler_specs(reflect_deserialize_data):
+        if data:
+            dispatcher.register_callback_query_handler(handler, text=data)
+        else:
+            dispatcher.register_callback_query_handler(handler, text_startswith=prefix)
+    return dispatcher
+
+
+def router_dispatcher():
+    router = QueryRouter()
+    for data, prefix, handler in handler_specs(deserialize_data):
+        if data:
+            router.add_data(data, handler)
+        else:
+            router.add_prefix(prefix, handler)
+
+    dispatcher = Dispatcher(Bot('123:bench'))
+    dispatcher.register_callback_query_handler(router)
+    return dispatcher
+
+
+DISPATCHERS = {
+    'filters': (filters_dispatcher, reflect_deserialize_data),
+    'router': (router_dispatcher, deserialize_data),
+}
+
+
+def gen_queries(updates):
+    return [
+        CallbackQuery(id='1', chat_instance='1', data=data)
+        for data in islice(cycle(DATA), updates)
+    ]
+
+
+async def bench_dispatch(dispatcher, queries):
+    handlers = dispatcher.callback_query_handlers
+    start = perf_counter()
+    for query in queries:
+        await handlers.notify(query)
+    return (perf_counter() - start) / len(queries)
+
+
+def bench_parse(deserialize, updates):
+    pairs = [
+        (data, cls)
+        for data in DATA
+        for cls in (EditProfileData, ParticipateData, FeedbackData, ManualMatchData)
+        if data.startswith(cls.prefix + ':')
+    ]
+    pairs = list(islice(cycle(pairs), updates))
+
+    start = perf_counter()
+    for data, cls in pairs:
+        deserialize(data, cls)
+    return (perf_counter() - start) / len(pairs)
+
+
+async def main_async(args):
+    queries = gen_queries(args.updates)
+
+    print('dispatch         us/update  parse us')
+    for name in args.dispatchers:
+        init_dispatcher, deserialize = DISPATCHERS[name]
+        dispatcher = init_dispatcher()
+
+        # Warm up parser cache, aiogram handler spec cache
+        await bench_dispatch(dispatcher, queries[:len(DATA)])
+
+        dispatch_time = await bench_dispatch(dispatcher, queries)
+        parse_time = bench_parse(deserialize, args.updates)
+        print(f'{name:<16} {dispatch_time * 10 ** 6:>10.1f} {parse_time * 10 ** 6:>9.1f}', flush=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.callbacks')
+    parser.add_argument('--updates', type=int, default=100000)
+    parser.add_argument('--dispatchers', nargs='+', default=list(DISPATCHERS), choices=list(DISPATCHERS))
+    args = parser.parse_args(argv[1:])
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,176 @@
+# python -m neludim.bench.handlers --runs 200 --db-latency 0.01 --bot-latency 0.03
+#
+# Each DB primitive and Bot API call sleeps given latency, ~ YDB and
+# Telegram from YC function. Inline webhook reply is not counted
+#
+# Before neludim.aio.gather, each await in sequence
+# handler          p50 ms  p95 ms
+# edit_input         52.1    64.8
+# feedback           82.8    89.4
+# feedback_input    113.2   117.1
+#
+# Independent reads and final writes concurrent
+# edit_input         31.9    32.7
+# feedback           42.2    51.5
+# feedback_input     72.7    81.0
+#
+# Feedback with pair row: contacts and pair read together, contact and
+# pair put together, one partner contact re-read. Reply inline
+# edit_input         32.1    35.2
+# feedback           32.6    58.5
+# feedback_input     73.0    74.3
+
+import sys
+import json
+import logging
+import asyncio
+import argparse
+from time import perf_counter
+from statistics import quantiles
+
+from neludim.obj import (
+    User,
+    Contact,
+    Pair,
+)
+from neludim.log import log
+from neludim.const import CONFIRM_STATE
+from neludim.db_memory import MemoryDB
+from neludim.bot.data import (
+    EditProfileData,
+    FeedbackData,
+    serialize_data,
+)
+from neludim.tests.fake import (
+    FakeBot,
+    FakeContext,
+    fake_setup,
+    process_update,
+)
+
+
+DB_METHODS = [
+    'get_chat', 'put_chat',
+    'get_user', 'put_users',
+    'get_contact', 'put_contacts',
+    'get_pair', 'put_pairs',
+]
+
+
+class LatencyDB(MemoryDB):
+    latency = 0
+
+
+def latency_method(name):
+    method = getattr(MemoryDB, name)
+
+    async def wrapper(db, *args, **kwargs):
+        await asyncio.sleep(db.latency)
+        return await method(db, *args, **kwargs)
+
+    return wrapper
+
+
+for name in DB_METHODS:
+    setattr(LatencyDB, name, latency_method(name))
+
+
+class LatencyBot(FakeBot):
+    latency = 0
+
+    async def request(self, method, data, files=None):
+        await asyncio.sleep(self.latency)
+        return await FakeBot.request(self, method, data, files)
+
+
+USER = {'id': 1, 'is_bot': False, 'first_name': 'A', 'username': 'a'}
+CHAT = {'id': 1, 'type': 'private'}
+
+
+def message_update(text):
+    return {'message': {
+        'message_id': 2, 'from': USER, 'chat': CHAT,
+        'date': 1659800990, 'text': text
+    }}
+
+
+def query_update(data):
+    return {'callback_query': {
+        'id': '1', 'from': USER, 'chat_instance': '1', 'data': data,
+        'message': {'message_id': 1, 'chat': CHAT, 'date': 1664010458},
+    }}
+
+
+async def setup_edit_input(context):
+    await context.db.put_user(User(user_id=1))
+    await context.db.set_chat_state(1, serialize_data(EditProfileData('name')))
+    return message_update('Alexander Kukushkin')
+
+
+async def setup_feedback(context):
+    # Pair row is written by create_contacts, feedback refreshes it
+    await context.db.put_contacts([
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+    ])
+    await context.db.put_pair(Pair(1, 2, week_index=0))
+    return query_update(serialize_data(FeedbackData(0, 2, CONFIRM_STATE, 'great')))
+
+
+async def setup_feedback_input(context):
+    await context.db.put_users([User(user_id=1), User(user_id=2)])
+    await context.db.put_contact(Contact(week_index=0, user_id=1, partner_user_id=2))
+    await context.db.set_chat_state(1, serialize_data(FeedbackData(0, 2)))
+    return message_update('Все круто')
+
+
+SCENARIOS = {
+    'edit_input': setup_edit_input,
+    'feedback': setup_feedback,
+    'feedback_input': setup_feedback_input,
+}
+
+
+async def bench_scenario(setup, args):
+    times = []
+    for _ in range(args.runs):
+        context = FakeContext()
+        context.bot = LatencyBot()
+        context.db = LatencyDB()
+        fake_setup(context)
+
+        update = await setup(context)
+        context.bot.latency = args.bot_latency
+        context.db.latency = args.db_latency
+
+        start = perf_counter()
+        await process_update(context, json.dumps(update))
+        times.append(perf_counter() - start)
+
+    cuts = quantiles(times, n=20)
+    return cuts[9], cuts[18]
+
+
+async def main_async(args):
+    print('handler          p50 ms  p95 ms')
+    for name in args.scenarios:
+        p50, p95 = await bench_scenario(SCENARIOS[name], args)
+        print(f'{name:<16} {p50 * 1000:>6.1f}  {p95 * 1000:>6.1f}', flush=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.handlers')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--db-latency', type=float, default=0.01)
+    parser.add_argument('--bot-latency', type=float, default=0.03)
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args(argv[1:])
+
+    # Middleware logs every update
+    log.setLevel(logging.WARNING)
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
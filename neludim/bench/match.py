@@ -0,0 +1,157 @@
+# python -m neludim.bench.match --sizes 100 1000 10000 50000
+#
+#   size strategy     time  peak mb  matched  repeats
+#    100 flat         0.05      0.7       50        0
+#    100 city         0.01      0.1       50        0
+#   1000 flat        10.92     60.9      500        0
+#   1000 city         1.99      7.8      500        0
+#    ...
+#  50000 flat     skip 1.2e+09 pairs > --max-pairs 1.0e+07
+#  50000 city     skip 2.2e+08 pairs > --max-pairs 1.0e+07
+#
+# --snapshot DIR takes users and contacts from "neludim export", size
+# = first N users.
+#
+# Flat matcher is O(N^2) per round, 50k users = 1.25e9 pairs, list of
+# scored pairs alone takes ~100GB. Runs with more pairs than
+# --max-pairs are not started, row shows estimated pairs, so scale
+# point is still reported.
+
+import sys
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from neludim.match import (
+    STRATEGIES,
+    city_buckets,
+)
+from neludim.pair import (
+    gen_pairs,
+    select_pairs,
+)
+from neludim.const import (
+    USERS_TABLE,
+    CONTACTS_TABLE,
+)
+from neludim.snapshot import read_snapshot
+from neludim.quality import eval_matches
+
+from .synth import (
+    gen_users,
+    gen_contacts,
+)
+
+
+def flat_cost(users):
+    return len(users) ** 2 // 2
+
+
+def city_cost(users):
+    city_users = city_buckets(users)
+    leftover_users = city_users.pop(None, [])
+    return (
+        sum(len(_) ** 2 // 2 for _ in city_users.values())
+        + len(leftover_users) ** 2 // 2
+    )
+
+
+STRATEGY_COSTS = {
+    'flat': flat_cost,
+    'city': city_cost,
+}
+
+
+def run_strategy(strategy, users, pairs, current_week_index, rounds):
+    return list(strategy(
+        users,
+        pairs=pairs,
+        current_week_index=current_week_index,
+        rounds=rounds
+    ))
+
+
+# tracemalloc slows down allocations several times. Measure time
+# and peak memory in separate runs
+
+
+def bench_strategy(strategy, users, pairs, current_week_index, rounds, memory=True):
+    start = perf_counter()
+    matches = run_strategy(strategy, users, pairs, current_week_index, rounds)
+    time = perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        run_strategy(strategy, users, pairs, current_week_index, rounds)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    quality = eval_matches(matches, users, pairs)
+    return dict(
+        time=time,
+        peak=peak,
+        matched=quality.pairs,
+        repeats=quality.repeats,
+    )
+
+
+def format_skip_row(size, name, cost, max_pairs):
+    return f'{size:>6} {name:<8} skip {cost:.1e} pairs > --max-pairs {max_pairs:.1e}'
+
+
+def format_row(size, name, row):
+
+    peak = '-'
+    if row['peak'] is not None:
+        peak = f'{row["peak"] / 2**20:.1f}'
+
+    return (
+        f'{size:>6} {name:<8} '
+        f'{row["time"]:>8.2f} {peak:>8} '
+        f'{row["matched"]:>8} {row["repeats"]:>8}'
+    )
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.match')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--weeks', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--max-pairs', type=int, default=10 ** 7)
+    parser.add_argument('--no-memory', dest='memory', action='store_false')
+    parser.add_argument('--snapshot', help='dir from "neludim export"')
+    args = parser.parse_args(argv[1:])
+
+    if args.snapshot:
+        snapshot_users = list(read_snapshot(args.snapshot, USERS_TABLE))
+        snapshot_pairs = gen_pairs(read_snapshot(args.snapshot, CONTACTS_TABLE))
+
+    print('  size strategy     time  peak mb  matched  repeats')
+    for size in args.sizes:
+        if args.snapshot:
+            users = snapshot_users[:size]
+            pairs = list(select_pairs(snapshot_pairs, [_.user_id for _ in users]))
+        else:
+            users = list(gen_users(size))
+            contacts = gen_contacts(users, args.weeks)
+            pairs = gen_pairs(contacts)
+
+        for name in args.strategies:
+            cost = STRATEGY_COSTS[name](users)
+            if cost > args.max_pairs:
+                print(format_skip_row(size, name, cost, args.max_pairs), flush=True)
+                continue
+
+            row = bench_strategy(
+                STRATEGIES[name], users, pairs,
+                current_week_index=args.weeks,
+                rounds=args.rounds,
+                memory=args.memory
+            )
+            print(format_row(size, name, row), flush=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
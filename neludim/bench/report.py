@@ -0,0 +1,127 @@
+# python -m neludim.bench.report --weeks 500 --users 500
+# python -m neludim.bench.report --snapshot data/snapshot
+#
+# 100100 contacts, 500 weeks
+# report         time  peak mb
+# weeks          0.17      1.5
+# weeks_pd       0.55     37.1
+# weeks_df       0.20     33.3
+# match          0.05      4.9
+# match_pd       0.07     10.0
+
+import sys
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from neludim.const import CONTACTS_TABLE
+from neludim.snapshot import read_snapshot
+from neludim.report import (
+    gen_weeks_report,
+    gen_match_report,
+)
+
+from .synth import (
+    gen_users,
+    gen_contacts,
+)
+
+
+# Report = (prepare, run). Only run is timed. Pandas "frame" reports
+# build DataFrame in prepare, measure groupby ops only
+
+
+def no_prepare(contacts):
+    return contacts
+
+
+def last_week_contacts(contacts):
+    week_index = max(_.week_index for _ in contacts)
+    week_contacts = [_ for _ in contacts if _.week_index == week_index]
+    prev_contacts = [_ for _ in contacts if _.week_index < week_index]
+    return week_contacts, prev_contacts
+
+
+def run_weeks_report(contacts):
+    return list(gen_weeks_report(contacts))
+
+
+def run_match_report(contacts):
+    week_contacts, prev_contacts = last_week_contacts(contacts)
+    return list(gen_match_report(week_contacts, prev_contacts, manual_matches=()))
+
+
+def run_weeks_report_pandas(contacts):
+    from neludim import report_pandas
+
+    return list(report_pandas.gen_weeks_report(contacts))
+
+
+def run_match_report_pandas(contacts):
+    from neludim import report_pandas
+
+    week_contacts, prev_contacts = last_week_contacts(contacts)
+    return list(report_pandas.gen_match_report(week_contacts, prev_contacts, manual_matches=()))
+
+
+def prepare_frame(contacts):
+    from neludim import report_pandas
+
+    return report_pandas.contacts_frame(contacts)
+
+
+def run_frame_weeks_report(df):
+    from neludim import report_pandas
+
+    return list(report_pandas.gen_frame_weeks_report(df))
+
+
+REPORTS = {
+    'weeks': (no_prepare, run_weeks_report),
+    'weeks_pd': (no_prepare, run_weeks_report_pandas),
+    'weeks_df': (prepare_frame, run_frame_weeks_report),
+    'match': (no_prepare, run_match_report),
+    'match_pd': (no_prepare, run_match_report_pandas),
+}
+
+
+def bench_report(report, contacts):
+    prepare, run = report
+    data = prepare(contacts)
+
+    start = perf_counter()
+    run(data)
+    time = perf_counter() - start
+
+    tracemalloc.start()
+    run(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return time, peak
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.report')
+    parser.add_argument('--weeks', type=int, default=500)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--reports', nargs='+', default=list(REPORTS), choices=list(REPORTS))
+    parser.add_argument('--snapshot', help='dir from "neludim export", overrides --weeks --users')
+    args = parser.parse_args(argv[1:])
+
+    if args.snapshot:
+        contacts = list(read_snapshot(args.snapshot, CONTACTS_TABLE))
+    else:
+        users = list(gen_users(args.users))
+        contacts = list(gen_contacts(users, args.weeks))
+    weeks = len({_.week_index for _ in contacts})
+    print(f'{len(contacts)} contacts, {weeks} weeks')
+
+    print('report         time  peak mb')
+    for name in args.reports:
+        time, peak = bench_report(REPORTS[name], contacts)
+        print(f'{name:<8} {time:>10.2f} {peak / 2**20:>8.1f}', flush=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,47 @@
+# python -m neludim.bench.startup --runs 10
+#
+# Median of 20 runs, includes DB client creation. Noisy, +-100ms
+# between runs of same code
+#
+# command          wall ms  import ms  modules  handlers
+# bot-webhook          734        470      716      True
+# trigger-webhook      577        401      713     False
+#
+# DB_BACKEND=memory, no botocore
+# bot-webhook          399        303      510      True
+# trigger-webhook      364        297      507     False
+
+import sys
+import argparse
+from statistics import median
+
+from neludim.startup import (
+    STARTUP_CODE,
+    profile_startup,
+    loaded_modules,
+)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.startup')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--commands', nargs='+', default=list(STARTUP_CODE), choices=list(STARTUP_CODE))
+    args = parser.parse_args(argv[1:])
+
+    print('command          wall ms  import ms  modules  handlers')
+    for command in args.commands:
+        profiles = [profile_startup(command) for _ in range(args.runs)]
+        wall = median(_.wall for _ in profiles)
+        imports = median(sum(__.self_us for __ in _.records) for _ in profiles)
+
+        profile = profiles[-1]
+        handlers = bool(loaded_modules(profile, 'neludim.bot.handlers'))
+        print(
+            f'{command:<16} {wall * 1000:>7.0f} {imports / 1000:>10.0f} '
+            f'{len(profile.records):>8} {handlers!s:>9}',
+            flush=True
+        )
+
+
+if __name__ == '__main__':
+    main(sys.argv)
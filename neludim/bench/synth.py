@@ -0,0 +1,100 @@
+# Synthetic population for benchmarks. Cities skewed like real
+# participants: half from Moscow and Petersburg, long tail of
+# others, some without city, some typed in lower case. Half of users
+# fill about/links. History: every week random share of users
+# participates, random pairs, confirm/fail states, feedback.
+
+import random
+
+from neludim.obj import (
+    User,
+    Contact
+)
+from neludim.city import CITIES
+from neludim.const import (
+    CONFIRM_STATE,
+    FAIL_STATE,
+
+    GREAT_SCORE,
+    OK_SCORE,
+    BAD_SCORE,
+)
+
+
+TOP_CITIES = ['Москва', 'Санкт-Петербург']
+TAIL_CITIES = [_ for _ in CITIES if _ not in TOP_CITIES]
+
+TAIL_WEIGHTS = [1 / (_ + 1) for _ in range(len(TAIL_CITIES))]
+CITY_WEIGHTS = [0.35, 0.15] + [
+    0.35 * _ / sum(TAIL_WEIGHTS)
+    for _ in TAIL_WEIGHTS
+]
+NO_CITY_SHARE = 0.15
+LOWER_CITY_SHARE = 0.05
+
+ABOUT_SHARE = 0.5
+LINKS_SHARE = 0.3
+
+PARTICIPATE_SHARE = 0.4
+STATES = [CONFIRM_STATE, FAIL_STATE, None]
+STATE_WEIGHTS = [0.6, 0.2, 0.2]
+FEEDBACK_SCORES = [GREAT_SCORE, OK_SCORE, BAD_SCORE, None]
+FEEDBACK_SCORE_WEIGHTS = [0.5, 0.25, 0.05, 0.2]
+
+
+def gen_city(rand):
+    if rand.random() < NO_CITY_SHARE:
+        return
+
+    city, = rand.choices(TOP_CITIES + TAIL_CITIES, weights=CITY_WEIGHTS)
+    if rand.random() < LOWER_CITY_SHARE:
+        city = city.lower()
+    return city
+
+
+def gen_users(size, seed=0):
+    rand = random.Random(seed)
+    for user_id in range(1, size + 1):
+        yield User(
+            user_id=user_id,
+            username=f'user{user_id}',
+            name=f'User {user_id}',
+            city=gen_city(rand),
+            about='about' if rand.random() < ABOUT_SHARE else None,
+            links='links' if rand.random() < LINKS_SHARE else None,
+        )
+
+
+def gen_week_contacts(rand, user_ids, week_index):
+    user_ids = [_ for _ in user_ids if rand.random() < PARTICIPATE_SHARE]
+    rand.shuffle(user_ids)
+
+    if len(user_ids) % 2:
+        user_id = user_ids.pop()
+        yield Contact(week_index, user_id)
+
+    for index in range(0, len(user_ids), 2):
+        user_id, partner_user_id = user_ids[index], user_ids[index + 1]
+        state, = rand.choices(STATES, weights=STATE_WEIGHTS)
+        for user_id, partner_user_id in [
+                (user_id, partner_user_id),
+                (partner_user_id, user_id)
+        ]:
+            feedback_score = None
+            if state == CONFIRM_STATE:
+                feedback_score, = rand.choices(
+                    FEEDBACK_SCORES,
+                    weights=FEEDBACK_SCORE_WEIGHTS
+                )
+            yield Contact(
+                week_index, user_id, partner_user_id,
+                state=state,
+                feedback_score=feedback_score
+            )
+
+
+def gen_contacts(users, weeks, seed=0):
+    rand = random.Random(seed)
+    user_ids = [_.user_id for _ in users]
+    for week_index in range(weeks):
+        yield from gen_week_contacts(rand, user_ids, week_index)
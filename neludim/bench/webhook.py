@@ -0,0 +1,301 @@
+# python -m neludim.bench.webhook --users 500 --rate 200 --concurrency 16
+#
+# Real webhook app (neludim.bot.webhook.build_app) in process, DB and
+# Bot API calls sleep --db-latency --bot-latency as in
+# neludim.bench.handlers. Client runs in same event loop, loop lag
+# includes client. --replay FILE, Telegram update JSON per line,
+# updates of one chat are sent in order, --snapshot DIR from "neludim
+# export" to fill DB for them
+#
+# Each user: /start, edit name, participate, feedback + text, free text
+#
+# --users 500 = 3500 updates, --db-latency 0.01 --bot-latency 0.03
+#
+# rate  conc  updates  time  upd/s  p50 ms  p95 ms  p99 ms  max ms  lag p50 ms  lag p99 ms  errors
+#    0     1     3500 174.6     20    43.4   116.7   117.5   120.9         0.5         2.1       0
+#    0    16     3500  11.7    299    44.3   117.6   120.4   125.2         0.7         3.3       0
+#  200    16     3500  17.7    198    43.2   116.9   118.0   129.0         0.6         1.7       0
+#  400    16     3500  11.9    295    44.9   118.2   120.3   125.5         0.8         3.6       0
+#
+# Latency is DB + Bot API round trips, p95 = participate (sticker +
+# 2 messages). 16 slots saturate at ~300 upd/s = 16 / mean latency,
+# loop is idle
+
+import sys
+import json
+import random
+import asyncio
+import logging
+import argparse
+from time import perf_counter
+from statistics import quantiles
+from itertools import count
+
+from aiohttp import (
+    web,
+    ClientSession,
+    TCPConnector,
+)
+
+from neludim.obj import (
+    User,
+    Contact,
+)
+from neludim.log import log
+from neludim.const import (
+    NAME_FIELD,
+    CONFIRM_STATE,
+    GREAT_SCORE,
+)
+from neludim.context import Context
+from neludim.schedule import Schedule
+from neludim.bot.bot import (
+    Dispatcher,
+    setup_bot,
+)
+from neludim.bot.broadcast import Broadcast
+from neludim.db_memory import load_memory_snapshot
+from neludim.bot.webhook import build_app
+from neludim.bot.data import (
+    EditProfileData,
+    ParticipateData,
+    FeedbackData,
+    serialize_data,
+)
+
+from .handlers import (
+    LatencyBot,
+    LatencyDB,
+)
+
+
+class LoadContext(Context):
+    def __init__(self, db_latency, bot_latency):
+        Context.__init__(self)
+        self.bot = LatencyBot()
+        self.bot.latency = bot_latency
+        self.dispatcher = Dispatcher(self.bot)
+        self.broadcast = Broadcast(self.bot)
+        self.db = LatencyDB()
+        self.db.latency = db_latency
+        self.schedule = Schedule()
+
+
+######
+#
+#   UPDATES
+#
+#####
+
+
+def tg_user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': 'User', 'username': f'user{user_id}'}
+
+
+def tg_chat(user_id):
+    return {'id': user_id, 'type': 'private'}
+
+
+def message_update(user_id, text):
+    return {'message': {
+        'message_id': 1, 'date': 1659800990, 'text': text,
+        'from': tg_user(user_id), 'chat': tg_chat(user_id),
+    }}
+
+
+def query_update(user_id, data):
+    return {'callback_query': {
+        'id': str(user_id), 'chat_instance': '1', 'data': data,
+        'from': tg_user(user_id),
+        'message': {'message_id': 1, 'date': 1664010458, 'chat': tg_chat(user_id)},
+    }}
+
+
+# Pairs 1-2, 3-4, ... Telegram ids > 0, Contact.key treats partner 0
+# as no partner
+
+
+def partner_user_id(user_id):
+    if user_id % 2:
+        return user_id + 1
+    return user_id - 1
+
+
+def gen_user_ids(users):
+    return range(1, users // 2 * 2 + 1)
+
+
+def gen_user_updates(user_id, current_week_index):
+    feedback = FeedbackData(
+        current_week_index - 1, partner_user_id(user_id),
+        CONFIRM_STATE, GREAT_SCORE
+    )
+    return [
+        message_update(user_id, '/start'),
+        query_update(user_id, serialize_data(EditProfileData(NAME_FIELD))),
+        message_update(user_id, 'Alexander Kukushkin'),
+        query_update(user_id, serialize_data(ParticipateData(current_week_index + 1, agreed=1))),
+        query_update(user_id, serialize_data(feedback)),
+        message_update(user_id, 'Все круто'),
+        message_update(user_id, 'Привет'),
+    ]
+
+
+async def seed_db(db, users, current_week_index):
+    await db.put_users([
+        User(user_id=_, name='User', username=f'user{_}')
+        for _ in gen_user_ids(users)
+    ])
+    await db.put_contacts([
+        Contact(current_week_index - 1, _, partner_user_id(_))
+        for _ in gen_user_ids(users)
+    ])
+
+
+def read_replay(path):
+    chat_updates = {}
+    with open(path) as file:
+        for line in file:
+            update = json.loads(line)
+            for key in ('message', 'callback_query'):
+                if key in update:
+                    chat_id = update[key]['from']['id']
+            chat_updates.setdefault(chat_id, []).append(update)
+    return list(chat_updates.values())
+
+
+#######
+#
+#   LOAD
+#
+####
+
+
+class Pacer:
+    def __init__(self, rate):
+        self.rate = rate
+        self.start = perf_counter()
+        self.index = count()
+
+    async def wait(self):
+        if not self.rate:
+            return
+
+        delay = self.start + next(self.index) / self.rate - perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def sample_loop_lag(lags, interval=0.01):
+    while True:
+        start = perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(perf_counter() - start - interval)
+
+
+async def worker(session, url, sequences, pacer, update_ids, latencies, errors):
+    for sequence in sequences:
+        for update in sequence:
+            await pacer.wait()
+
+            start = perf_counter()
+            data = dict(update, update_id=next(update_ids))
+            async with session.post(url, json=data) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            latencies.append(perf_counter() - start)
+
+
+async def run_load(url, sequences, args):
+    latencies, errors, lags = [], [], []
+    pacer = Pacer(args.rate)
+    update_ids = count(1)
+
+    # Shared iterator, worker takes next user when done with previous
+    sequences = iter(sequences)
+
+    lag_task = asyncio.create_task(sample_loop_lag(lags))
+    connector = TCPConnector(limit=args.concurrency)
+    async with ClientSession(connector=connector) as session:
+        start = perf_counter()
+        await asyncio.gather(*[
+            worker(session, url, sequences, pacer, update_ids, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        time = perf_counter() - start
+    lag_task.cancel()
+
+    return time, latencies, errors, lags
+
+
+def format_load(time, latencies, errors, lags):
+    cuts = quantiles(latencies, n=100, method='inclusive')
+    lag_cuts = quantiles(lags, n=100, method='inclusive')
+    yield 'updates  time  upd/s  p50 ms  p95 ms  p99 ms  max ms  lag p50 ms  lag p99 ms  errors'
+    yield (
+        f'{len(latencies):>7} {time:>5.1f} {len(latencies) / time:>6.0f}'
+        f' {cuts[49] * 1000:>7.1f} {cuts[94] * 1000:>7.1f} {cuts[98] * 1000:>7.1f}'
+        f' {max(latencies) * 1000:>7.1f} {lag_cuts[49] * 1000:>11.1f} {lag_cuts[98] * 1000:>11.1f}'
+        f' {len(errors):>7}'
+    )
+
+
+async def main_async(args):
+    context = LoadContext(args.db_latency, args.bot_latency)
+    current_week_index = context.schedule.current_week_index()
+    setup_bot(context)
+
+    runner = web.AppRunner(build_app(context))
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', args.port)
+    await site.start()
+
+    if args.replay:
+        if args.snapshot:
+            load_memory_snapshot(context.db, args.snapshot)
+        sequences = read_replay(args.replay)
+    else:
+        # Latency applies to load only
+        latency = context.db.latency
+        context.db.latency = 0
+        await seed_db(context.db, args.users, current_week_index)
+        context.db.latency = latency
+
+        user_ids = list(gen_user_ids(args.users))
+        random.Random(args.seed).shuffle(user_ids)
+        sequences = [
+            gen_user_updates(_, current_week_index)
+            for _ in user_ids
+        ]
+
+    try:
+        result = await run_load(f'http://localhost:{args.port}/', sequences, args)
+    finally:
+        await runner.cleanup()
+
+    for line in format_load(*result):
+        print(line)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='neludim.bench.webhook')
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--replay', help='Telegram update JSON per line')
+    parser.add_argument('--snapshot', help='DB for --replay, dir from "neludim export"')
+    parser.add_argument('--rate', type=float, default=200, help='updates per second, 0 = no limit')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--db-latency', type=float, default=0.01)
+    parser.add_argument('--bot-latency', type=float, default=0.03)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv[1:])
+
+    # Middlewares log every update
+    log.setLevel(logging.WARNING)
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
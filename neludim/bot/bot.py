@@ -6,10 +6,6 @@ from aiogram.types import ParseMode
 
 from neludim.const import BOT_TOKEN
 
-from .middlewares import setup_middlewares
-from .filters import setup_filters
-from .handlers import setup_handlers
-
 
 def init_bot():
     return Bot(
@@ -19,7 +15,15 @@ def init_bot():
     )
 
 
+# Handlers are imported on setup, trigger uses Bot, does not need
+# them on cold start
+
+
 def setup_bot(context):
+    from .middlewares import setup_middlewares
+    from .filters import setup_filters
+    from .handlers import setup_handlers
+
     setup_middlewares(context)
     setup_filters(context)
     setup_handlers(context)
@@ -4,6 +4,11 @@ from dataclasses import dataclass
 
 from aiogram import exceptions
 
+from neludim.metrics import (
+    BROADCAST_SENDS,
+    BROADCAST_ERRORS,
+)
+
 
 @dataclass
 class BroadcastResult:
@@ -13,6 +18,11 @@ class BroadcastResult:
 
 
 class Broadcast:
+    # https://habr.com/ru/post/543676/
+    # Не больше одного сообщения в секунду в один чат,
+    # Не больше 30 сообщений в секунду вообще
+    delay = 1 / 30
+
     def __init__(self, bot):
         self.bot = bot
         self.reset()
@@ -20,14 +30,11 @@ class Broadcast:
     def reset(self):
         self.results = []
 
-    async def send_message(self, chat_id, text, reply_markup=None):
+    async def send(self, method, chat_id, **kwargs):
         # https://github.com/aiogram/aiogram/blob/dev-2.x/examples/broadcast_example.py
+        BROADCAST_SENDS.inc(method=method.__name__)
         try:
-            message = await self.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                reply_markup=reply_markup
-            )
+            message = await method(chat_id=chat_id, **kwargs)
             result = BroadcastResult(
                 chat_id=chat_id,
                 message_id=message.message_id,
@@ -38,9 +45,13 @@ class Broadcast:
                 chat_id=chat_id,
                 error=error.__class__.__name__
             )
+            BROADCAST_ERRORS.inc(error=result.error)
         self.results.append(result)
+        await asyncio.sleep(self.delay)
 
-        # https://habr.com/ru/post/543676/
-        # Не больше одного сообщения в секунду в один чат,
-        # Не больше 30 сообщений в секунду вообще
-        await asyncio.sleep(1 / 30)
+    async def send_message(self, chat_id, text, reply_markup=None):
+        await self.send(
+            self.bot.send_message, chat_id,
+            text=text,
+            reply_markup=reply_markup
+        )
@@ -1,4 +1,5 @@
 
+from functools import lru_cache
 from dataclasses import (
     dataclass,
     fields
@@ -46,16 +47,20 @@ class ManualMatchData:
     partner_user_id: int = None
 
 
-def obj_annots(obj):
+# fields() reflection once per class, not per callback query
+
+
+@lru_cache(maxsize=None)
+def data_annots(cls):
     return [
         (_.name, _.type)
-        for _ in fields(obj)
+        for _ in fields(cls)
     ]
 
 
 def serialize_data(obj):
     parts = [obj.prefix]
-    for name, _ in obj_annots(obj):
+    for name, _ in data_annots(type(obj)):
         value = getattr(obj, name)
         if value is None:
             part = ''
@@ -65,15 +70,24 @@ def serialize_data(obj):
     return ':'.join(parts)
 
 
+@lru_cache(maxsize=None)
+def data_parser(cls):
+    types = [type for _, type in data_annots(cls)]
+
+    def parse(data):
+        _, *parts = data.split(':')
+        return cls(*[
+            type(part) if part else None
+            for type, part in zip(types, parts)
+        ])
+
+    return parse
+
+
 def deserialize_data(data, cls):
-    prefix, *parts = data.split(':')
+    return data_parser(cls)(data)
 
-    kwargs = {}
-    annots = obj_annots(cls)
-    for part, (name, type) in zip(parts, annots):
-        if not part:
-            value = None
-        else:
-            value = type(part)
-        kwargs[name] = value
-    return cls(**kwargs)
+
+def data_prefix(data):
+    prefix, _, _ = data.partition(':')
+    return prefix
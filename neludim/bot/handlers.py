@@ -1,5 +1,6 @@
 
 import random
+import asyncio
 from functools import partial
 
 from aiogram.types import (
@@ -7,6 +8,10 @@ from aiogram.types import (
     InlineKeyboardButton,
 )
 from aiogram.utils import exceptions
+from aiogram.dispatcher.webhook import (
+    SendMessage,
+    EditMessageText,
+)
 
 from neludim.const import (
     ADMIN_USER_ID,
@@ -42,6 +47,11 @@ from neludim.city import (
     norm_city
 )
 from neludim.welcome import WELCOME
+from neludim.log import (
+    log,
+    json_msg,
+)
+from neludim.aio import gather
 from neludim.text import (
     EMPTY_SYMBOL,
     user_mention,
@@ -53,10 +63,15 @@ from neludim.obj import (
     Match
 )
 from neludim.schedule import week_index
+from neludim.pair import (
+    sort2,
+    gen_pairs,
+)
 
 from .data import (
     serialize_data,
     deserialize_data,
+    data_prefix,
     EditProfileData,
     ParticipateData,
     FeedbackData,
@@ -108,7 +123,8 @@ async def handle_start(context, message):
         )
         await context.db.put_user(user)
 
-    await message.answer(
+    return SendMessage(
+        chat_id=message.chat.id,
         text=start_text(context),
         reply_markup=START_MARKUP
     )
@@ -142,9 +158,9 @@ EDIT_PROFILE_MARKUP = InlineKeyboardMarkup(row_width=2).add(
 
 
 async def handle_edit_profile(context, query):
-    await query.answer()
     user = await context.db.get_user(query.from_user.id)
-    await query.message.answer(
+    return SendMessage(
+        chat_id=query.message.chat.id,
         text=profile_text(user),
         reply_markup=EDIT_PROFILE_MARKUP
     )
@@ -168,15 +184,15 @@ CANCEL_EDIT_MARKUP = InlineKeyboardMarkup().add(
 
 
 async def handle_edit_name(context, query):
-    await query.answer()
-    await query.message.answer(
-        text=EDIT_NAME_TEXT,
-        reply_markup=CANCEL_EDIT_MARKUP
-    )
     await context.db.set_chat_state(
         query.message.chat.id,
         state=serialize_data(EditProfileData(NAME_FIELD))
     )
+    return SendMessage(
+        chat_id=query.message.chat.id,
+        text=EDIT_NAME_TEXT,
+        reply_markup=CANCEL_EDIT_MARKUP
+    )
 
 
 ######
@@ -192,15 +208,15 @@ EDIT_CITY_TEXT = '''Напиши город, в котором живёшь. С
 
 
 async def handle_edit_city(context, query):
-    await query.answer()
-    await query.message.answer(
-        text=EDIT_CITY_TEXT,
-        reply_markup=CANCEL_EDIT_MARKUP
-    )
     await context.db.set_chat_state(
         query.message.chat.id,
         serialize_data(EditProfileData(CITY_FIELD))
     )
+    return SendMessage(
+        chat_id=query.message.chat.id,
+        text=EDIT_CITY_TEXT,
+        reply_markup=CANCEL_EDIT_MARKUP
+    )
 
 
 #######
@@ -219,15 +235,15 @@ EDIT_LINKS_TEXT = '''Накидай ссылок про себя: блог, тв
 
 
 async def handle_edit_links(context, query):
-    await query.answer()
-    await query.message.answer(
-        text=EDIT_LINKS_TEXT,
-        reply_markup=CANCEL_EDIT_MARKUP
-    )
     await context.db.set_chat_state(
         query.message.chat.id,
         serialize_data(EditProfileData(LINKS_FIELD))
     )
+    return SendMessage(
+        chat_id=query.message.chat.id,
+        text=EDIT_LINKS_TEXT,
+        reply_markup=CANCEL_EDIT_MARKUP
+    )
 
 
 ######
@@ -256,15 +272,15 @@ EDIT_ABOUT_TEXT = '''Напиши о себе. Собеседник поймёт
 
 
 async def handle_edit_about(context, query):
-    await query.answer()
-    await query.message.answer(
-        text=EDIT_ABOUT_TEXT,
-        reply_markup=CANCEL_EDIT_MARKUP
-    )
     await context.db.set_chat_state(
         query.message.chat.id,
         serialize_data(EditProfileData(ABOUT_FIELD))
     )
+    return SendMessage(
+        chat_id=query.message.chat.id,
+        text=EDIT_ABOUT_TEXT,
+        reply_markup=CANCEL_EDIT_MARKUP
+    )
 
 
 ########
@@ -287,8 +303,10 @@ def warn_city_text(city, cities=CITIES):
 
 
 async def handle_edit_input(context, message):
-    user = await context.db.get_user(message.from_user.id)
-    state = await context.db.get_chat_state(message.chat.id)
+    user, state = await gather(
+        context.db.get_user(message.from_user.id),
+        context.db.get_chat_state(message.chat.id)
+    )
     data = deserialize_data(state, EditProfileData)
 
     if data.field == NAME_FIELD:
@@ -301,16 +319,30 @@ async def handle_edit_input(context, message):
         user.about = message.text
 
     user.updated_profile = context.schedule.now()
-    await context.db.put_user(user)
+    writes = [
+        context.db.put_user(user),
+        context.db.reset_chat_state(message.chat.id),
+    ]
+
+    if data.field == CITY_FIELD and user.city not in CITIES:
+        await gather(
+            *writes,
+            message.answer(
+                text=profile_text(user),
+                reply_markup=EDIT_PROFILE_MARKUP
+            )
+        )
+        return SendMessage(
+            chat_id=message.chat.id,
+            text=warn_city_text(user.city, CITIES)
+        )
 
-    await message.answer(
+    await gather(*writes)
+    return SendMessage(
+        chat_id=message.chat.id,
         text=profile_text(user),
         reply_markup=EDIT_PROFILE_MARKUP
     )
-    await context.db.reset_chat_state(message.chat.id)
-
-    if data.field == CITY_FIELD and user.city not in CITIES:
-        await message.answer(text=warn_city_text(user.city, CITIES))
 
 
 ########
@@ -329,7 +361,6 @@ async def safe_delete(message):
 
 
 async def handle_cancel_edit(context, query):
-    await query.answer()
     await safe_delete(query.message)
     await context.db.reset_chat_state(query.message.chat.id)
 
@@ -378,29 +409,27 @@ NO_ABOUT_MARKUP = InlineKeyboardMarkup().add(
 
 async def handle_participate(context, query):
     data = deserialize_data(query.data, ParticipateData)
-    await query.answer()
 
     current_week_index = context.schedule.current_week_index()
     user = await context.db.get_user(query.from_user.id)
 
+    chat_id = query.message.chat.id
     if not data.agreed:
         user.agreed_participate = None
         await context.db.put_user(user)
 
-        await query.message.answer(text=NO_PARTICIPATE_TEXT)
-        return
+        return SendMessage(chat_id=chat_id, text=NO_PARTICIPATE_TEXT)
 
     if data.week_index != current_week_index + 1:
-        await query.message.answer(text=LATE_PARTICIPATE_TEXT)
-        return
+        return SendMessage(chat_id=chat_id, text=LATE_PARTICIPATE_TEXT)
 
     user.username = query.from_user.username
     if not user.username:
-        await query.message.answer(
+        return SendMessage(
+            chat_id=chat_id,
             text=NO_USERNAME_TEXT,
             reply_markup=no_username_markup(data.week_index)
         )
-        return
 
     user.agreed_participate = context.schedule.now()
     await context.db.put_user(user)
@@ -408,15 +437,20 @@ async def handle_participate(context, query):
     await query.message.reply_sticker(
         sticker=random.choice(HAPPY_STICKERS)
     )
+    if user.links or user.about:
+        return SendMessage(
+            chat_id=chat_id,
+            text=participate_text(context)
+        )
+
     await query.message.answer(
         text=participate_text(context)
     )
-
-    if not user.links and not user.about:
-        await query.message.answer(
-            text=NO_ABOUT_TEXT,
-            reply_markup=NO_ABOUT_MARKUP
-        )
+    return SendMessage(
+        chat_id=chat_id,
+        text=NO_ABOUT_TEXT,
+        reply_markup=NO_ABOUT_MARKUP
+    )
 
 
 ######
@@ -472,20 +506,58 @@ def admin_feedback_text(user, partner_user, contact):
 {contact.feedback_text}'''
 
 
+# Pair row last week part = f(contacts of both partners). Partners
+# may answer at same time, each puts own contact and pair, then
+# re-reads partner contact once. Puts are done before re-read, so at
+# least one of two sees other contact and puts pair last with both
+# answers. No stored pair = pairs table not backfilled, row is left
+# to rebuild-pairs
+
+
+def partner_contact_key(key):
+    week_index, user_id, partner_user_id = key
+    return week_index, partner_user_id, user_id
+
+
+def feedback_pair(pair, contacts):
+    pairs = gen_pairs([_ for _ in contacts if _], [pair])
+    return pairs[0]
+
+
+async def put_feedback_contact(db, contact, partner_contact, pair):
+    # Pair met again later, feedback on old contact does not change
+    # pair row
+    if not pair or pair.week_index > contact.week_index:
+        await db.put_contact(contact)
+        return
+
+    await gather(
+        db.put_contact(contact),
+        db.put_pair(feedback_pair(pair, [contact, partner_contact]))
+    )
+
+    recheck_contact = await db.get_contact(partner_contact_key(contact.key))
+    if recheck_contact != partner_contact:
+        await db.put_pair(feedback_pair(pair, [contact, recheck_contact]))
+
+
 async def handle_feedback(context, query):
     data = deserialize_data(query.data, FeedbackData)
-    await query.answer()
 
     key = (
         data.week_index,
         query.from_user.id,
         data.partner_user_id
     )
-    contact = await context.db.get_contact(key)
+    contact, partner_contact, pair = await gather(
+        context.db.get_contact(key),
+        context.db.get_contact(partner_contact_key(key)),
+        context.db.get_pair(sort2(query.from_user.id, data.partner_user_id))
+    )
+
     contact.state = data.state
     if contact.state == CONFIRM_STATE:
         contact.feedback_score = data.feedback_score
-    await context.db.put_contact(contact)
 
     if contact.state == FAIL_STATE:
         text = FAIL_FEEDBACK_TEXT
@@ -494,25 +566,29 @@ async def handle_feedback(context, query):
     else:
         text = FEEDBACK_TEXT
 
-    await query.message.answer(
+    await gather(
+        put_feedback_contact(context.db, contact, partner_contact, pair),
+        context.db.set_chat_state(
+            query.message.chat.id,
+            serialize_data(FeedbackData(
+                data.week_index,
+                data.partner_user_id
+            ))
+        )
+    )
+    return SendMessage(
+        chat_id=query.message.chat.id,
         text=text,
         reply_markup=CANCEL_FEEDBACK_MARKUP
     )
-    await context.db.set_chat_state(
-        query.message.chat.id,
-        serialize_data(FeedbackData(
-            data.week_index,
-            data.partner_user_id
-        ))
-    )
 
 
 async def handle_cancel_feedback(context, query):
-    await query.answer()
-    await query.message.answer(
+    await context.db.reset_chat_state(query.message.chat.id)
+    return SendMessage(
+        chat_id=query.message.chat.id,
         text=ANYWAY_THANK_FEEDBACK_TEXT
     )
-    await context.db.reset_chat_state(query.message.chat.id)
 
 
 async def handle_feedback_input(context, message):
@@ -524,20 +600,26 @@ async def handle_feedback_input(context, message):
         message.from_user.id,
         data.partner_user_id
     )
-    contact = await context.db.get_contact(key)
+    contact, user, partner_user = await gather(
+        context.db.get_contact(key),
+        context.db.get_user(message.from_user.id),
+        context.db.get_user(data.partner_user_id)
+    )
     contact.feedback_text = message.text
-    await context.db.put_contact(contact)
 
-    await message.answer(
-        text=THANK_FEEDBACK_TEXT
+    # Errors in webhook response are ignored by Telegram, admin forward
+    # is awaited, only reply to user is inline
+    await gather(
+        context.db.put_contact(contact),
+        context.bot.send_message(
+            chat_id=ADMIN_USER_ID,
+            text=admin_feedback_text(user, partner_user, contact)
+        ),
+        context.db.reset_chat_state(message.chat.id)
     )
-    await context.db.reset_chat_state(message.chat.id)
-
-    user = await context.db.get_user(contact.user_id)
-    partner_user = await context.db.get_user(contact.partner_user_id)
-    await context.bot.send_message(
-        chat_id=ADMIN_USER_ID,
-        text=admin_feedback_text(user, partner_user, contact)
+    return SendMessage(
+        chat_id=message.chat.id,
+        text=THANK_FEEDBACK_TEXT
     )
 
 
@@ -637,12 +719,13 @@ async def manual_match_users(context):
 
 async def handle_manual_match(context, query):
     data = deserialize_data(query.data, ManualMatchData)
-    await query.answer()
 
     if data.action == SELECT_USER_ACTION:
         user = await context.db.get_user(data.user_id)
         users = await manual_match_users(context)
-        await query.message.edit_text(
+        return EditMessageText(
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
             text=select_partner_user_text(user),
             reply_markup=select_partner_user_markup(user, users)
         )
@@ -650,7 +733,9 @@ async def handle_manual_match(context, query):
     elif data.action == SELECT_PARTNER_USER_ACTION:
         user = await context.db.get_user(data.user_id)
         partner_user = await context.db.get_user(data.partner_user_id)
-        await query.message.edit_text(
+        return EditMessageText(
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
             text=confirm_manual_match_text(user, partner_user),
             reply_markup=confirm_manual_match_markup(user, partner_user)
         )
@@ -666,14 +751,18 @@ async def handle_manual_match(context, query):
         )
 
         users = await manual_match_users(context)
-        await query.message.edit_text(
+        return EditMessageText(
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
             text=SELECT_USER_TEXT,
             reply_markup=select_user_markup(users)
         )
 
     elif data.action == CANCEL_ACTION:
         users = await manual_match_users(context)
-        await query.message.edit_text(
+        return EditMessageText(
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
             text=SELECT_USER_TEXT,
             reply_markup=select_user_markup(users)
         )
@@ -708,11 +797,11 @@ HELP_TEXT = '''Бот @betterdatacommunity_rc_bot организует random co
 
 
 async def handle_help(context, message):
-    await message.answer(text=HELP_TEXT)
+    return SendMessage(chat_id=message.chat.id, text=HELP_TEXT)
 
 
 async def handle_other(context, message):
-    await message.answer(text=HELP_TEXT)
+    return SendMessage(chat_id=message.chat.id, text=HELP_TEXT)
 
 
 #######
@@ -722,54 +811,124 @@ async def handle_other(context, message):
 ######
 
 
-def setup_handlers(context):
-    context.dispatcher.register_message_handler(
-        partial(handle_start, context),
-        commands=START_COMMAND,
-    )
+# Handler may return one Bot API call, neludim.bot.webhook sends it
+# in webhook response, saves a round trip. Callback handlers return
+# final reply or edit. Callback query is acked right away,
+# concurrently with handler, so client spinner does not wait for
+# handler DB and Bot API calls.
 
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_edit_profile, context),
-        text=serialize_data(EditProfileData())
+# Ack error is logged, not raised. Handler side effects are done, failed
+# update would be redelivered by Telegram and repeat them. Query older
+# than 15 min can not be acked for example
+
+
+async def answer_query(query):
+    try:
+        await query.answer()
+    except (exceptions.TelegramAPIError, asyncio.TimeoutError) as error:
+        log.warning(json_msg(
+            warning='query_ack',
+            error=error.__class__.__name__
+        ))
+
+
+def ack_query(handler):
+    async def wrapper(query):
+        ack = asyncio.ensure_future(answer_query(query))
+        try:
+            return await handler(query)
+        finally:
+            await ack
+
+    return wrapper
+
+
+# Single callback query handler instead of filter per handler.
+# aiogram checks text/text_startswith filters one by one until match,
+# router = exact data dict lookup, then prefix dict lookup
+
+
+class QueryRouter:
+    def __init__(self):
+        self.data_handlers = {}
+        self.prefix_handlers = {}
+
+    def add_data(self, data, handler):
+        self.data_handlers[data] = handler
+
+    def add_prefix(self, prefix, handler):
+        self.prefix_handlers[prefix] = handler
+
+    def match(self, data):
+        handler = self.data_handlers.get(data)
+        if handler:
+            return handler
+        return self.prefix_handlers.get(data_prefix(data))
+
+    async def __call__(self, query):
+        handler = self.match(query.data)
+        if handler:
+            return await handler(query)
+
+
+def setup_query_router(context):
+    router = QueryRouter()
+
+    router.add_data(
+        serialize_data(EditProfileData()),
+        ack_query(partial(handle_edit_profile, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_edit_name, context),
-        text=serialize_data(EditProfileData(NAME_FIELD))
+    router.add_data(
+        serialize_data(EditProfileData(NAME_FIELD)),
+        ack_query(partial(handle_edit_name, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_edit_city, context),
-        text=serialize_data(EditProfileData(CITY_FIELD))
+    router.add_data(
+        serialize_data(EditProfileData(CITY_FIELD)),
+        ack_query(partial(handle_edit_city, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_edit_links, context),
-        text=serialize_data(EditProfileData(LINKS_FIELD))
+    router.add_data(
+        serialize_data(EditProfileData(LINKS_FIELD)),
+        ack_query(partial(handle_edit_links, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_edit_about, context),
-        text=serialize_data(EditProfileData(ABOUT_FIELD))
+    router.add_data(
+        serialize_data(EditProfileData(ABOUT_FIELD)),
+        ack_query(partial(handle_edit_about, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_cancel_edit, context),
-        text=CANCEL_EDIT_DATA,
+    router.add_data(
+        CANCEL_EDIT_DATA,
+        ack_query(partial(handle_cancel_edit, context))
     )
 
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_participate, context),
-        text_startswith=PARTICIPATE_PREFIX
+    router.add_prefix(
+        PARTICIPATE_PREFIX,
+        ack_query(partial(handle_participate, context))
     )
 
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_feedback, context),
-        text_startswith=FEEDBACK_PREFIX
+    router.add_prefix(
+        FEEDBACK_PREFIX,
+        ack_query(partial(handle_feedback, context))
     )
-    context.dispatcher.register_callback_query_handler(
-        partial(handle_cancel_feedback, context),
-        text=CANCEL_FEEDBACK_DATA
+    router.add_data(
+        CANCEL_FEEDBACK_DATA,
+        ack_query(partial(handle_cancel_feedback, context))
+    )
+
+    router.add_prefix(
+        MANUAL_MATCH_PREFIX,
+        ack_query(partial(handle_manual_match, context))
+    )
+
+    return router
+
+
+def setup_handlers(context):
+    context.dispatcher.register_message_handler(
+        partial(handle_start, context),
+        commands=START_COMMAND,
     )
 
     context.dispatcher.register_callback_query_handler(
-        partial(handle_manual_match, context),
-        text_startswith=MANUAL_MATCH_PREFIX
+        setup_query_router(context)
     )
 
     context.dispatcher.register_message_handler(
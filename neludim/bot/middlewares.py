@@ -4,9 +4,16 @@ from aiogram.dispatcher.middlewares import BaseMiddleware
 from aiogram.dispatcher.handler import CancelHandler
 
 from neludim.log import (
-    log,
+    update_log,
     json_msg
 )
+from neludim.metrics import (
+    UPDATE_STATS,
+    UpdateStats,
+    instrument_db,
+    instrument_bot,
+    observe_update_stats,
+)
 
 
 class PrivateMiddleware(BaseMiddleware):
@@ -23,20 +30,53 @@ class PrivateMiddleware(BaseMiddleware):
 
 class LoggingMiddleware(BaseMiddleware):
     async def on_pre_process_message(self, message, data):
-        log.info(json_msg(
+        update_log.info(json_msg(
             user_id=message.from_user.id,
             text=message.text
         ))
 
     async def on_pre_process_callback_query(self, query, data):
-        log.info(json_msg(
+        update_log.info(json_msg(
             user_id=query.from_user.id,
             data=query.data
         ))
 
 
+# Pre and post process get same data dict. Post is called in finally,
+# also when handler raises. No token = pre process did not run or
+# failed, nothing to report
+
+
+class InstrumentMiddleware(BaseMiddleware):
+    async def on_pre_process_update(self, update, data):
+        data['update_stats_token'] = UPDATE_STATS.set(UpdateStats())
+
+    async def on_post_process_update(self, update, results, data):
+        token = data.pop('update_stats_token', None)
+        if not token:
+            return
+
+        stats = UPDATE_STATS.get()
+        UPDATE_STATS.reset(token)
+
+        total_time = stats.total_time
+        observe_update_stats(stats, total_time)
+        update_log.info(json_msg(
+            update_id=update.update_id,
+            total_ms=round(total_time * 1000, 1),
+            db_calls=stats.db_calls,
+            db_ms=round(stats.db_time * 1000, 1),
+            bot_calls=stats.bot_calls,
+            bot_ms=round(stats.bot_time * 1000, 1),
+        ))
+
+
 def setup_middlewares(context):
+    instrument_db(context.db)
+    instrument_bot(context.bot)
+
     middlewares = [
+        InstrumentMiddleware(),
         PrivateMiddleware(),
         LoggingMiddleware(),
     ]
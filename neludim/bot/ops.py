@@ -1,11 +1,16 @@
 
+from io import BytesIO
+from time import perf_counter
+
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
+    InputFile,
 )
 
 from neludim.const import (
     ADMIN_USER_ID,
+    MATCH_STRATEGY,
 
     CONFIRM_STATE,
     FAIL_STATE,
@@ -23,16 +28,32 @@ from neludim.text import (
     profile_text,
 )
 
+from neludim.log import (
+    log,
+    json_msg,
+)
+from neludim.aio import gather
 from neludim.schedule import week_index
+from neludim.metrics import MATCH_SECONDS
 from neludim.obj import Contact
 
-from neludim.match import gen_matches
+from neludim.match import STRATEGIES
+from neludim.pair import (
+    sort2,
+    gen_pairs,
+    select_pairs,
+)
 from neludim.report import (
-    gen_match_report,
+    gen_week_match_reports,
     format_match_report,
-    gen_weeks_report,
+    weeks_report_start,
+    update_weeks_report,
     format_weeks_report,
-    report_text
+    update_participations,
+    gen_cohort_report,
+    format_cohort_report,
+    report_pages,
+    records_csv,
 )
 
 from .data import (
@@ -88,9 +109,33 @@ async def ask_participate(context):
 ####
 
 
-async def create_contacts(context):
+# Empty pairs table with contacts history = not backfilled by
+# rebuild-pairs yet, every past pair would look new. create_contacts
+# writes back only this week pairs, so backfill is stored here, same
+# as rebuild-pairs
+
+
+async def read_match_pairs(db):
+    pairs = await db.read_pairs()
+    if pairs:
+        return pairs
+
+    contacts = await db.read_contacts()
+    if not contacts:
+        return []
+
+    log.warning(json_msg(
+        warning='empty_pairs',
+        contacts=len(contacts)
+    ))
+    pairs = gen_pairs(contacts)
+    await db.put_pairs(pairs)
+    return pairs
+
+
+async def create_contacts(context, strategy=MATCH_STRATEGY):
     users = await context.db.read_users()
-    contacts = await context.db.read_contacts()
+    pairs = await read_match_pairs(context.db)
     manual_matches = await context.db.read_manual_matches()
     current_week_index = context.schedule.current_week_index()
 
@@ -101,12 +146,18 @@ async def create_contacts(context):
                 and week_index(_.agreed_participate) == current_week_index - 1
         )
     ]
-    matches = list(gen_matches(
+    pairs = list(select_pairs(
+        pairs,
+        user_ids=[_.user_id for _ in participate_users]
+    ))
+    start = perf_counter()
+    matches = list(STRATEGIES[strategy](
         participate_users,
         manual_matches=manual_matches,
-        contacts=contacts,
+        pairs=pairs,
         current_week_index=current_week_index,
     ))
+    MATCH_SECONDS.observe(perf_counter() - start)
 
     contacts = []
     for match in matches:
@@ -139,10 +190,33 @@ async def create_contacts(context):
             partner_user = id_users[partner_user_id]
             partner_user.partner_user_id = user_id
 
+    match_keys = {
+        sort2(*_.key) for _ in matches
+        if _.partner_user_id
+    }
+    pairs = [
+        _ for _ in gen_pairs(contacts, pairs)
+        if _.key in match_keys
+    ]
+
     await context.db.put_contacts(contacts)
+    await context.db.put_pairs(pairs)
     await context.db.put_users(users)
 
 
+######
+#
+#   REBUILD PAIRS
+#
+####
+
+
+async def rebuild_pairs(context):
+    contacts = await context.db.read_contacts()
+    pairs = gen_pairs(contacts)
+    await context.db.put_pairs(pairs)
+
+
 ######
 #
 #   SEND CONTACTS
@@ -167,10 +241,9 @@ async def send_contacts(context):
         _.user_id: _
         for _ in await context.db.read_users()
     }
-    week_contacts = [
-        _ for _ in await context.db.read_contacts()
-        if _.week_index == context.schedule.current_week_index()
-    ]
+    week_contacts = await context.db.read_week_contacts(
+        context.schedule.current_week_index()
+    )
 
     for contact in week_contacts:
         if contact.partner_user_id:
@@ -242,10 +315,9 @@ async def ask_feedback(context):
         _.user_id: _
         for _ in await context.db.read_users()
     }
-    week_contacts = [
-        _ for _ in await context.db.read_contacts()
-        if _.week_index == context.schedule.current_week_index()
-    ]
+    week_contacts = await context.db.read_week_contacts(
+        context.schedule.current_week_index()
+    )
 
     for contact in week_contacts:
         if not contact.partner_user_id:
@@ -348,39 +420,110 @@ async def manual_match(context):
 ######
 
 
+# Pages go one after another. Concurrent sends to one chat may arrive
+# out of order. Long report is also attached as CSV. Plain awaited
+# sends, not Broadcast: Broadcast logs and skips errors, page would be
+# lost silently
+
+
+async def send_report(context, name, records, lines):
+    pages = list(report_pages(lines, html=True))
+    for page in pages:
+        await context.bot.send_message(
+            chat_id=ADMIN_USER_ID,
+            text=page
+        )
+
+    if len(pages) > 1:
+        data = records_csv(records, exclude=['first_time_user_ids'])
+        await context.bot.send_document(
+            chat_id=ADMIN_USER_ID,
+            document=InputFile(BytesIO(data.encode('utf8')), filename=f'{name}.csv')
+        )
+
+
+# One GetItem per pair, batch_size requests at a time. Pair row
+# missing = pairs table not backfilled, repeats from contacts history
+
+
+async def get_pairs(db, keys, batch_size=25):
+    pairs = []
+    for index in range(0, len(keys), batch_size):
+        batch = keys[index:index + batch_size]
+        pairs.extend(await gather(*[db.get_pair(_) for _ in batch]))
+    return pairs
+
+
+async def read_repeat_keys(db, contacts):
+    keys = sorted({
+        sort2(_.user_id, _.partner_user_id)
+        for _ in contacts
+        if _.partner_user_id
+    })
+    pairs = await get_pairs(db, keys)
+    key_pairs = {_.key: _ for _ in pairs if _}
+
+    if len(key_pairs) < len(keys):
+        log.warning(json_msg(
+            warning='missing_pairs',
+            pairs=len(keys) - len(key_pairs)
+        ))
+        contacts = await db.read_contacts()
+        for pair in gen_pairs(contacts):
+            key_pairs.setdefault(pair.key, pair)
+
+    return {
+        _.key for _ in key_pairs.values()
+        if _.prev_week_index is not None
+    }
+
+
 async def send_reports(context):
     id_users = {
         _.user_id: _
         for _ in await context.db.read_users()
     }
-    contacts = await context.db.read_contacts()
     manual_matches = await context.db.read_manual_matches()
     current_week_index = context.schedule.current_week_index()
+    match_week_indexes = [current_week_index - 1, current_week_index]
+
+    records = await context.db.read_weeks_report()
+    participations = await context.db.read_participations()
+    start_week_index = weeks_report_start(records, current_week_index)
+
+    # Empty tables = first run, fill from all contacts. Otherwise only
+    # open weeks and match report weeks
+    if start_week_index is None or not participations:
+        contacts = await context.db.read_contacts()
+    else:
+        week_indexes = set(range(start_week_index, current_week_index + 1))
+        week_indexes.update(match_week_indexes)
+        contacts = await context.db.read_weeks_contacts(sorted(week_indexes))
+
+    records, updates = update_weeks_report(records, contacts, start_week_index)
+    await context.db.put_weeks_report(updates)
 
-    records = gen_weeks_report(contacts)
     lines = format_weeks_report(records)
-    text = report_text(lines, html=True)
-    await context.bot.send_message(
-        chat_id=ADMIN_USER_ID,
-        text=text
-    )
+    await send_report(context, 'weeks_report', records, lines)
 
-    prev_contacts = [_ for _ in contacts if _.week_index < current_week_index - 1]
-    week_contacts = [_ for _ in contacts if _.week_index == current_week_index - 1]
-    records = gen_match_report(week_contacts, prev_contacts, manual_matches)
-    lines = format_match_report(records, id_users)
-    text = report_text(lines, html=True)
-    await context.bot.send_message(
-        chat_id=ADMIN_USER_ID,
-        text=text
-    )
+    if not participations:
+        start_week_index = None
+    participations, updates = update_participations(participations, contacts, start_week_index)
+    await context.db.put_participations(updates)
 
-    prev_contacts = [_ for _ in contacts if _.week_index < current_week_index]
-    week_contacts = [_ for _ in contacts if _.week_index == current_week_index]
-    records = gen_match_report(week_contacts, prev_contacts, manual_matches)
-    lines = format_match_report(records, id_users)
-    text = report_text(lines, html=True)
-    await context.bot.send_message(
-        chat_id=ADMIN_USER_ID,
-        text=text
+    records = list(gen_cohort_report(participations, current_week_index))
+    lines = format_cohort_report(records)
+    await send_report(context, 'cohort_report', records, lines)
+
+    match_contacts = [
+        _ for _ in contacts
+        if _.week_index in match_week_indexes
+    ]
+    repeat_keys = await read_repeat_keys(context.db, match_contacts)
+    reports = gen_week_match_reports(
+        match_contacts, manual_matches, repeat_keys,
+        week_indexes=match_week_indexes
     )
+    for report_week_index, records in reports:
+        lines = format_match_report(records, id_users)
+        await send_report(context, f'match_report_{report_week_index}', records, lines)
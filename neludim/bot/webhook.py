@@ -1,9 +1,86 @@
 
+from itertools import chain
 from functools import partial
 
-from aiogram import executor
+from aiohttp import web
 
-from neludim.const import PORT
+from aiogram.dispatcher.webhook import (
+    BOT_DISPATCHER_KEY,
+    WebhookRequestHandler,
+    BaseResponse,
+)
+
+from neludim.const import (
+    PORT,
+    METRICS_TOKEN,
+)
+from neludim.log import (
+    log,
+    json_msg,
+    start_log_listener,
+)
+from neludim.metrics import (
+    WEBHOOK_UPDATES,
+    WEBHOOK_INLINE_REPLIES,
+    handle_metrics,
+    check_metrics_token,
+    loop_lag_ctx,
+)
+
+
+######
+#
+#   INLINE REPLY
+#
+#####
+
+
+# Handler returns BaseResponse (SendMessage, EditMessageText) ->
+# sent as webhook response body, Telegram executes it, no Bot API
+# request. One per update, Telegram does not report errors
+# https://core.telegram.org/bots/api#making-requests-when-getting-updates
+
+
+def webhook_response(results):
+    if results:
+        for result in chain.from_iterable(results):
+            if isinstance(result, BaseResponse):
+                return result
+
+
+def webhook_stats():
+    return dict(
+        updates=WEBHOOK_UPDATES.value(),
+        inline_replies=WEBHOOK_INLINE_REPLIES.value()
+    )
+
+
+class InlineWebhookRequestHandler(WebhookRequestHandler):
+    def get_response(self, results):
+        response = webhook_response(results)
+
+        WEBHOOK_UPDATES.inc()
+        if response:
+            WEBHOOK_INLINE_REPLIES.inc()
+
+        return response
+
+    async def get(self):
+        self.validate_ip()
+        check_metrics_token(self.request, self.request.app[METRICS_TOKEN_KEY])
+        return web.json_response(webhook_stats())
+
+
+#######
+#
+#   WEBHOOK
+#
+#####
+
+
+# aiogram Executor also calls getMe on startup, one more Bot API
+# request on cold start. App is built same way as trigger, load test
+# runs it in process
 
 
 async def on_startup(context, _):
@@ -11,20 +88,51 @@ async def on_startup(context, _):
 
 
 async def on_shutdown(context, _):
+    log.info(json_msg(**webhook_stats()))
     await context.db.close()
 
+    session = await context.bot.get_session()
+    await session.close()
 
-def start_webhook(context):
-    executor.start_webhook(
-        dispatcher=context.dispatcher,
 
-        webhook_path='/',
-        port=PORT,
+# Webhook URL is public, stats and metrics need METRICS_TOKEN
 
-        on_startup=partial(on_startup, context),
-        on_shutdown=partial(on_shutdown, context),
 
-        # Disable aiohttp "Running on ... Press CTRL+C"
-        # Polutes YC Logging
-        print=None
-    )
+METRICS_TOKEN_KEY = 'metrics_token'
+
+
+async def handle_private_metrics(request):
+    check_metrics_token(request, request.app[METRICS_TOKEN_KEY])
+    return await handle_metrics(request)
+
+
+def build_app(context, metrics_token=METRICS_TOKEN):
+    app = web.Application()
+    app[BOT_DISPATCHER_KEY] = context.dispatcher
+    app[METRICS_TOKEN_KEY] = metrics_token
+
+    app.add_routes([
+        web.route('*', '/', InlineWebhookRequestHandler),
+        web.get('/metrics', handle_private_metrics),
+    ])
+
+    app.on_startup.append(partial(on_startup, context))
+    app.on_shutdown.append(partial(on_shutdown, context))
+    app.cleanup_ctx.append(loop_lag_ctx)
+
+    return app
+
+
+def start_webhook(context):
+    stop_log_listener = start_log_listener()
+    try:
+        web.run_app(
+            build_app(context),
+            port=PORT,
+
+            # Disable aiohttp "Running on ... Press CTRL+C"
+            # Polutes YC Logging
+            print=None
+        )
+    finally:
+        stop_log_listener()
@@ -1,6 +1,9 @@
 
 import sys
+import asyncio
+from time import perf_counter
 import argparse
+from functools import partial
 
 from .context import Context
 
@@ -19,7 +22,192 @@ def trigger_webhook(context, args):
     start_webhook(context)
 
 
+async def run_op(context, op):
+    await context.db.connect()
+    try:
+        await op(context)
+    finally:
+        await context.db.close()
+
+
+def rebuild_pairs(context, args):
+    from .bot import ops
+
+    asyncio.run(run_op(context, ops.rebuild_pairs))
+
+
+async def replay_matches_op(context, args):
+    from .match import STRATEGIES
+    from .quality import (
+        replay_weeks,
+        format_replay,
+    )
+
+    users = await context.db.read_users()
+    contacts = await context.db.read_contacts()
+    manual_matches = await context.db.read_manual_matches()
+
+    week_indexes = sorted({_.week_index for _ in contacts})
+    week_indexes = week_indexes[-args.weeks:]
+    strategies = {
+        _: STRATEGIES[_]
+        for _ in args.strategies
+    }
+
+    rows = replay_weeks(
+        users, contacts, manual_matches, strategies,
+        week_indexes=week_indexes,
+        rounds=args.rounds
+    )
+    for line in format_replay(rows):
+        print(line, flush=True)
+
+
+def replay_matches(context, args):
+    asyncio.run(run_op(context, partial(replay_matches_op, args=args)))
+
+
+async def export_op(context, args):
+    from .snapshot import export_snapshot
+
+    rows = export_snapshot(
+        context.db.client, args.dir,
+        tables=args.tables,
+        segments=args.segments
+    )
+    async for table, count in rows:
+        print(f'{table} {count}', flush=True)
+
+
+def export(context, args):
+    asyncio.run(run_op(context, partial(export_op, args=args)))
+
+
+async def import_op(context, args):
+    from .snapshot import import_snapshot
+
+    rows = import_snapshot(
+        context.db.client, args.dir,
+        tables=args.tables,
+        concurrency=args.concurrency
+    )
+    async for table, count in rows:
+        print(f'{table} {count}', flush=True)
+
+
+def import_(context, args):
+    asyncio.run(run_op(context, partial(import_op, args=args)))
+
+
+def dynamo_local(context, args):
+    from .dynamo_local import (
+        LocalDynamo,
+        start_server,
+    )
+
+    dynamo = LocalDynamo(
+        latency=args.latency,
+        throttle=args.throttle,
+        page_size=args.page_size
+    )
+    start_server(dynamo, args.port)
+
+
+def startup_profile(context, args):
+    from .startup import (
+        profile_startup,
+        format_startup_profile,
+    )
+
+    profile = profile_startup(args.command)
+    for line in format_startup_profile(profile, top=args.top):
+        print(line)
+
+
+async def run_task_op(context, args):
+    from .runner import (
+        record_db_calls,
+        bot_call_counts,
+        format_run_stats,
+    )
+    from .profiling import (
+        profile_op,
+        format_op_profile,
+    )
+
+    task = args.task
+    db_stats = record_db_calls(context.db)
+    if args.profile:
+        profile = await profile_op(task.op, context, top=args.top)
+        for line in format_op_profile(profile):
+            print(line)
+        print()
+    else:
+        start = perf_counter()
+        await task.op(context)
+        print(f'{task.name}: {perf_counter() - start:.2f}s')
+        print()
+
+    lines = format_run_stats(db_stats, bot_call_counts(context.bot))
+    for line in lines:
+        print(line)
+
+
+def run_task(context, args):
+    from .trigger import TASKS
+    from .const import (
+        LIVE_BACKEND,
+        SQLITE_BACKEND,
+        SNAPSHOT_BACKEND,
+    )
+    from .runner import (
+        RecordingBot,
+        WeekSchedule,
+        snapshot_db,
+        dry_run_db,
+    )
+
+    # Not argparse choices, trigger imports aiogram, slows every command
+    names = {_.name: _ for _ in TASKS}
+    args.task = names.get(args.name)
+    if not args.task:
+        sys.exit(f'unknown task {args.name!r}, choose from {", ".join(names)}')
+
+    backend = args.backend
+    if not backend:
+        backend = SNAPSHOT_BACKEND if args.snapshot else LIVE_BACKEND
+
+    if backend == SNAPSHOT_BACKEND:
+        if not args.snapshot:
+            sys.exit('--backend snapshot needs --snapshot DIR')
+        context.db = snapshot_db(args.snapshot)
+    elif backend == SQLITE_BACKEND:
+        from .db_sqlite import SqliteDB
+
+        context.db = SqliteDB(args.sqlite_path)
+
+    # Bot only records calls, nobody is told about live writes, for
+    # example new contacts. Live is read only unless --write
+    if args.dry_run or (backend == LIVE_BACKEND and not args.write):
+        dry_run_db(context.db)
+
+    if args.week is not None:
+        context.schedule = WeekSchedule(args.week)
+
+    context.bot = RecordingBot()
+    context.broadcast.delay = args.delay
+
+    asyncio.run(run_op(context, partial(run_task_op, args=args)))
+
+
 def build_parser():
+    from .const import (
+        SQLITE_PATH,
+        RUN_BACKENDS,
+    )
+    from .snapshot import SNAPSHOT_TABLES
+    from .match import STRATEGIES
+
     parser = argparse.ArgumentParser(prog='neludim')
     parser.set_defaults(function=None)
     subs = parser.add_subparsers()
@@ -30,6 +218,53 @@ def build_parser():
     sub = subs.add_parser('trigger-webhook')
     sub.set_defaults(function=trigger_webhook)
 
+    sub = subs.add_parser('rebuild-pairs')
+    sub.set_defaults(function=rebuild_pairs)
+
+    sub = subs.add_parser('replay-matches')
+    sub.set_defaults(function=replay_matches)
+    sub.add_argument('--weeks', type=int, default=4)
+    sub.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    sub.add_argument('--rounds', type=int, default=10)
+
+    sub = subs.add_parser('export')
+    sub.set_defaults(function=export)
+    sub.add_argument('dir')
+    sub.add_argument('--tables', nargs='+', default=list(SNAPSHOT_TABLES), choices=list(SNAPSHOT_TABLES))
+    sub.add_argument('--segments', type=int, default=4)
+
+    sub = subs.add_parser('import')
+    sub.set_defaults(function=import_)
+    sub.add_argument('dir')
+    sub.add_argument('--tables', nargs='+', default=list(SNAPSHOT_TABLES), choices=list(SNAPSHOT_TABLES))
+    sub.add_argument('--concurrency', type=int, default=8)
+
+    sub = subs.add_parser('startup-profile')
+    sub.set_defaults(function=startup_profile)
+    sub.add_argument('command', choices=['bot-webhook', 'trigger-webhook'])
+    sub.add_argument('--top', type=int, default=15)
+
+    sub = subs.add_parser('run-task')
+    sub.set_defaults(function=run_task)
+    sub.add_argument('name')
+    sub.add_argument('--week', type=int, help='default current week')
+    sub.add_argument('--backend', choices=RUN_BACKENDS, help='default snapshot if --snapshot else live')
+    sub.add_argument('--snapshot')
+    sub.add_argument('--sqlite-path', default=SQLITE_PATH)
+    group = sub.add_mutually_exclusive_group()
+    group.add_argument('--dry-run', action='store_true', help='skip DB writes, default for live')
+    group.add_argument('--write', action='store_true', help='write to live DB')
+    sub.add_argument('--delay', type=float, default=0, help='broadcast delay, 1/30 in container')
+    sub.add_argument('--profile', action='store_true')
+    sub.add_argument('--top', type=int, default=20)
+
+    sub = subs.add_parser('dynamo-local')
+    sub.set_defaults(function=dynamo_local)
+    sub.add_argument('--port', type=int, default=8000)
+    sub.add_argument('--latency', type=float, default=0)
+    sub.add_argument('--throttle', type=float, default=0)
+    sub.add_argument('--page-size', type=int, default=100)
+
     return parser
 
 
@@ -26,6 +26,10 @@ AWS_KEY = getenv('AWS_KEY')
 
 DYNAMO_ENDPOINT = getenv('DYNAMO_ENDPOINT')
 
+DB_BACKEND = getenv('DB_BACKEND', 'dynamo')
+SQLITE_PATH = getenv('SQLITE_PATH', 'neludim.db')
+MEMORY_PATH = getenv('MEMORY_PATH')
+
 ADMIN_USER_ID = int(getenv('ADMIN_USER_ID'))
 
 #######
@@ -66,6 +70,7 @@ N = 'N'
 S = 'S'
 M = 'M'
 SS = 'SS'
+NS = 'NS'
 
 ######
 #  DB
@@ -83,6 +88,15 @@ CONTACTS_KEY = 'key'
 MANUAL_MATCHES_TABLE = 'manual_matches'
 MANUAL_MATCHES_KEY = 'key'
 
+PAIRS_TABLE = 'pairs'
+PAIRS_KEY = 'key'
+
+WEEKS_REPORT_TABLE = 'weeks_report'
+WEEKS_REPORT_KEY = 'week_index'
+
+PARTICIPATIONS_TABLE = 'participations'
+PARTICIPATIONS_KEY = 'user_id'
+
 #####
 #  COMMAND
 #######
@@ -135,8 +149,46 @@ GREAT_SCORE = 'great'
 OK_SCORE = 'ok'
 BAD_SCORE = 'bad'
 
+######
+#  MATCH
+####
+
+FLAT_STRATEGY = 'flat'
+CITY_STRATEGY = 'city'
+
+# create_contacts matcher, key of neludim.match.STRATEGIES
+MATCH_STRATEGY = getenv('MATCH_STRATEGY') or FLAT_STRATEGY
+
+######
+#  DB BACKEND
+####
+
+DYNAMO_BACKEND = 'dynamo'
+SQLITE_BACKEND = 'sqlite'
+MEMORY_BACKEND = 'memory'
+
+# neludim run-task: live = DB_BACKEND, snapshot = memory loaded from
+# "neludim export" dir
+LIVE_BACKEND = 'live'
+SNAPSHOT_BACKEND = 'snapshot'
+RUN_BACKENDS = [LIVE_BACKEND, SQLITE_BACKEND, SNAPSHOT_BACKEND]
+
 ######
 #  PORT
 #####
 
 PORT = getenv('PORT', 8080)
+
+# Bot /metrics and GET / are on public webhook URL, need header
+# "Authorization: Bearer METRICS_TOKEN". Not set = 404
+METRICS_TOKEN = getenv('METRICS_TOKEN')
+
+######
+#  LOG
+#####
+
+# Share of per-update log lines to keep
+LOG_SAMPLE_RATE = float(getenv('LOG_SAMPLE_RATE', 1))
+
+# Log cProfile and tracemalloc top for each trigger task
+PROFILE_TASKS = bool(getenv('PROFILE_TASKS'))
@@ -1,17 +1,37 @@
+from functools import cached_property
 
-from .bot.bot import (
-    init_bot,
-    Dispatcher
-)
-from .bot.broadcast import Broadcast
-from .db import DB
-from .schedule import Schedule
+
+# Attributes are created on first access. Trigger never touches
+# dispatcher, DB backend modules are imported by init_db
 
 
 class Context:
-    def __init__(self):
-        self.bot = init_bot()
-        self.dispatcher = Dispatcher(self.bot)
-        self.broadcast = Broadcast(self.bot)
-        self.db = DB()
-        self.schedule = Schedule()
+    @cached_property
+    def bot(self):
+        from .bot.bot import init_bot
+
+        return init_bot()
+
+    @cached_property
+    def dispatcher(self):
+        from .bot.bot import Dispatcher
+
+        return Dispatcher(self.bot)
+
+    @cached_property
+    def broadcast(self):
+        from .bot.broadcast import Broadcast
+
+        return Broadcast(self.bot)
+
+    @cached_property
+    def db(self):
+        from .db import init_db
+
+        return init_db()
+
+    @cached_property
+    def schedule(self):
+        from .schedule import Schedule
+
+        return Schedule()
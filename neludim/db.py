@@ -4,7 +4,10 @@ from .obj import (
     Contact,
     User,
     Match,
+    Pair,
+    Participation,
 )
+from .report import WeeksReportRecord
 from .const import (
     CHATS_TABLE,
     CHATS_KEY,
@@ -18,6 +21,19 @@ from .const import (
     MANUAL_MATCHES_TABLE,
     MANUAL_MATCHES_KEY,
 
+    PAIRS_TABLE,
+    PAIRS_KEY,
+
+    WEEKS_REPORT_TABLE,
+
+    PARTICIPATIONS_TABLE,
+
+    DB_BACKEND,
+    SQLITE_BACKEND,
+    SQLITE_PATH,
+    MEMORY_BACKEND,
+    MEMORY_PATH,
+
     N, S,
 )
 from .dynamo import (
@@ -56,18 +72,18 @@ async def put_chat(db, chat):
 
 
 async def get_chat_state(db, id):
-    chat = await get_chat(db, id)
+    chat = await db.get_chat(id)
     if chat:
         return chat.state
 
 
 async def set_chat_state(db, id, state):
     chat = Chat(id, state)
-    await put_chat(db, chat)
+    await db.put_chat(chat)
 
 
 async def reset_chat_state(db, id):
-    await set_chat_state(db, id, state=None)
+    await db.set_chat_state(id, state=None)
 
 
 ######
@@ -104,11 +120,11 @@ async def delete_users(db, user_ids):
 
 
 async def put_user(db, user):
-    await put_users(db, [user])
+    await db.put_users([user])
 
 
 async def delete_user(db, user_id):
-    await delete_users(db, [user_id])
+    await db.delete_users([user_id])
 
 
 #######
@@ -132,6 +148,20 @@ async def read_contacts(db):
     return [dynamo_deserialize_item(_, Contact) for _ in items]
 
 
+# No week index on contacts table. Several weeks = one scan, filter
+# after
+
+
+async def read_weeks_contacts(db, week_indexes):
+    week_indexes = set(week_indexes)
+    contacts = await db.read_contacts()
+    return [_ for _ in contacts if _.week_index in week_indexes]
+
+
+async def read_week_contacts(db, week_index):
+    return await db.read_weeks_contacts([week_index])
+
+
 def serialize_contact(contact):
     item = dynamo_serialize_item(contact)
     item[CONTACTS_KEY] = {S: dynamo_serialize_key(contact.key)}
@@ -152,11 +182,11 @@ async def delete_contacts(db, keys):
 
 
 async def put_contact(db, contact):
-    await put_contacts(db, [contact])
+    await db.put_contacts([contact])
 
 
 async def delete_contact(db, key):
-    await delete_contacts(db, [key])
+    await db.delete_contacts([key])
 
 
 #######
@@ -191,11 +221,93 @@ async def delete_manual_matches(db, keys):
 
 
 async def put_manual_match(db, match):
-    await put_manual_matches(db, [match])
+    await db.put_manual_matches([match])
 
 
 async def delete_manual_match(db, key):
-    await delete_manual_matches(db, [key])
+    await db.delete_manual_matches([key])
+
+
+#######
+#
+#    PAIRS
+#
+######
+
+
+async def get_pair(db, key):
+    item = await dynamo_get(
+        db.client, PAIRS_TABLE,
+        PAIRS_KEY, S, dynamo_serialize_key(key)
+    )
+    if item:
+        return dynamo_deserialize_item(item, Pair)
+
+
+async def read_pairs(db):
+    items = await dynamo_scan(db.client, PAIRS_TABLE)
+    return [dynamo_deserialize_item(_, Pair) for _ in items]
+
+
+def serialize_pair(pair):
+    item = dynamo_serialize_item(pair)
+    item[PAIRS_KEY] = {S: dynamo_serialize_key(pair.key)}
+    return item
+
+
+async def put_pairs(db, pairs):
+    items = (serialize_pair(_) for _ in pairs)
+    await dynamo_batch_put(db.client, PAIRS_TABLE, items)
+
+
+async def delete_pairs(db, keys):
+    keys = (dynamo_serialize_key(_) for _ in keys)
+    await dynamo_batch_delete(
+        db.client, PAIRS_TABLE,
+        PAIRS_KEY, S, keys
+    )
+
+
+async def put_pair(db, pair):
+    await db.put_pairs([pair])
+
+
+async def delete_pair(db, key):
+    await db.delete_pairs([key])
+
+
+#######
+#
+#    WEEKS REPORT
+#
+######
+
+
+async def read_weeks_report(db):
+    items = await dynamo_scan(db.client, WEEKS_REPORT_TABLE)
+    return [dynamo_deserialize_item(_, WeeksReportRecord) for _ in items]
+
+
+async def put_weeks_report(db, records):
+    items = (dynamo_serialize_item(_) for _ in records)
+    await dynamo_batch_put(db.client, WEEKS_REPORT_TABLE, items)
+
+
+#######
+#
+#    PARTICIPATIONS
+#
+######
+
+
+async def read_participations(db):
+    items = await dynamo_scan(db.client, PARTICIPATIONS_TABLE)
+    return [dynamo_deserialize_item(_, Participation) for _ in items]
+
+
+async def put_participations(db, participations):
+    items = (dynamo_serialize_item(_) for _ in participations)
+    await dynamo_batch_put(db.client, PARTICIPATIONS_TABLE, items)
 
 
 ######
@@ -232,6 +344,8 @@ DB.delete_users = delete_users
 
 DB.get_contact = get_contact
 DB.read_contacts = read_contacts
+DB.read_week_contacts = read_week_contacts
+DB.read_weeks_contacts = read_weeks_contacts
 DB.put_contact = put_contact
 DB.delete_contact = delete_contact
 DB.put_contacts = put_contacts
@@ -242,3 +356,30 @@ DB.put_manual_match = put_manual_match
 DB.delete_manual_match = delete_manual_match
 DB.put_manual_matches = put_manual_matches
 DB.delete_manual_matches = delete_manual_matches
+
+DB.get_pair = get_pair
+DB.read_pairs = read_pairs
+DB.put_pair = put_pair
+DB.delete_pair = delete_pair
+DB.put_pairs = put_pairs
+DB.delete_pairs = delete_pairs
+
+DB.read_weeks_report = read_weeks_report
+DB.put_weeks_report = put_weeks_report
+
+DB.read_participations = read_participations
+DB.put_participations = put_participations
+
+
+def init_db():
+    if DB_BACKEND == SQLITE_BACKEND:
+        from .db_sqlite import SqliteDB
+
+        return SqliteDB(SQLITE_PATH)
+
+    elif DB_BACKEND == MEMORY_BACKEND:
+        from .db_memory import MemoryDB
+
+        return MemoryDB(MEMORY_PATH)
+
+    return DB()
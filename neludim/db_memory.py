@@ -0,0 +1,301 @@
+from pathlib import Path
+from operator import attrgetter
+from dataclasses import replace
+from collections import defaultdict
+
+from .const import (
+    CHATS_TABLE,
+    USERS_TABLE,
+    CONTACTS_TABLE,
+    MANUAL_MATCHES_TABLE,
+    PAIRS_TABLE,
+    WEEKS_REPORT_TABLE,
+    PARTICIPATIONS_TABLE,
+)
+from .dynamo import dynamo_serialize_item
+from .db import (
+    DB,
+    serialize_contact,
+    serialize_manual_match,
+    serialize_pair,
+)
+from .snapshot import (
+    read_snapshot,
+    write_snapshot_items,
+)
+
+
+# Table = dict primary key -> obj, contacts also indexed by
+# week_index. Re-put moves obj to the end, same order as delete +
+# append. Optional snapshot dir in "neludim export" format: loaded
+# on connect, dumped on close. Objs are copied on put and on read,
+# like Dynamo and SQLite return fresh objs, caller mutation does not
+# change table without put
+
+
+TABLE_KEYS = {
+    CHATS_TABLE: attrgetter('id'),
+    USERS_TABLE: attrgetter('user_id'),
+    CONTACTS_TABLE: attrgetter('key'),
+    MANUAL_MATCHES_TABLE: attrgetter('key'),
+    PAIRS_TABLE: attrgetter('key'),
+    WEEKS_REPORT_TABLE: attrgetter('week_index'),
+    PARTICIPATIONS_TABLE: attrgetter('user_id'),
+}
+
+TABLE_SERIALIZERS = {
+    CONTACTS_TABLE: serialize_contact,
+    MANUAL_MATCHES_TABLE: serialize_manual_match,
+    PAIRS_TABLE: serialize_pair,
+}
+
+
+######
+#
+#  OPS
+#
+#####
+
+
+def memory_put(db, table, objs):
+    items = db.tables[table]
+    get_key = TABLE_KEYS[table]
+    for obj in objs:
+        obj = replace(obj)
+        key = get_key(obj)
+        items.pop(key, None)
+        items[key] = obj
+
+        if table == CONTACTS_TABLE:
+            db.week_contacts[obj.week_index][key] = obj
+
+
+def memory_delete(db, table, keys):
+    items = db.tables[table]
+    for key in keys:
+        obj = items.pop(key, None)
+
+        if obj and table == CONTACTS_TABLE:
+            db.week_contacts[obj.week_index].pop(key, None)
+
+
+def memory_load(db, table, objs):
+    db.tables[table].clear()
+    if table == CONTACTS_TABLE:
+        db.week_contacts.clear()
+    memory_put(db, table, objs)
+
+
+def memory_get(db, table, key):
+    obj = db.tables[table].get(key)
+    if obj:
+        return replace(obj)
+
+
+def memory_read(db, table):
+    return [replace(_) for _ in db.tables[table].values()]
+
+
+def load_memory_snapshot(db, dir):
+    for table in TABLE_KEYS:
+        memory_load(db, table, read_snapshot(dir, table))
+
+
+def dump_memory_snapshot(db, dir):
+    Path(dir).mkdir(parents=True, exist_ok=True)
+    for table in TABLE_KEYS:
+        serialize = TABLE_SERIALIZERS.get(table, dynamo_serialize_item)
+        items = (serialize(_) for _ in memory_read(db, table))
+        write_snapshot_items(dir, table, items)
+
+
+#######
+#
+#   CHATS
+#
+#######
+
+
+async def get_chat(db, id):
+    return memory_get(db, CHATS_TABLE, id)
+
+
+async def put_chat(db, chat):
+    memory_put(db, CHATS_TABLE, [chat])
+
+
+######
+#
+#   USERS
+#
+#######
+
+
+async def get_user(db, user_id):
+    return memory_get(db, USERS_TABLE, user_id)
+
+
+async def read_users(db):
+    return memory_read(db, USERS_TABLE)
+
+
+async def put_users(db, users):
+    memory_put(db, USERS_TABLE, users)
+
+
+async def delete_users(db, user_ids):
+    memory_delete(db, USERS_TABLE, user_ids)
+
+
+#######
+#
+#   CONTACTS
+#
+#####
+
+
+async def get_contact(db, key):
+    return memory_get(db, CONTACTS_TABLE, key)
+
+
+async def read_contacts(db):
+    return memory_read(db, CONTACTS_TABLE)
+
+
+async def read_week_contacts(db, week_index):
+    return [replace(_) for _ in db.week_contacts[week_index].values()]
+
+
+async def read_weeks_contacts(db, week_indexes):
+    return [
+        replace(contact)
+        for week_index in week_indexes
+        for contact in db.week_contacts[week_index].values()
+    ]
+
+
+async def put_contacts(db, contacts):
+    memory_put(db, CONTACTS_TABLE, contacts)
+
+
+async def delete_contacts(db, keys):
+    memory_delete(db, CONTACTS_TABLE, keys)
+
+
+#######
+#
+#    MANUAL MATCHES
+#
+######
+
+
+async def read_manual_matches(db):
+    return memory_read(db, MANUAL_MATCHES_TABLE)
+
+
+async def put_manual_matches(db, matches):
+    memory_put(db, MANUAL_MATCHES_TABLE, matches)
+
+
+async def delete_manual_matches(db, keys):
+    memory_delete(db, MANUAL_MATCHES_TABLE, keys)
+
+
+#######
+#
+#    PAIRS
+#
+######
+
+
+async def get_pair(db, key):
+    return memory_get(db, PAIRS_TABLE, key)
+
+
+async def read_pairs(db):
+    return memory_read(db, PAIRS_TABLE)
+
+
+async def put_pairs(db, pairs):
+    memory_put(db, PAIRS_TABLE, pairs)
+
+
+async def delete_pairs(db, keys):
+    memory_delete(db, PAIRS_TABLE, keys)
+
+
+#######
+#
+#    REPORTS
+#
+######
+
+
+async def read_weeks_report(db):
+    return memory_read(db, WEEKS_REPORT_TABLE)
+
+
+async def put_weeks_report(db, records):
+    memory_put(db, WEEKS_REPORT_TABLE, records)
+
+
+async def read_participations(db):
+    return memory_read(db, PARTICIPATIONS_TABLE)
+
+
+async def put_participations(db, participations):
+    memory_put(db, PARTICIPATIONS_TABLE, participations)
+
+
+######
+#
+#  DB
+#
+#######
+
+
+class MemoryDB(DB):
+    def __init__(self, path=None):
+        DB.__init__(self)
+        self.path = path
+        self.tables = {_: {} for _ in TABLE_KEYS}
+        self.week_contacts = defaultdict(dict)
+
+    async def connect(self):
+        if self.path and Path(self.path).exists():
+            load_memory_snapshot(self, self.path)
+
+    async def close(self):
+        if self.path:
+            dump_memory_snapshot(self, self.path)
+
+
+MemoryDB.get_chat = get_chat
+MemoryDB.put_chat = put_chat
+
+MemoryDB.get_user = get_user
+MemoryDB.read_users = read_users
+MemoryDB.put_users = put_users
+MemoryDB.delete_users = delete_users
+
+MemoryDB.get_contact = get_contact
+MemoryDB.read_contacts = read_contacts
+MemoryDB.read_week_contacts = read_week_contacts
+MemoryDB.read_weeks_contacts = read_weeks_contacts
+MemoryDB.put_contacts = put_contacts
+MemoryDB.delete_contacts = delete_contacts
+
+MemoryDB.read_manual_matches = read_manual_matches
+MemoryDB.put_manual_matches = put_manual_matches
+MemoryDB.delete_manual_matches = delete_manual_matches
+
+MemoryDB.get_pair = get_pair
+MemoryDB.read_pairs = read_pairs
+MemoryDB.put_pairs = put_pairs
+MemoryDB.delete_pairs = delete_pairs
+
+MemoryDB.read_weeks_report = read_weeks_report
+MemoryDB.put_weeks_report = put_weeks_report
+
+MemoryDB.read_participations = read_participations
+MemoryDB.put_participations = put_participations
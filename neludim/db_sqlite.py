@@ -0,0 +1,356 @@
+import json
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from .obj import (
+    Chat,
+    Contact,
+    User,
+    Match,
+    Pair,
+    Participation,
+)
+from .report import WeeksReportRecord
+from .const import (
+    CHATS_TABLE,
+    USERS_TABLE,
+    CONTACTS_TABLE,
+    MANUAL_MATCHES_TABLE,
+    PAIRS_TABLE,
+    WEEKS_REPORT_TABLE,
+    PARTICIPATIONS_TABLE,
+)
+from .dynamo import (
+    dynamo_deserialize_item,
+    dynamo_serialize_item,
+    dynamo_serialize_key,
+)
+from .db import DB
+
+
+# Same tables as in YDB, row = (key, item), item = JSON of
+# dynamo_serialize_item. Contacts also have week_index, user_id,
+# partner_user_id columns for indexes. Single connection is used
+# from single executor thread, sqlite3 is blocking
+
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS {CHATS_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+CREATE TABLE IF NOT EXISTS {USERS_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+CREATE TABLE IF NOT EXISTS {MANUAL_MATCHES_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+CREATE TABLE IF NOT EXISTS {PAIRS_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+CREATE TABLE IF NOT EXISTS {WEEKS_REPORT_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+CREATE TABLE IF NOT EXISTS {PARTICIPATIONS_TABLE} (key TEXT PRIMARY KEY, item TEXT);
+
+CREATE TABLE IF NOT EXISTS {CONTACTS_TABLE} (
+    key TEXT PRIMARY KEY,
+    week_index INTEGER,
+    user_id INTEGER,
+    partner_user_id INTEGER,
+    item TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_week_index ON {CONTACTS_TABLE} (week_index);
+CREATE INDEX IF NOT EXISTS contacts_user_ids ON {CONTACTS_TABLE} (user_id, partner_user_id);
+'''
+
+
+def sqlite_connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+######
+#
+#  OPS
+#
+#####
+
+
+def sqlite_get(conn, table, key):
+    row = conn.execute(
+        f'SELECT item FROM {table} WHERE key = ?',
+        (str(key),)
+    ).fetchone()
+    if row:
+        return json.loads(row[0])
+
+
+def sqlite_select(conn, table, where='', params=()):
+    rows = conn.execute(
+        f'SELECT item FROM {table} {where}',
+        params
+    )
+    return [json.loads(_) for _, in rows]
+
+
+def sqlite_put(conn, table, rows):
+    # row = (key, ..., item)
+    rows = [
+        (str(key), *values, json.dumps(item, ensure_ascii=False))
+        for key, *values, item in rows
+    ]
+    if not rows:
+        return
+
+    places = ', '.join('?' * len(rows[0]))
+    with conn:
+        conn.executemany(
+            f'INSERT OR REPLACE INTO {table} VALUES ({places})',
+            rows
+        )
+
+
+def sqlite_delete(conn, table, keys):
+    with conn:
+        conn.executemany(
+            f'DELETE FROM {table} WHERE key = ?',
+            [(str(_),) for _ in keys]
+        )
+
+
+def obj_key(obj):
+    return dynamo_serialize_key(obj.key)
+
+
+async def get_item(db, table, key, cls):
+    item = await db.run(sqlite_get, db.conn, table, key)
+    if item:
+        return dynamo_deserialize_item(item, cls)
+
+
+async def select_items(db, table, cls, where='', params=()):
+    items = await db.run(sqlite_select, db.conn, table, where, params)
+    return [dynamo_deserialize_item(_, cls) for _ in items]
+
+
+async def put_items(db, table, objs, key):
+    rows = [
+        (key(_), dynamo_serialize_item(_))
+        for _ in objs
+    ]
+    await db.run(sqlite_put, db.conn, table, rows)
+
+
+async def delete_items(db, table, keys):
+    await db.run(sqlite_delete, db.conn, table, list(keys))
+
+
+#######
+#
+#   CHATS
+#
+#######
+
+
+async def get_chat(db, id):
+    return await get_item(db, CHATS_TABLE, id, Chat)
+
+
+async def put_chat(db, chat):
+    await put_items(db, CHATS_TABLE, [chat], key=lambda _: _.id)
+
+
+######
+#
+#   USERS
+#
+#######
+
+
+async def get_user(db, user_id):
+    return await get_item(db, USERS_TABLE, user_id, User)
+
+
+async def read_users(db):
+    return await select_items(db, USERS_TABLE, User)
+
+
+async def put_users(db, users):
+    await put_items(db, USERS_TABLE, users, key=lambda _: _.user_id)
+
+
+async def delete_users(db, user_ids):
+    await delete_items(db, USERS_TABLE, user_ids)
+
+
+#######
+#
+#   CONTACTS
+#
+#####
+
+
+async def get_contact(db, key):
+    key = dynamo_serialize_key(key)
+    return await get_item(db, CONTACTS_TABLE, key, Contact)
+
+
+async def read_contacts(db):
+    return await select_items(db, CONTACTS_TABLE, Contact)
+
+
+async def read_week_contacts(db, week_index):
+    return await select_items(
+        db, CONTACTS_TABLE, Contact,
+        'WHERE week_index = ?', (week_index,)
+    )
+
+
+async def read_weeks_contacts(db, week_indexes):
+    week_indexes = list(week_indexes)
+    marks = ', '.join('?' for _ in week_indexes)
+    return await select_items(
+        db, CONTACTS_TABLE, Contact,
+        f'WHERE week_index IN ({marks})', week_indexes
+    )
+
+
+async def put_contacts(db, contacts):
+    rows = [
+        (
+            obj_key(_),
+            _.week_index, _.user_id, _.partner_user_id,
+            dynamo_serialize_item(_)
+        )
+        for _ in contacts
+    ]
+    await db.run(sqlite_put, db.conn, CONTACTS_TABLE, rows)
+
+
+async def delete_contacts(db, keys):
+    keys = (dynamo_serialize_key(_) for _ in keys)
+    await delete_items(db, CONTACTS_TABLE, keys)
+
+
+#######
+#
+#    MANUAL MATCHES
+#
+######
+
+
+async def read_manual_matches(db):
+    return await select_items(db, MANUAL_MATCHES_TABLE, Match)
+
+
+async def put_manual_matches(db, matches):
+    await put_items(db, MANUAL_MATCHES_TABLE, matches, key=obj_key)
+
+
+async def delete_manual_matches(db, keys):
+    keys = (dynamo_serialize_key(_) for _ in keys)
+    await delete_items(db, MANUAL_MATCHES_TABLE, keys)
+
+
+#######
+#
+#    PAIRS
+#
+######
+
+
+async def get_pair(db, key):
+    key = dynamo_serialize_key(key)
+    return await get_item(db, PAIRS_TABLE, key, Pair)
+
+
+async def read_pairs(db):
+    return await select_items(db, PAIRS_TABLE, Pair)
+
+
+async def put_pairs(db, pairs):
+    await put_items(db, PAIRS_TABLE, pairs, key=obj_key)
+
+
+async def delete_pairs(db, keys):
+    keys = (dynamo_serialize_key(_) for _ in keys)
+    await delete_items(db, PAIRS_TABLE, keys)
+
+
+#######
+#
+#    REPORTS
+#
+######
+
+
+async def read_weeks_report(db):
+    return await select_items(db, WEEKS_REPORT_TABLE, WeeksReportRecord)
+
+
+async def put_weeks_report(db, records):
+    await put_items(db, WEEKS_REPORT_TABLE, records, key=lambda _: _.week_index)
+
+
+async def read_participations(db):
+    return await select_items(db, PARTICIPATIONS_TABLE, Participation)
+
+
+async def put_participations(db, participations):
+    await put_items(db, PARTICIPATIONS_TABLE, participations, key=lambda _: _.user_id)
+
+
+######
+#
+#  DB
+#
+#######
+
+
+# Get/put/delete many are overriden, single item put_user,
+# get_chat_state etc are inherited from DB
+
+
+class SqliteDB(DB):
+    def __init__(self, path):
+        DB.__init__(self)
+        self.path = path
+        self.executor = None
+        self.conn = None
+
+    async def run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def connect(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.conn = await self.run(sqlite_connect, self.path)
+
+    async def close(self):
+        await self.run(self.conn.close)
+        self.executor.shutdown()
+
+
+SqliteDB.get_chat = get_chat
+SqliteDB.put_chat = put_chat
+
+SqliteDB.get_user = get_user
+SqliteDB.read_users = read_users
+SqliteDB.put_users = put_users
+SqliteDB.delete_users = delete_users
+
+SqliteDB.get_contact = get_contact
+SqliteDB.read_contacts = read_contacts
+SqliteDB.read_week_contacts = read_week_contacts
+SqliteDB.read_weeks_contacts = read_weeks_contacts
+SqliteDB.put_contacts = put_contacts
+SqliteDB.delete_contacts = delete_contacts
+
+SqliteDB.read_manual_matches = read_manual_matches
+SqliteDB.put_manual_matches = put_manual_matches
+SqliteDB.delete_manual_matches = delete_manual_matches
+
+SqliteDB.get_pair = get_pair
+SqliteDB.read_pairs = read_pairs
+SqliteDB.put_pairs = put_pairs
+SqliteDB.delete_pairs = delete_pairs
+
+SqliteDB.read_weeks_report = read_weeks_report
+SqliteDB.put_weeks_report = put_weeks_report
+
+SqliteDB.read_participations = read_participations
+SqliteDB.put_participations = put_participations
@@ -1,21 +1,31 @@
 
+import asyncio
+from time import perf_counter
 from dataclasses import is_dataclass
 from datetime import datetime as Datetime
 from contextlib import AsyncExitStack
 
-import aiobotocore.session
-
 from .const import (
     DYNAMO_ENDPOINT,
     AWS_KEY_ID,
     AWS_KEY,
 
-    N, S, M, SS
+    N, S, M, SS, NS
 )
 from .obj import obj_annots
+from .metrics import (
+    DYNAMO_SECONDS,
+    DYNAMO_CAPACITY_UNITS,
+)
+
 
+# aiobotocore + botocore take ~100ms to import, import on connect.
+# Codec, snapshots, SQLite and memory backends do not need them
+
+
+async def dynamo_client(endpoint=DYNAMO_ENDPOINT, key_id=AWS_KEY_ID, key=AWS_KEY):
+    import aiobotocore.session
 
-async def dynamo_client():
     session = aiobotocore.session.get_session()
     manager = session.create_client(
         'dynamodb',
@@ -24,17 +34,57 @@ async def dynamo_client():
         # https://cloud.yandex.ru/docs/ydb/docapi/tools/aws-setup
         region_name='ru-central1',
 
-        endpoint_url=DYNAMO_ENDPOINT,
-        aws_access_key_id=AWS_KEY_ID,
-        aws_secret_access_key=AWS_KEY,
+        endpoint_url=endpoint,
+        aws_access_key_id=key_id,
+        aws_secret_access_key=key,
     )
 
     # https://github.com/aio-libs/aiobotocore/discussions/955
     exit_stack = AsyncExitStack()
     client = await exit_stack.enter_async_context(manager)
+    instrument_dynamo_client(client)
     return exit_stack, client
 
 
+# Botocore events fire on every API call, including each Scan page
+# and BatchWriteItem retry. Context dict is shared by before and after
+# events of one call
+# https://boto3.amazonaws.com/v1/documentation/api/latest/guide/events.html
+
+
+CAPACITY_OPS = ['GetItem', 'PutItem', 'DeleteItem', 'Scan', 'BatchWriteItem']
+
+
+def dynamo_consumed_units(response):
+    capacity = response.get('ConsumedCapacity') or []
+    if isinstance(capacity, dict):
+        capacity = [capacity]
+    return sum(_.get('CapacityUnits', 0) for _ in capacity)
+
+
+def on_provide_params(params, **kwargs):
+    params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def on_before_call(model, context, **kwargs):
+    context['neludim_start'] = perf_counter()
+
+
+def on_after_call(parsed, model, context, **kwargs):
+    start = context.get('neludim_start')
+    if start:
+        DYNAMO_SECONDS.observe(perf_counter() - start, op=model.name)
+    DYNAMO_CAPACITY_UNITS.inc(dynamo_consumed_units(parsed), op=model.name)
+
+
+def instrument_dynamo_client(client):
+    events = client.meta.events
+    for op in CAPACITY_OPS:
+        events.register(f'provide-client-params.dynamodb.{op}', on_provide_params)
+    events.register('before-call.dynamodb', on_before_call)
+    events.register('after-call.dynamodb', on_after_call)
+
+
 ######
 #
 #  OPS
@@ -75,14 +125,27 @@ async def dynamo_delete(client, table, key_name, key_type, key_value):
     )
 
 
-async def dynamo_scan(client, table):
+async def dynamo_scan_pages(client, table, segment=None, total_segments=None):
+    kwargs = {}
+    if total_segments:
+        kwargs.update(
+            Segment=segment,
+            TotalSegments=total_segments
+        )
+
     pager = client.get_paginator('scan')
     responses = pager.paginate(
-        TableName=table
+        TableName=table,
+        **kwargs
     )
-    items = []
     async for response in responses:
-        items.extend(response['Items'])
+        yield response['Items']
+
+
+async def dynamo_scan(client, table):
+    items = []
+    async for page in dynamo_scan_pages(client, table):
+        items.extend(page)
     return items
 
 
@@ -97,39 +160,85 @@ def iter_batches(items, max_size=25):
         yield batch
 
 
+# On throttling BatchWriteItem returns part of requests as
+# UnprocessedItems, resend them with exponential backoff
+# https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Programming.Errors.html#Programming.Errors.BatchOperations
+
+
+class DynamoUnprocessedError(Exception):
+    pass
+
+
+async def dynamo_batch_write(client, table, requests, retries=8, delay=0.05):
+    request_items = {table: requests}
+    for attempt in range(retries + 1):
+        response = await client.batch_write_item(
+            RequestItems=request_items
+        )
+        request_items = response.get('UnprocessedItems')
+        if not request_items:
+            return
+
+        if attempt < retries:
+            await asyncio.sleep(delay * 2 ** attempt)
+
+    raise DynamoUnprocessedError(request_items)
+
+
 async def dynamo_batch_put(client, table, items):
     for batch in iter_batches(items):
-        await client.batch_write_item(
-            RequestItems={
-                table: [
-                    {
-                        'PutRequest': {
-                            'Item': _
-                        }
+        await dynamo_batch_write(
+            client, table,
+            [
+                {
+                    'PutRequest': {
+                        'Item': _
                     }
-                    for _ in batch
-                ]
-            }
+                }
+                for _ in batch
+            ]
         )
 
 
+# At most "concurrency" batch writes in flight, items are consumed
+# lazily, so memory is bounded for any input size
+
+
+async def dynamo_pipeline_put(client, table, items, concurrency=8):
+    pending = set()
+    try:
+        for batch in iter_batches(items):
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+
+            task = asyncio.create_task(dynamo_batch_put(client, table, batch))
+            pending.add(task)
+
+        await asyncio.gather(*pending)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+
+
 async def dynamo_batch_delete(client, table, key_name, key_type, key_values):
     for batch in iter_batches(key_values):
-        await client.batch_write_item(
-            RequestItems={
-                table: [
-                    {
-                        'DeleteRequest': {
-                            'Key': {
-                                key_name: {
-                                    key_type: str(_)
-                                }
+        await dynamo_batch_write(
+            client, table,
+            [
+                {
+                    'DeleteRequest': {
+                        'Key': {
+                            key_name: {
+                                key_type: str(_)
                             }
                         }
                     }
-                    for _ in batch
-                ]
-            }
+                }
+                for _ in batch
+            ]
         )
 
 
@@ -147,6 +256,8 @@ def dynamo_type(annot):
         return S
     elif annot == [str]:
         return SS
+    elif annot == [int]:
+        return NS
     elif is_dataclass(annot):
         return M
 
@@ -156,6 +267,9 @@ def dynamo_deserialize_value(value, annot):
         return int(value)
     elif annot in (str, [str]):
         return value
+    elif annot == [int]:
+        # NS is a set, YDB returns it in any order
+        return sorted(int(_) for _ in value)
     elif annot == Datetime:
         return Datetime.fromisoformat(value)
     elif is_dataclass(annot):
@@ -167,6 +281,8 @@ def dynamo_serialize_value(value, annot):
         return str(value)
     elif annot in (str, [str]):
         return value
+    elif annot == [int]:
+        return [str(_) for _ in value]
     elif annot == Datetime:
         return value.isoformat()
     elif is_dataclass(annot):
@@ -0,0 +1,278 @@
+import json
+import random
+import asyncio
+from zlib import crc32
+from bisect import bisect_right
+from functools import partial
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from aiohttp import web
+
+from .const import (
+    CHATS_TABLE,
+    CHATS_KEY,
+
+    USERS_TABLE,
+    USERS_KEY,
+
+    CONTACTS_TABLE,
+    CONTACTS_KEY,
+
+    MANUAL_MATCHES_TABLE,
+    MANUAL_MATCHES_KEY,
+
+    PAIRS_TABLE,
+    PAIRS_KEY,
+
+    WEEKS_REPORT_TABLE,
+    WEEKS_REPORT_KEY,
+
+    PARTICIPATIONS_TABLE,
+    PARTICIPATIONS_KEY,
+)
+
+
+# Subset of DynamoDB JSON API used by neludim.dynamo, for tests and
+# benchmarks without YDB. Tables are fixed, hash key only
+# https://docs.aws.amazon.com/amazondynamodb/latest/APIReference/Welcome.html
+
+
+TABLE_KEYS = {
+    CHATS_TABLE: CHATS_KEY,
+    USERS_TABLE: USERS_KEY,
+    CONTACTS_TABLE: CONTACTS_KEY,
+    MANUAL_MATCHES_TABLE: MANUAL_MATCHES_KEY,
+    PAIRS_TABLE: PAIRS_KEY,
+    WEEKS_REPORT_TABLE: WEEKS_REPORT_KEY,
+    PARTICIPATIONS_TABLE: PARTICIPATIONS_KEY,
+}
+
+ERROR_PREFIX = 'com.amazonaws.dynamodb.v20120810#'
+
+RESOURCE_NOT_FOUND = 'ResourceNotFoundException'
+THROUGHPUT_EXCEEDED = 'ProvisionedThroughputExceededException'
+UNKNOWN_OPERATION = 'UnknownOperationException'
+
+
+@dataclass
+class LocalTable:
+    key_name: str
+    items: dict = field(default_factory=dict)
+
+    # Scan pages are ordered by key. (segment, total segments) ->
+    # sorted keys, cached until next write
+    segments: dict = field(default_factory=dict)
+
+
+@dataclass
+class LocalDynamo:
+    # Seconds added to each request
+    latency: float = 0
+
+    # Probability to reject request with throughput error, for
+    # BatchWriteItem probability to return each write as unprocessed
+    throttle: float = 0
+
+    # Max items per Scan page, real limit is 1MB
+    page_size: int = 100
+
+    seed: int = 0
+
+    tables: dict = None
+
+    def __post_init__(self):
+        self.random = random.Random(self.seed)
+        if self.tables is None:
+            self.tables = {
+                table: LocalTable(key_name)
+                for table, key_name in TABLE_KEYS.items()
+            }
+
+
+class LocalDynamoError(Exception):
+    def __init__(self, type, message=''):
+        self.type = type
+        self.message = message
+
+
+def item_key(table, key):
+    value = key[table.key_name]
+    return json.dumps(value, sort_keys=True)
+
+
+def get_table(dynamo, name):
+    table = dynamo.tables.get(name)
+    if not table:
+        raise LocalDynamoError(RESOURCE_NOT_FOUND, f'table {name!r} not found')
+    return table
+
+
+def put_item(table, item):
+    table.items[item_key(table, item)] = item
+    table.segments.clear()
+
+
+def delete_item(table, key):
+    table.items.pop(item_key(table, key), None)
+    table.segments.clear()
+
+
+def segment_keys(table, segment, total_segments):
+    keys = table.segments.get((segment, total_segments))
+    if keys is None:
+        keys = sorted(
+            _ for _ in table.items
+            if crc32(_.encode('utf8')) % total_segments == segment
+        )
+        table.segments[segment, total_segments] = keys
+    return keys
+
+
+def throttled(dynamo):
+    return dynamo.throttle and dynamo.random.random() < dynamo.throttle
+
+
+######
+#
+#   OPS
+#
+######
+
+
+def get_item_op(dynamo, data):
+    table = get_table(dynamo, data['TableName'])
+    item = table.items.get(item_key(table, data['Key']))
+    if item:
+        return {'Item': item}
+    return {}
+
+
+def put_item_op(dynamo, data):
+    table = get_table(dynamo, data['TableName'])
+    put_item(table, data['Item'])
+    return {}
+
+
+def delete_item_op(dynamo, data):
+    table = get_table(dynamo, data['TableName'])
+    delete_item(table, data['Key'])
+    return {}
+
+
+def scan_op(dynamo, data):
+    table = get_table(dynamo, data['TableName'])
+    keys = segment_keys(
+        table,
+        data.get('Segment', 0),
+        data.get('TotalSegments', 1)
+    )
+
+    start = 0
+    if 'ExclusiveStartKey' in data:
+        start = bisect_right(keys, item_key(table, data['ExclusiveStartKey']))
+
+    limit = min(data.get('Limit', dynamo.page_size), dynamo.page_size)
+    page_keys = keys[start:start + limit]
+    items = [table.items[_] for _ in page_keys]
+
+    response = {
+        'Items': items,
+        'Count': len(items),
+        'ScannedCount': len(items),
+    }
+    if start + limit < len(keys):
+        response['LastEvaluatedKey'] = {
+            table.key_name: items[-1][table.key_name]
+        }
+    return response
+
+
+def batch_write_item_op(dynamo, data):
+    unprocessed = {}
+    for name, requests in data['RequestItems'].items():
+        table = get_table(dynamo, name)
+        for request in requests:
+            if throttled(dynamo):
+                unprocessed.setdefault(name, []).append(request)
+            elif 'PutRequest' in request:
+                put_item(table, request['PutRequest']['Item'])
+            else:
+                delete_item(table, request['DeleteRequest']['Key'])
+
+    return {'UnprocessedItems': unprocessed}
+
+
+OPS = {
+    'GetItem': get_item_op,
+    'PutItem': put_item_op,
+    'DeleteItem': delete_item_op,
+    'Scan': scan_op,
+    'BatchWriteItem': batch_write_item_op,
+}
+
+
+#####
+#
+#  APP
+#
+#####
+
+
+def json_response(data, status=200):
+    return web.Response(
+        status=status,
+        text=json.dumps(data),
+        content_type='application/x-amz-json-1.0'
+    )
+
+
+def error_response(error):
+    return json_response(
+        {
+            '__type': ERROR_PREFIX + error.type,
+            'message': error.message
+        },
+        status=400
+    )
+
+
+async def handle_request(dynamo, request):
+    if dynamo.latency:
+        await asyncio.sleep(dynamo.latency)
+
+    # X-Amz-Target: DynamoDB_20120810.GetItem
+    target = request.headers.get('X-Amz-Target', '')
+    _, _, name = target.partition('.')
+    data = await request.json()
+
+    try:
+        op = OPS.get(name)
+        if not op:
+            raise LocalDynamoError(UNKNOWN_OPERATION, target)
+
+        # Botocore retries throughput errors itself
+        if name != 'BatchWriteItem' and throttled(dynamo):
+            raise LocalDynamoError(THROUGHPUT_EXCEEDED)
+
+        return json_response(op(dynamo, data))
+    except LocalDynamoError as error:
+        return error_response(error)
+
+
+def build_app(dynamo):
+    app = web.Application()
+    app.add_routes([
+        web.post('/', partial(handle_request, dynamo))
+    ])
+    return app
+
+
+def start_server(dynamo, port):
+    web.run_app(
+        build_app(dynamo),
+        port=port,
+        print=None
+    )
@@ -1,15 +1,108 @@
-
-import logging
+import sys
 import json
+import queue
+import atexit
+import random
+import logging
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+)
+
+from .const import LOG_SAMPLE_RATE
+
+
+# Webhook and trigger start queue listener: event loop only puts
+# records in queue, listener thread formats JSON and writes all
+# records waiting in queue with one write, so burst of lines = one
+# syscall. CLI commands and tests write to stderr directly, no thread
+# https://docs.python.org/3/howto/logging-cookbook.html#dealing-with-handlers-that-block
+
+
+class JsonMsg(dict):
+    def __str__(self):
+        return json.dumps(self, ensure_ascii=False)
+
+
+def json_msg(**kwargs):
+    return JsonMsg(kwargs)
+
+
+class LazyQueueHandler(QueueHandler):
+    # Default prepare formats message in caller thread
+    def prepare(self, record):
+        return record
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    def __init__(self, queue, stream=None, max_size=100):
+        logging.StreamHandler.__init__(self, stream)
+        self.queue = queue
+        self.max_size = max_size
+        self.lines = []
+
+    def emit(self, record):
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+        if len(self.lines) >= self.max_size or self.queue.empty():
+            self.flush_lines()
+
+    def flush_lines(self):
+        if self.lines:
+            self.stream.write('\n'.join(self.lines) + '\n')
+            self.flush()
+            self.lines = []
+
+    def close(self):
+        self.flush_lines()
+        logging.StreamHandler.close(self)
+
+
+class SampleFilter(logging.Filter):
+    def __init__(self, rate):
+        logging.Filter.__init__(self)
+        self.rate = rate
+
+    def filter(self, record):
+        return self.rate >= 1 or random.random() < self.rate
 
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
-log.addHandler(logging.StreamHandler())
 
+stream_handler = logging.StreamHandler(sys.stderr)
+log.addHandler(stream_handler)
 
-def json_msg(**kwargs):
-    return json.dumps(
-        kwargs,
-        ensure_ascii=False
-    )
+
+def start_log_listener():
+    log_queue = queue.SimpleQueue()
+    batch_handler = BatchStreamHandler(log_queue, sys.stderr)
+    listener = QueueListener(log_queue, batch_handler)
+    queue_handler = LazyQueueHandler(log_queue)
+
+    listener.start()
+    log.removeHandler(stream_handler)
+    log.addHandler(queue_handler)
+
+    # Stop flushes lines left in queue. Called by entry point or at
+    # exit, whichever is first
+    def stop_log_listener():
+        atexit.unregister(stop_log_listener)
+        log.removeHandler(queue_handler)
+        log.addHandler(stream_handler)
+        listener.stop()
+
+        # Sentinel may land in queue while last record is emitted,
+        # then line is left in batch
+        batch_handler.close()
+
+    atexit.register(stop_log_listener)
+    return stop_log_listener
+
+
+# Line per Telegram update, LOG_SAMPLE_RATE share is kept
+update_log = log.getChild('updates')
+update_log.addFilter(SampleFilter(LOG_SAMPLE_RATE))
@@ -3,9 +3,10 @@
 # connected. Edges for users who met are removed. Edges have weight,
 # for example edge between users are from same city > edge between
 # diff cities, etc. Algo greedy connect users, first users with max
-# weight edge. Assume <100 users per week, OK to have O(N^2)
-# algo. Order of edges with same weight in random. Random order leads
-# to non optimal matches, simples examples with 4 participants:
+# weight edge. O(N^2) algo, OK for hundreds of users per week, for
+# more see gen_city_matches and neludim.bench.match. Order of edges
+# with same weight in random. Random order leads to non optimal
+# matches, simples examples with 4 participants:
 
 # A-B-C-D  (A-D, A-C, A-D, ... already met)
 
@@ -18,17 +19,26 @@
 
 
 import random
+from array import array
 from dataclasses import dataclass
 from collections import defaultdict
+from itertools import repeat
 
 from .obj import Match
+from .city import norm_city
+from .pair import (
+    sort2,
+    gen_pairs,
+    select_pairs,
+    pair_state,
+    pair_feedback_score,
+)
 from .const import (
     CONFIRM_STATE,
-    FAIL_STATE,
+    GREAT_SCORE,
 
-    BAD_SCORE,
-    OK_SCORE,
-    GREAT_SCORE
+    FLAT_STRATEGY,
+    CITY_STRATEGY,
 )
 
 
@@ -39,142 +49,198 @@ class SampleMatch:
     is_new: bool
 
 
-def gen_matches_sample(users, stats, current_week_index, seed=0):
+#######
+#
+#   INPUT
+#
+#####
+
+
+# Hot loop runs rounds * N^2 / 2 times. Convert users and stats once
+# to dense 0..N-1 indexes and int columns. Pair (i, j), i < j, is
+# packed to single int i * N + j. Inner loop touches only ints, no
+# dataclass attrs, no tuple keys.
+
+# Users are sorted by user_id, so index order = user_id order,
+# result does not depend on order of users from DB scan.
+
+
+@dataclass
+class MatchInput:
+    user_ids: array
+    cities: array
+    has_abouts: array
+
+    # packed pair -> True if repeat allowed, False if blocked. No key
+    # = new pair
+    repeats: dict
+    manual_keys: set
+
+    @property
+    def size(self):
+        return len(self.user_ids)
+
+
+NO_CITY = -1
+
+
+def match_input(users, stats, current_week_index):
     key_week_indexes, key_states, key_feedback_scores, manual_match_keys = stats
-    random.seed(seed)
 
-    def score_match(user, partner_user):
-        key = user.user_id, partner_user.user_id
+    users = sorted(users, key=lambda _: _.user_id)
+    size = len(users)
+    user_ids = array('q', (_.user_id for _ in users))
+    id_indexes = {_: index for index, _ in enumerate(user_ids)}
+
+    city_codes = {}
+    cities = array('i', (
+        city_codes.setdefault(_.city, len(city_codes)) if _.city else NO_CITY
+        for _ in users
+    ))
+    has_abouts = array('b', (
+        _.links is not None or _.about is not None
+        for _ in users
+    ))
+
+    def pack(key):
+        user_id, partner_user_id = key
+        index = id_indexes.get(user_id)
+        partner_index = id_indexes.get(partner_user_id)
+        if index is not None and partner_index is not None:
+            index, partner_index = sort2(index, partner_index)
+            return index * size + partner_index
+
+    repeats = {}
+    for key, week_index in key_week_indexes.items():
+        packed = pack(key)
+        if packed is None:
+            continue
 
         do_repeat = False
-        week_index = key_week_indexes.get(key)
-        if week_index is not None:
-            feedback_score = key_feedback_scores[key]
-            if (
-                    feedback_score == GREAT_SCORE
-                    and current_week_index - week_index > 8
-            ):
-                do_repeat = True
-
-            state = key_states[key]
-            if (
-                    state != CONFIRM_STATE
-                    and current_week_index - week_index > 4
-            ):
-                do_repeat = True
-
-            if not do_repeat:
-                return
-
-        is_manual_match = key in manual_match_keys
-
-        has_about = user.links is not None or user.about is not None
-        partner_has_about = partner_user.links is not None or partner_user.about is not None
-        match_about = (
-            has_about and partner_has_about
-            or not has_about and not partner_has_about
-        )
+        if (
+                key_feedback_scores[key] == GREAT_SCORE
+                and current_week_index - week_index > 8
+        ):
+            do_repeat = True
 
-        same_city = False
-        if user.city and partner_user.city:
-            same_city = user.city == partner_user.city
+        if (
+                key_states[key] != CONFIRM_STATE
+                and current_week_index - week_index > 4
+        ):
+            do_repeat = True
 
-        is_new = not do_repeat
-        return (
-            is_new,
-            is_manual_match,
-            same_city,
-            match_about,
+        repeats[packed] = do_repeat
+
+    manual_keys = {pack(_) for _ in manual_match_keys} - {None}
+    return MatchInput(user_ids, cities, has_abouts, repeats, manual_keys)
 
-            # shuffle same
-            random.random()
-        )
+
+#######
+#
+#   SAMPLE
+#
+######
+
+
+# Score (is_new, is_manual_match, same_city, match_about, random) is
+# packed to float 8 * is_new + 4 * is_manual_match + 2 * same_city +
+# match_about + random(), random in [0, 1) shuffles same. Own Random
+# per sample, no shared global state, cities may run in threads
+
+
+def gen_matches_sample(input, rng):
+    rand = rng.random
+
+    size = input.size
+    cities = input.cities
+    has_abouts = input.has_abouts
+    repeats = input.repeats
+    manual_keys = input.manual_keys
 
     score_keys = []
-    for user in users:
-        for partner_user in users:
-            if user.user_id >= partner_user.user_id:
+    for index in range(size):
+        city = cities[index]
+        has_about = has_abouts[index]
+        row = index * size
+
+        for partner_index in range(index + 1, size):
+            key = row + partner_index
+            do_repeat = repeats.get(key)
+            if do_repeat is False:
                 continue
 
-            score = score_match(user, partner_user)
-            if score:
-                key = user.user_id, partner_user.user_id
-                score_keys.append((score, key))
+            score = 8 if do_repeat is None else 0
+            if key in manual_keys:
+                score += 4
+            if city != NO_CITY and city == cities[partner_index]:
+                score += 2
+            if has_about == has_abouts[partner_index]:
+                score += 1
 
-    matched_user_ids = set()
-    for score, (user_id, partner_user_id) in sorted(score_keys, reverse=True):
-        if (
-                user_id in matched_user_ids
-                or partner_user_id in matched_user_ids
-        ):
-            continue
+            score_keys.append((score + rand(), key))
 
-        matched_user_ids.add(user_id)
-        matched_user_ids.add(partner_user_id)
+    score_keys.sort(reverse=True)
 
-        is_new, *_ = score
-        yield SampleMatch(user_id, partner_user_id, is_new)
+    user_ids = input.user_ids
+    matched = bytearray(size)
+    for score, key in score_keys:
+        index, partner_index = divmod(key, size)
+        if matched[index] or matched[partner_index]:
+            continue
 
+        matched[index] = 1
+        matched[partner_index] = 1
 
-def sort2(a, b):
-    if a > b:
-        return b, a
-    return a, b
+        is_new = score >= 8
+        yield SampleMatch(user_ids[index], user_ids[partner_index], is_new)
 
 
-def gen_matches(users, manual_matches=(), contacts=(), current_week_index=0, rounds=10):
-    key_contacts = defaultdict(list)
-    for contact in sorted(contacts, key=lambda _: _.week_index):
-        if contact.partner_user_id:
-            key = sort2(contact.user_id, contact.partner_user_id)
-            key_contacts[key].append(contact)
+def gen_stats(users, manual_matches=(), contacts=(), pairs=()):
+    user_ids = [_.user_id for _ in users]
+    pairs = select_pairs(gen_pairs(contacts, pairs), user_ids)
 
     key_week_indexes = {}
     key_states = {}
     key_feedback_scores = {}
-    for key, group in key_contacts.items():
-        key_week_indexes[key] = max(_.week_index for _ in group)
-
-        states = {_.state for _ in group}
-        for state in [CONFIRM_STATE, FAIL_STATE, None]:
-            if state in states:
-                key_states[key] = state
-                break
-
-        feedback_scores = {_.feedback_score for _ in group}
-        for feedback_score in [BAD_SCORE, OK_SCORE, GREAT_SCORE, None]:
-            if feedback_score in feedback_scores:
-                key_feedback_scores[key] = feedback_score
-                break
+    for pair in pairs:
+        key_week_indexes[pair.key] = pair.week_index
+        key_states[pair.key] = pair_state(pair)
+        key_feedback_scores[pair.key] = pair_feedback_score(pair)
 
     manual_match_keys = set()
     for match in manual_matches:
         key = sort2(match.user_id, match.partner_user_id)
         manual_match_keys.add(key)
 
-    stats = (key_week_indexes, key_states, key_feedback_scores, manual_match_keys)
+    return key_week_indexes, key_states, key_feedback_scores, manual_match_keys
 
-    def score_sample(matches):
-        matched_count = len(matches)
-        is_new_count = sum(_.is_new for _ in matches)
-        return (
-            matched_count,
-            is_new_count,
-            random.random()
-        )
 
+def score_sample(matches, rng):
+    matched_count = len(matches)
+    is_new_count = sum(_.is_new for _ in matches)
+    return (
+        matched_count,
+        is_new_count,
+        rng.random()
+    )
+
+
+def best_sample(input, rounds=10):
     score_samples = []
     for seed in range(rounds):
-        sample = list(gen_matches_sample(
-            users, stats,
-            current_week_index=current_week_index,
-            seed=seed
-        ))
-        score = score_sample(sample)
+        rng = random.Random(seed)
+        sample = list(gen_matches_sample(input, rng))
+        score = score_sample(sample, rng)
         score_samples.append((score, sample))
 
+    if not score_samples:
+        return []
+
     _, sample = max(score_samples)
+    return sample
+
 
+def gen_sample_matches(users, sample):
     matched_user_ids = set()
     for match in sample:
         user_id, partner_user_id = match.user_id, match.partner_user_id
@@ -185,3 +251,81 @@ def gen_matches(users, manual_matches=(), contacts=(), current_week_index=0, rou
     for user in users:
         if user.user_id not in matched_user_ids:
             yield Match(user.user_id, partner_user_id=None)
+
+
+def gen_matches(
+        users, manual_matches=(), contacts=(), pairs=(),
+        current_week_index=0, rounds=10
+):
+    stats = gen_stats(users, manual_matches, contacts, pairs)
+    input = match_input(users, stats, current_week_index)
+    sample = best_sample(input, rounds)
+    return gen_sample_matches(users, sample)
+
+
+#######
+#
+#   CITY
+#
+#####
+
+
+# Flat algo scores all N^2 pairs. Most pairs are cross city, same city
+# pairs score higher anyway. Split users by city, match inside each
+# city, new pairs only. Then match leftovers across cities, allow
+# repeats. Cost ~ sum of squared city sizes + squared leftovers.
+
+# Cities are independent, pass city_map=executor.map to solve them
+# in parallel, same result as plain map. Default is plain map, single
+# process in 256MB container.
+
+
+def city_buckets(users):
+    city_users = defaultdict(list)
+    for user in users:
+        city = norm_city(user.city) if user.city else None
+        city_users[city].append(user)
+    return city_users
+
+
+def solve_city(input, rounds):
+    sample = best_sample(input, rounds)
+    return [_ for _ in sample if _.is_new]
+
+
+def gen_city_matches(
+        users, manual_matches=(), contacts=(), pairs=(),
+        current_week_index=0, rounds=10, city_map=map
+):
+    stats = gen_stats(users, manual_matches, contacts, pairs)
+
+    city_users = city_buckets(users)
+    leftover_users = city_users.pop(None, [])
+    buckets = list(city_users.values())
+
+    sample = []
+    inputs = [
+        match_input(_, stats, current_week_index)
+        for _ in buckets
+    ]
+    city_samples = city_map(solve_city, inputs, repeat(rounds))
+    for bucket, city_sample in zip(buckets, city_samples):
+        matched_user_ids = set()
+        for match in city_sample:
+            matched_user_ids.add(match.user_id)
+            matched_user_ids.add(match.partner_user_id)
+        sample.extend(city_sample)
+        leftover_users.extend(
+            _ for _ in bucket
+            if _.user_id not in matched_user_ids
+        )
+
+    input = match_input(leftover_users, stats, current_week_index)
+    sample.extend(best_sample(input, rounds))
+    return gen_sample_matches(users, sample)
+
+
+STRATEGIES = {
+    FLAT_STRATEGY: gen_matches,
+    CITY_STRATEGY: gen_city_matches,
+}
@@ -0,0 +1,286 @@
+
+import hmac
+import asyncio
+import inspect
+from time import perf_counter
+from functools import wraps
+from contextvars import ContextVar
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from aiohttp import web
+
+
+######
+#
+#   REGISTRY
+#
+#####
+
+
+# In-process, since container start. Text format as in Prometheus
+# https://prometheus.io/docs/instrumenting/exposition_formats/
+
+
+SECONDS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+CALLS_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50]
+
+
+def labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key):
+    if not key:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in key)
+    return f'{{{pairs}}}'
+
+
+@dataclass
+class Counter:
+    name: str
+    values: dict = field(default_factory=dict)
+
+    type = 'counter'
+
+    def inc(self, value=1, **labels):
+        key = labels_key(labels)
+        self.values[key] = self.values.get(key, 0) + value
+
+    def value(self, **labels):
+        return self.values.get(labels_key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, value
+
+
+@dataclass
+class Gauge:
+    name: str
+    values: dict = field(default_factory=dict)
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self.values[labels_key(labels)] = value
+
+    def value(self, **labels):
+        return self.values.get(labels_key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, value
+
+
+@dataclass
+class HistogramSeries:
+    counts: list
+    sum: float = 0
+    count: int = 0
+
+
+@dataclass
+class Histogram:
+    name: str
+    buckets: list
+    series: dict = field(default_factory=dict)
+
+    type = 'histogram'
+
+    def observe(self, value, **labels):
+        key = labels_key(labels)
+        series = self.series.get(key)
+        if not series:
+            series = self.series[key] = HistogramSeries([0] * len(self.buckets))
+
+        series.sum += value
+        series.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.counts[index] += 1
+
+    def count(self, **labels):
+        series = self.series.get(labels_key(labels))
+        return series.count if series else 0
+
+    def samples(self):
+        for key, series in self.series.items():
+            for bound, count in zip(self.buckets, series.counts):
+                yield f'{self.name}_bucket', key + (('le', bound),), count
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), series.count
+            yield f'{self.name}_sum', key, series.sum
+            yield f'{self.name}_count', key, series.count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name):
+        return self.register(Counter(name))
+
+    def gauge(self, name):
+        return self.register(Gauge(name))
+
+    def histogram(self, name, buckets=SECONDS_BUCKETS):
+        return self.register(Histogram(name, buckets))
+
+
+def format_registry(registry):
+    for metric in registry.metrics:
+        yield f'# TYPE {metric.name} {metric.type}'
+        for name, key, value in metric.samples():
+            yield f'{name}{format_labels(key)} {value}'
+
+
+REGISTRY = Registry()
+
+UPDATE_SECONDS = REGISTRY.histogram('neludim_update_seconds')
+UPDATE_DB_SECONDS = REGISTRY.histogram('neludim_update_db_seconds')
+UPDATE_DB_CALLS = REGISTRY.histogram('neludim_update_db_calls', CALLS_BUCKETS)
+UPDATE_BOT_SECONDS = REGISTRY.histogram('neludim_update_bot_seconds')
+UPDATE_BOT_CALLS = REGISTRY.histogram('neludim_update_bot_calls', CALLS_BUCKETS)
+
+WEBHOOK_UPDATES = REGISTRY.counter('neludim_webhook_updates_total')
+WEBHOOK_INLINE_REPLIES = REGISTRY.counter('neludim_webhook_inline_replies_total')
+
+BROADCAST_SENDS = REGISTRY.counter('neludim_broadcast_sends_total')
+BROADCAST_ERRORS = REGISTRY.counter('neludim_broadcast_errors_total')
+
+DYNAMO_SECONDS = REGISTRY.histogram('neludim_dynamo_seconds')
+DYNAMO_CAPACITY_UNITS = REGISTRY.counter('neludim_dynamo_capacity_units_total')
+
+MATCH_SECONDS = REGISTRY.histogram('neludim_match_seconds')
+
+LOOP_LAG_SECONDS = REGISTRY.gauge('neludim_loop_lag_seconds')
+
+
+async def handle_metrics(request):
+    lines = format_registry(REGISTRY)
+    return web.Response(text='\n'.join(lines) + '\n')
+
+
+def check_metrics_token(request, token):
+    header = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(header, f'Bearer {token}'):
+        raise web.HTTPNotFound()
+
+
+######
+#
+#   LOOP LAG
+#
+#####
+
+
+# Sleep overshoot = how long loop was busy with other callbacks. Long
+# sync code in handler (matcher, pandas report) shows up here
+
+
+async def monitor_loop_lag(interval=1):
+    while True:
+        start = perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.set(perf_counter() - start - interval)
+
+
+async def loop_lag_ctx(app):
+    task = asyncio.create_task(monitor_loop_lag())
+    yield
+    task.cancel()
+
+
+#######
+#
+#   UPDATE STATS
+#
+######
+
+
+# One UpdateStats per Telegram update in context var, DB and Bot API
+# wrappers add to it. Tasks started by handler (neludim.aio.gather)
+# copy context, share same stats. Time of concurrent calls is summed
+
+
+@dataclass
+class UpdateStats:
+    start: float = field(default_factory=perf_counter)
+    db_calls: int = 0
+    db_time: float = 0
+    bot_calls: int = 0
+    bot_time: float = 0
+
+    @property
+    def total_time(self):
+        return perf_counter() - self.start
+
+
+UPDATE_STATS = ContextVar('update_stats', default=None)
+
+# DB.put_user calls DB.put_users, count outermost call only
+DB_CALL = ContextVar('db_call', default=False)
+
+
+def instrument_db_method(method):
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        stats = UPDATE_STATS.get()
+        if not stats or DB_CALL.get():
+            return await method(*args, **kwargs)
+
+        token = DB_CALL.set(True)
+        start = perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            stats.db_calls += 1
+            stats.db_time += perf_counter() - start
+            DB_CALL.reset(token)
+
+    return wrapper
+
+
+def wrap_db_methods(db, wrap):
+    for name, method in inspect.getmembers(db, inspect.iscoroutinefunction):
+        if name.startswith('_') or name in ('connect', 'close'):
+            continue
+        setattr(db, name, wrap(name, method))
+
+
+def instrument_db(db):
+    wrap_db_methods(db, lambda _, method: instrument_db_method(method))
+
+
+def instrument_bot(bot):
+    request = bot.request
+
+    @wraps(request)
+    async def wrapper(*args, **kwargs):
+        stats = UPDATE_STATS.get()
+        if not stats:
+            return await request(*args, **kwargs)
+
+        start = perf_counter()
+        try:
+            return await request(*args, **kwargs)
+        finally:
+            stats.bot_calls += 1
+            stats.bot_time += perf_counter() - start
+
+    bot.request = wrapper
+
+
+def observe_update_stats(stats, total_time):
+    UPDATE_SECONDS.observe(total_time)
+    UPDATE_DB_SECONDS.observe(stats.db_time)
+    UPDATE_DB_CALLS.observe(stats.db_calls)
+    UPDATE_BOT_SECONDS.observe(stats.bot_time)
+    UPDATE_BOT_CALLS.observe(stats.bot_calls)
@@ -68,3 +68,32 @@ class Match:
     @property
     def key(self):
         return (self.user_id, self.partner_user_id)
+
+
+@dataclass
+class Pair:
+    user_id: int
+    partner_user_id: int
+
+    week_index: int = None
+    state: str = None
+    feedback_score: str = None
+
+    # Weeks before week_index: last week, any confirm, worst
+    # feedback. None prev_week_index = first meeting
+    prev_week_index: int = None
+    prev_state: str = None
+    prev_feedback_score: str = None
+
+    @property
+    def key(self):
+        return (self.user_id, self.partner_user_id)
+
+
+@dataclass
+class Participation:
+    user_id: int
+
+    # Bitset, bit i = participated at week_index i. Hex, YDB number
+    # is limited to 38 digits
+    weeks: str = None
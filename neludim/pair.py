@@ -0,0 +1,162 @@
+# Pair history is a materialized view over contacts, one row per
+# sorted user pair. Matcher reads pairs instead of rebuilding same
+# stats from whole contacts history every week. Row has two parts:
+# last week contacts (week_index, state, feedback_score) and aggregate
+# of all earlier weeks (prev_*). Feedback may change confirm -> fail,
+# bad -> great, so last week part is recomputed from contacts, never
+# merged with old row value. Earlier weeks are closed, their aggregate
+# is a merge: any confirm, worst feedback
+
+from dataclasses import replace
+from collections import defaultdict
+
+from .obj import Pair
+from .const import (
+    CONFIRM_STATE,
+    FAIL_STATE,
+
+    BAD_SCORE,
+    OK_SCORE,
+    GREAT_SCORE
+)
+
+
+def sort2(a, b):
+    if a > b:
+        return b, a
+    return a, b
+
+
+# First present wins. Any confirm beats fail, any bad feedback beats
+# ok, etc
+
+
+STATES_ORDER = [CONFIRM_STATE, FAIL_STATE, None]
+FEEDBACK_SCORES_ORDER = [BAD_SCORE, OK_SCORE, GREAT_SCORE, None]
+
+
+def first_present(values, order):
+    for value in order:
+        if value in values:
+            return value
+
+
+def contact_pair(contact):
+    user_id, partner_user_id = sort2(contact.user_id, contact.partner_user_id)
+    return Pair(user_id, partner_user_id)
+
+
+def week_contacts_pair(contacts):
+    pair = contact_pair(contacts[0])
+    pair.week_index = contacts[0].week_index
+    pair.state = first_present(
+        {_.state for _ in contacts},
+        STATES_ORDER
+    )
+    pair.feedback_score = first_present(
+        {_.feedback_score for _ in contacts},
+        FEEDBACK_SCORES_ORDER
+    )
+    return pair
+
+
+def merge_pairs(pairs):
+    pair = replace(pairs[0])
+    pair.week_index = max(_.week_index for _ in pairs)
+    pair.state = first_present(
+        {_.state for _ in pairs},
+        STATES_ORDER
+    )
+    pair.feedback_score = first_present(
+        {_.feedback_score for _ in pairs},
+        FEEDBACK_SCORES_ORDER
+    )
+    return pair
+
+
+def split_pair(pair):
+    week_pair = Pair(
+        pair.user_id, pair.partner_user_id,
+        week_index=pair.week_index,
+        state=pair.state,
+        feedback_score=pair.feedback_score
+    )
+    prev_pair = None
+    if pair.prev_week_index is not None:
+        prev_pair = Pair(
+            pair.user_id, pair.partner_user_id,
+            week_index=pair.prev_week_index,
+            state=pair.prev_state,
+            feedback_score=pair.prev_feedback_score
+        )
+    return week_pair, prev_pair
+
+
+def join_pair(week_pair, prev_pairs):
+    pair = replace(week_pair)
+    if prev_pairs:
+        prev_pair = merge_pairs(prev_pairs)
+        pair.prev_week_index = prev_pair.week_index
+        pair.prev_state = prev_pair.state
+        pair.prev_feedback_score = prev_pair.feedback_score
+    return pair
+
+
+# Contacts override stored last week part of same week. Stored row
+# from later week keeps its last week part, contacts go to prev
+
+
+def gen_pairs(contacts, pairs=()):
+    key_week_contacts = defaultdict(lambda: defaultdict(list))
+    for contact in contacts:
+        if not contact.partner_user_id:
+            continue
+
+        key = sort2(contact.user_id, contact.partner_user_id)
+        key_week_contacts[key][contact.week_index].append(contact)
+
+    key_pairs = {_.key: _ for _ in pairs}
+    for key, week_contacts in key_week_contacts.items():
+        week_pairs = {
+            week_index: week_contacts_pair(group)
+            for week_index, group in week_contacts.items()
+        }
+        prev_pairs = []
+
+        pair = key_pairs.get(key)
+        if pair and pair.week_index is not None:
+            week_pair, prev_pair = split_pair(pair)
+            week_pairs.setdefault(week_pair.week_index, week_pair)
+            if prev_pair:
+                prev_pairs.append(prev_pair)
+
+        week_index = max(week_pairs)
+        week_pair = week_pairs.pop(week_index)
+        prev_pairs.extend(week_pairs.values())
+        key_pairs[key] = join_pair(week_pair, prev_pairs)
+
+    return list(key_pairs.values())
+
+
+# Matcher uses whole history: any confirm, worst feedback
+
+
+def pair_state(pair):
+    return first_present(
+        {pair.state, pair.prev_state},
+        STATES_ORDER
+    )
+
+
+def pair_feedback_score(pair):
+    return first_present(
+        {pair.feedback_score, pair.prev_feedback_score},
+        FEEDBACK_SCORES_ORDER
+    )
+
+
+def select_pairs(pairs, user_ids):
+    user_ids = set(user_ids)
+    for pair in pairs:
+        if pair.user_id in user_ids and pair.partner_user_id in user_ids:
+            yield pair
@@ -0,0 +1,142 @@
+import pstats
+import cProfile
+import tracemalloc
+from time import perf_counter
+from dataclasses import (
+    dataclass,
+    asdict,
+)
+
+from .log import (
+    log,
+    json_msg,
+)
+
+
+# cProfile sees every coroutine running in the thread while op awaits,
+# trigger runs one task at a time so it is op. tracemalloc slows
+# allocations ~2x, opt-in only
+# https://docs.python.org/3/library/profile.html
+# https://docs.python.org/3/library/tracemalloc.html
+
+
+@dataclass
+class FunctionRecord:
+    function: str
+    calls: int
+    self_ms: float
+    cumul_ms: float
+
+
+@dataclass
+class AllocRecord:
+    line: str
+    size_kb: float
+    count: int
+
+
+@dataclass
+class OpProfile:
+    name: str
+    wall: float
+    peak_kb: float
+    functions: list
+    allocs: list
+
+
+# Event loop frames wrap everything, idle wait in epoll is in
+# wall - cumul of op
+
+
+LOOP_FUNCTIONS = ['/asyncio/', 'selectors.py', "'poll' of 'select"]
+
+
+def loop_function(path, name):
+    return any(
+        _ in path or _ in name
+        for _ in LOOP_FUNCTIONS
+    )
+
+
+def top_functions(profiler, top):
+    stats = pstats.Stats(profiler)
+    rows = [
+        _ for _ in stats.stats.items()
+        if not loop_function(_[0][0], _[0][2])
+    ]
+    rows.sort(
+        key=lambda _: _[1][3],  # cumulative time
+        reverse=True
+    )
+    for (path, line, name), (_, calls, self_time, cumul_time, _) in rows[:top]:
+        yield FunctionRecord(
+            function=f'{path}:{line}({name})',
+            calls=calls,
+            self_ms=round(self_time * 1000, 1),
+            cumul_ms=round(cumul_time * 1000, 1)
+        )
+
+
+def top_allocs(snapshot, top):
+    for stat in snapshot.statistics('lineno')[:top]:
+        frame = stat.traceback[0]
+        yield AllocRecord(
+            line=f'{frame.filename}:{frame.lineno}',
+            size_kb=round(stat.size / 1024, 1),
+            count=stat.count
+        )
+
+
+async def profile_op(op, context, top=20):
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+
+    start = perf_counter()
+    profiler.enable()
+    try:
+        await op(context)
+    finally:
+        profiler.disable()
+        wall = perf_counter() - start
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return OpProfile(
+        name=op.__name__,
+        wall=wall,
+        peak_kb=round(peak / 1024, 1),
+        functions=list(top_functions(profiler, top)),
+        allocs=list(top_allocs(snapshot, top))
+    )
+
+
+def log_op_profile(profile):
+    log.info(json_msg(
+        task=profile.name,
+        wall_ms=round(profile.wall * 1000, 1),
+        peak_kb=profile.peak_kb,
+    ))
+    log.info(json_msg(
+        task=profile.name,
+        functions=[asdict(_) for _ in profile.functions]
+    ))
+    log.info(json_msg(
+        task=profile.name,
+        allocs=[asdict(_) for _ in profile.allocs]
+    ))
+
+
+def format_op_profile(profile):
+    yield f'{profile.name}: wall {profile.wall * 1000:.0f}ms, peak {profile.peak_kb / 1024:.1f}mb'
+
+    yield ''
+    yield '  calls  self ms  cumul ms  function'
+    for record in profile.functions:
+        yield f'{record.calls:>7} {record.self_ms:>8.1f} {record.cumul_ms:>9.1f}  {record.function}'
+
+    yield ''
+    yield '  size kb   count  line'
+    for record in profile.allocs:
+        yield f'{record.size_kb:>9.1f} {record.count:>7}  {record.line}'
@@ -0,0 +1,182 @@
+from time import perf_counter
+from itertools import groupby
+from dataclasses import dataclass
+
+from .obj import Match
+from .city import norm_city
+from .pair import (
+    sort2,
+    gen_pairs,
+    select_pairs,
+)
+
+
+#######
+#
+#   QUALITY
+#
+#####
+
+
+@dataclass
+class MatchQuality:
+    users: int = 0
+    matched: int = 0
+    unmatched: int = 0
+
+    repeats: int = 0
+    same_city: int = 0
+    about_match: int = 0
+
+    manual: int = 0
+    manual_satisfied: int = 0
+
+    time: float = None
+
+    @property
+    def pairs(self):
+        return self.matched // 2
+
+    @property
+    def same_city_rate(self):
+        if self.pairs:
+            return self.same_city / self.pairs
+
+    @property
+    def about_match_rate(self):
+        if self.pairs:
+            return self.about_match / self.pairs
+
+
+def has_about(user):
+    return user.links is not None or user.about is not None
+
+
+def same_city(user, partner_user):
+    return bool(
+        user.city and partner_user.city
+        and norm_city(user.city) == norm_city(partner_user.city)
+    )
+
+
+def eval_matches(matches, users, pairs=(), manual_matches=()):
+    id_users = {_.user_id: _ for _ in users}
+    pair_keys = {_.key for _ in pairs}
+
+    quality = MatchQuality(users=len(id_users))
+    match_keys = set()
+    for match in matches:
+        if not match.partner_user_id:
+            quality.unmatched += 1
+            continue
+
+        key = sort2(*match.key)
+        match_keys.add(key)
+        quality.matched += 2
+
+        user = id_users[match.user_id]
+        partner_user = id_users[match.partner_user_id]
+
+        if key in pair_keys:
+            quality.repeats += 1
+        if same_city(user, partner_user):
+            quality.same_city += 1
+        if has_about(user) == has_about(partner_user):
+            quality.about_match += 1
+
+    manual_match_keys = {
+        sort2(*_.key) for _ in manual_matches
+        if _.user_id in id_users and _.partner_user_id in id_users
+    }
+    quality.manual = len(manual_match_keys)
+    quality.manual_satisfied = len(manual_match_keys & match_keys)
+
+    return quality
+
+
+#######
+#
+#   REPLAY
+#
+######
+
+
+def contacts_matches(contacts):
+    keys = set()
+    for contact in contacts:
+        if not contact.partner_user_id:
+            yield Match(contact.user_id, partner_user_id=None)
+            continue
+
+        key = sort2(contact.user_id, contact.partner_user_id)
+        if key not in keys:
+            keys.add(key)
+            yield Match(*key)
+
+
+# Replay week W: participants = users with contact at W, history =
+# pairs from contacts before W. "actual" = matches made that week in
+# prod
+
+
+ACTUAL = 'actual'
+
+
+def replay_weeks(users, contacts, manual_matches, strategies, week_indexes=None, rounds=10):
+    id_users = {_.user_id: _ for _ in users}
+    contacts = sorted(contacts, key=lambda _: _.week_index)
+
+    pairs = []
+    for week_index, week_contacts in groupby(contacts, key=lambda _: _.week_index):
+        week_contacts = [
+            _ for _ in week_contacts
+            if _.user_id in id_users
+            and (not _.partner_user_id or _.partner_user_id in id_users)
+        ]
+
+        if week_indexes is None or week_index in week_indexes:
+            week_users = [id_users[_.user_id] for _ in week_contacts]
+            week_pairs = list(select_pairs(pairs, id_users))
+
+            matches = list(contacts_matches(week_contacts))
+            quality = eval_matches(matches, week_users, week_pairs, manual_matches)
+            yield week_index, ACTUAL, quality
+
+            for name, strategy in strategies.items():
+                start = perf_counter()
+                matches = list(strategy(
+                    week_users,
+                    manual_matches=manual_matches,
+                    pairs=week_pairs,
+                    current_week_index=week_index,
+                    rounds=rounds
+                ))
+                time = perf_counter() - start
+
+                quality = eval_matches(matches, week_users, week_pairs, manual_matches)
+                quality.time = time
+                yield week_index, name, quality
+
+        pairs = gen_pairs(week_contacts, pairs)
+
+
+def format_rate(value):
+    if value is None:
+        return '-'
+    return f'{value:.0%}'
+
+
+def format_replay(rows):
+    yield ' week strategy     time  users unmatch repeat  city  about  manual'
+    for week_index, name, quality in rows:
+        time = '-'
+        if quality.time is not None:
+            time = f'{quality.time:.2f}'
+        manual = f'{quality.manual_satisfied}/{quality.manual}'
+
+        yield (
+            f'{week_index:>5} {name:<8} {time:>8} '
+            f'{quality.users:>6} {quality.unmatched:>7} {quality.repeats:>6} '
+            f'{format_rate(quality.same_city_rate):>5} {format_rate(quality.about_match_rate):>6} '
+            f'{manual:>7}'
+        )
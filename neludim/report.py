@@ -1,9 +1,14 @@
 
-from dataclasses import dataclass
+import csv
+from io import StringIO
+from dataclasses import (
+    dataclass,
+    asdict,
+)
 from collections import defaultdict
 from itertools import groupby
-from copy import deepcopy
 
+from .obj import Participation
 from .text import user_mention
 from .const import (
     CONFIRM_STATE,
@@ -24,6 +29,46 @@ def report_text(lines, html=False):
     return text
 
 
+# https://core.telegram.org/bots/api#sendmessage "Text of the message
+# to be sent, 1-4096 characters after entities parsing". <pre> is
+# entity, not counted. Split by lines, stream pages. Line may have
+# user_mention markup, cut in the middle of tag fails whole page, too
+# long line is dropped whole
+
+
+def report_pages(lines, html=False, max_size=4096):
+    page = []
+    size = 0
+    for line in lines:
+        if len(line) > max_size:
+            line = '…'
+        if page and size + 1 + len(line) > max_size:
+            yield report_text(page, html)
+            page = []
+            size = 0
+
+        size += len(line) + bool(page)
+        page.append(line)
+
+    yield report_text(page, html)
+
+
+def records_csv(records, exclude=()):
+    file = StringIO()
+    writer = None
+    for record in records:
+        row = {
+            key: value
+            for key, value in asdict(record).items()
+            if key not in exclude
+        }
+        if not writer:
+            writer = csv.DictWriter(file, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+    return file.getvalue()
+
+
 #######
 #
 #   MATCH REPORT
@@ -47,22 +92,24 @@ def sort2(a, b):
     return a, b
 
 
-def gen_match_report(week_contacts, prev_contacts, manual_matches):
+def contact_keys(contacts):
+    for contact in contacts:
+        yield sort2(contact.user_id, contact.partner_user_id)
+
+
+def manual_match_keys(manual_matches):
+    return {
+        sort2(_.user_id, _.partner_user_id)
+        for _ in manual_matches
+    }
+
+
+def match_report_records(week_contacts, prev_contact_keys, manual_match_keys):
     key_groups = defaultdict(list)
     for contact in week_contacts:
         key = sort2(contact.user_id, contact.partner_user_id)
         key_groups[key].append(contact)
 
-    prev_contact_keys = set()
-    for contact in prev_contacts:
-        key = sort2(contact.user_id, contact.partner_user_id)
-        prev_contact_keys.add(key)
-
-    manual_match_keys = set()
-    for match in manual_matches:
-        key = sort2(match.user_id, match.partner_user_id)
-        manual_match_keys.add(key)
-
     def order(key):
         group = key_groups[key]
         no_partner = len(group) == 1
@@ -101,6 +148,26 @@ def gen_match_report(week_contacts, prev_contacts, manual_matches):
             )
 
 
+def gen_match_report(week_contacts, prev_contacts, manual_matches):
+    return match_report_records(
+        week_contacts,
+        prev_contact_keys=set(contact_keys(prev_contacts)),
+        manual_match_keys=manual_match_keys(manual_matches)
+    )
+
+
+# Repeat = pair met before report week. Keys come from pairs table
+# prev_week_index, no contacts history scan
+
+
+def gen_week_match_reports(contacts, manual_matches, repeat_keys, week_indexes):
+    match_keys = manual_match_keys(manual_matches)
+    for week_index in week_indexes:
+        group = [_ for _ in contacts if _.week_index == week_index]
+        records = list(match_report_records(group, repeat_keys, match_keys))
+        yield week_index, records
+
+
 def format_match_report(records, id_users):
     for index, record in enumerate(records):
         user = id_users[record.user_id]
@@ -162,86 +229,136 @@ class WeeksReportRecord:
     bad_feedback: int = 0
     none_feedback: int = 0
 
+    # Persisted with record. Seen users = union over previous
+    # weeks, no need to rescan history
+    first_time_user_ids: [int] = None
 
-def propogate_contact_states(contacts):
-    key_groups = defaultdict(list)
+
+# Partners may disagree: one says confirm, other fail. Resolve state
+# per pair, return mapping pair key -> state, do not mutate contacts
+
+
+def contact_key_states(contacts):
+    key_states = defaultdict(set)
     for contact in contacts:
         if contact.partner_user_id:
             key = sort2(contact.user_id, contact.partner_user_id)
-            key_groups[key].append(contact)
-
-    for group in key_groups.values():
-        states = {_.state for _ in group if _.state}
+            states = key_states[key]
+            if contact.state:
+                states.add(contact.state)
 
-        if states:
-            if FAIL_STATE in states and CONFIRM_STATE in states:
-                state = None
-            elif CONFIRM_STATE in states:
-                state = CONFIRM_STATE
-            elif FAIL_STATE in states:
-                state = FAIL_STATE
+    for key, states in key_states.items():
+        if FAIL_STATE in states and CONFIRM_STATE in states:
+            state = None
+        elif CONFIRM_STATE in states:
+            state = CONFIRM_STATE
+        elif FAIL_STATE in states:
+            state = FAIL_STATE
         else:
             state = None
+        key_states[key] = state
 
-        for contact in group:
-            contact.state = state
+    return key_states
 
 
-def gen_weeks_report(contacts):
-    seen_user_ids = set()
+def week_report_record(week_index, week_contacts, seen_user_ids):
+    week_contacts = list(week_contacts)
+    key_states = contact_key_states(week_contacts)
+
+    user_ids = set()
+    no_partner_user_ids = set()
+    user_id_states = {}
+    user_id_feedback_scores = {}
+    for contact in week_contacts:
+        user_ids.add(contact.user_id)
+        if not contact.partner_user_id:
+            no_partner_user_ids.add(contact.user_id)
+        else:
+            key = sort2(contact.user_id, contact.partner_user_id)
+            state = key_states[key]
+            if state:
+                user_id_states[contact.user_id] = state
+            if contact.feedback_score:
+                user_id_feedback_scores[contact.user_id] = contact.feedback_score
+
+    record = WeeksReportRecord(week_index)
+    first_time_user_ids = []
+    for user_id in user_ids:
+        record.total += 1
+        if user_id not in seen_user_ids:
+            record.first_time += 1
+            first_time_user_ids.append(user_id)
+
+        if user_id in no_partner_user_ids:
+            record.no_partner += 1
+        else:
+
+            state = user_id_states.get(user_id)
+            if state is None:
+                record.none_state += 1
+            elif state == CONFIRM_STATE:
+                record.confirm_state += 1
+            elif state == FAIL_STATE:
+                record.fail_state += 1
+
+            feedback_score = user_id_feedback_scores.get(user_id)
+            if state == CONFIRM_STATE:
+                if feedback_score is None:
+                    record.none_feedback += 1
+                elif feedback_score == GREAT_SCORE:
+                    record.great_feedback += 1
+                elif feedback_score == OK_SCORE:
+                    record.ok_feedback += 1
+                elif feedback_score == BAD_SCORE:
+                    record.bad_feedback += 1
+
+    if first_time_user_ids:
+        record.first_time_user_ids = sorted(first_time_user_ids)
+
+    return record
+
+
+def gen_weeks_report(contacts, seen_user_ids=()):
+    seen_user_ids = set(seen_user_ids)
 
     contacts = sorted(contacts, key=lambda _: _.week_index)
     for week_index, week_contacts in groupby(contacts, key=lambda _: _.week_index):
-        week_contacts = deepcopy(list(week_contacts))
-        propogate_contact_states(week_contacts)
-
-        user_ids = set()
-        no_partner_user_ids = set()
-        user_id_states = {}
-        user_id_feedback_scores = {}
-        for contact in week_contacts:
-            user_ids.add(contact.user_id)
-            if not contact.partner_user_id:
-                no_partner_user_ids.add(contact.user_id)
-            else:
-                if contact.state:
-                    user_id_states[contact.user_id] = contact.state
-                if contact.feedback_score:
-                    user_id_feedback_scores[contact.user_id] = contact.feedback_score
-
-        record = WeeksReportRecord(week_index)
-        for user_id in user_ids:
-            record.total += 1
-            if user_id not in seen_user_ids:
-                record.first_time += 1
-
-            if user_id in no_partner_user_ids:
-                record.no_partner += 1
-            else:
-
-                state = user_id_states.get(user_id)
-                if state is None:
-                    record.none_state += 1
-                elif state == CONFIRM_STATE:
-                    record.confirm_state += 1
-                elif state == FAIL_STATE:
-                    record.fail_state += 1
-
-                feedback_score = user_id_feedback_scores.get(user_id)
-                if state == CONFIRM_STATE:
-                    if feedback_score is None:
-                        record.none_feedback += 1
-                    elif feedback_score == GREAT_SCORE:
-                        record.great_feedback += 1
-                    elif feedback_score == OK_SCORE:
-                        record.ok_feedback += 1
-                    elif feedback_score == BAD_SCORE:
-                        record.bad_feedback += 1
-
-        seen_user_ids.update(user_ids)
+        record = week_report_record(week_index, week_contacts, seen_user_ids)
+        seen_user_ids.update(record.first_time_user_ids or ())
         yield record
 
 
+# Stored records for weeks < start_week_index are final, recompute
+# only newer weeks. Feedback for week W is asked on W saturday, late
+# answers come during next weeks. Start well before current week
+
+
+REPORT_OPEN_WEEKS = 3
+
+
+def weeks_report_start(records, current_week_index):
+    start_week_index = current_week_index - REPORT_OPEN_WEEKS + 1
+    if records:
+        week_index = max(_.week_index for _ in records) + 1
+        return min(start_week_index, week_index)
+
+
+def update_weeks_report(records, contacts, start_week_index=None):
+    if start_week_index is None:
+        records = []
+    else:
+        records = [_ for _ in records if _.week_index < start_week_index]
+        contacts = [_ for _ in contacts if _.week_index >= start_week_index]
+
+    seen_user_ids = set()
+    for record in records:
+        seen_user_ids.update(record.first_time_user_ids or ())
+
+    updates = list(gen_weeks_report(contacts, seen_user_ids))
+    records = sorted(records, key=lambda _: _.week_index) + updates
+    return records, updates
+
+
 def format_weeks_report(records):
     for index, _ in enumerate(records):
         if index % 12 == 0:
@@ -252,3 +369,89 @@ def format_weeks_report(records):
             f'{_.confirm_state:>2} {_.fail_state:>2} {_.none_state:>2}  '
             f'{_.great_feedback + _.ok_feedback:>2} {_.bad_feedback:>2} {_.none_feedback:>2}'
         )
+
+
+######
+#
+#   COHORT REPORT
+#
+####
+
+
+# Per user bitset, bit i = participated at week i. Bits are OR-ed for
+# recomputed weeks, same window as weeks report, so bitsets are
+# maintained incrementally. Triangle is built from bitsets, no
+# contacts scan
+
+
+def participation_bits(participation):
+    return int(participation.weeks, 16)
+
+
+def update_participations(participations, contacts, start_week_index=None):
+    user_bits = {}
+    if start_week_index is not None:
+        user_bits = {
+            _.user_id: participation_bits(_)
+            for _ in participations
+        }
+        contacts = [_ for _ in contacts if _.week_index >= start_week_index]
+
+    updated_user_ids = set()
+    for contact in contacts:
+        bits = user_bits.get(contact.user_id, 0)
+        updated_bits = bits | (1 << contact.week_index)
+        if updated_bits != bits:
+            user_bits[contact.user_id] = updated_bits
+            updated_user_ids.add(contact.user_id)
+
+    participations = [
+        Participation(user_id, weeks=f'{bits:x}')
+        for user_id, bits in user_bits.items()
+    ]
+    updates = [_ for _ in participations if _.user_id in updated_user_ids]
+    return participations, updates
+
+
+@dataclass
+class CohortReportRecord:
+    week_index: int
+    size: int
+
+    # retained[k] = users from cohort who participated at week_index + k
+    retained: list
+
+
+def gen_cohort_report(participations, current_week_index):
+    cohort_bits = defaultdict(list)
+    for participation in participations:
+        bits = participation_bits(participation)
+        if bits:
+            week_index = (bits & -bits).bit_length() - 1
+            cohort_bits[week_index].append(bits)
+
+    for week_index in sorted(cohort_bits):
+        group = cohort_bits[week_index]
+        retained = [0] * max(current_week_index - week_index + 1, 1)
+        for bits in group:
+            bits >>= week_index
+            while bits:
+                low = bits & -bits
+                offset = low.bit_length() - 1
+                if offset < len(retained):
+                    retained[offset] += 1
+                bits ^= low
+
+        yield CohortReportRecord(week_index, len(group), retained)
+
+
+def format_cohort_report(records, max_cohorts=12, max_offset=8):
+    records = list(records)[-max_cohorts:]
+    header = '   W   N' + ''.join(f' {f"+{_}":>3}' for _ in range(1, max_offset + 1))
+    yield header
+
+    for record in records:
+        line = f'{record.week_index:>4} {record.size:>3}'
+        for count in record.retained[1:max_offset + 1]:
+            line += f' {count * 100 // record.size:>3}'
+        yield line
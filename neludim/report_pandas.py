@@ -0,0 +1,227 @@
+# Columnar version of neludim.report generators. Contacts are loaded
+# into DataFrame once, records computed with groupby. Output is same
+# as gen_weeks_report, gen_match_report. Pandas is dev dependency,
+# import this module only when pandas is installed.
+
+import numpy as np
+import pandas as pd
+
+from .report import (
+    WeeksReportRecord,
+    MatchReportRecord,
+)
+from .const import (
+    CONFIRM_STATE,
+    FAIL_STATE,
+
+    GREAT_SCORE,
+    OK_SCORE,
+    BAD_SCORE,
+)
+
+
+# partner_user_id=None -> 0. Same as "if contact.partner_user_id"
+# checks in neludim.report
+
+
+def contacts_frame(contacts):
+    return pd.DataFrame({
+        'week_index': np.array([_.week_index for _ in contacts], dtype=np.int64),
+        'user_id': np.array([_.user_id for _ in contacts], dtype=np.int64),
+        'partner_user_id': np.array([_.partner_user_id or 0 for _ in contacts], dtype=np.int64),
+        'state': pd.Series([_.state for _ in contacts], dtype=object),
+        'feedback_score': pd.Series([_.feedback_score for _ in contacts], dtype=object),
+    })
+
+
+def matches_frame(matches):
+    return pd.DataFrame({
+        'user_id': np.array([_.user_id for _ in matches], dtype=np.int64),
+        'partner_user_id': np.array([_.partner_user_id or 0 for _ in matches], dtype=np.int64),
+    })
+
+
+def null_value(value):
+    if isinstance(value, str):
+        return value
+
+
+#######
+#
+#   WEEKS REPORT
+#
+#######
+
+
+def gen_weeks_report(contacts, seen_user_ids=()):
+    df = contacts_frame(contacts)
+    return gen_frame_weeks_report(df, seen_user_ids)
+
+
+def gen_frame_weeks_report(df, seen_user_ids=()):
+    if df.empty:
+        return
+
+    has_partner = df.partner_user_id != 0
+    pairs = df[has_partner].assign(
+        key_a=np.minimum(df.user_id, df.partner_user_id),
+        key_b=np.maximum(df.user_id, df.partner_user_id),
+        confirm=df.state == CONFIRM_STATE,
+        fail=df.state == FAIL_STATE,
+    )
+    groups = pairs.groupby(['week_index', 'key_a', 'key_b'])
+    confirm = groups.confirm.transform('any')
+    fail = groups.fail.transform('any')
+    pairs['state'] = np.where(
+        confirm & ~fail, CONFIRM_STATE,
+        np.where(fail & ~confirm, FAIL_STATE, None)
+    )
+
+    # Last non null value per user, same as dict overwrite in
+    # week_report_record
+    user_pairs = (
+        pairs
+        .groupby(['week_index', 'user_id'])[['state', 'feedback_score']]
+        .last()
+    )
+
+    no_partner = (
+        df[~has_partner][['week_index', 'user_id']]
+        .drop_duplicates()
+        .assign(no_partner=True)
+        .set_index(['week_index', 'user_id'])
+    )
+
+    users = (
+        df[['week_index', 'user_id']]
+        .drop_duplicates()
+        .set_index(['week_index', 'user_id'])
+        .join(user_pairs)
+        .join(no_partner)
+        .reset_index()
+    )
+    users['no_partner'] = users.no_partner.fillna(False).astype(bool)
+
+    first_week_index = users.groupby('user_id').week_index.transform('min')
+    users['first_time'] = (
+        (users.week_index == first_week_index)
+        & ~users.user_id.isin(list(seen_user_ids))
+    )
+
+    partnered = ~users.no_partner
+    state = users.state
+    confirmed = partnered & (state == CONFIRM_STATE)
+    feedback_score = users.feedback_score
+    counts = pd.DataFrame({
+        'week_index': users.week_index,
+        'total': 1,
+        'first_time': users.first_time,
+        'no_partner': users.no_partner,
+
+        'confirm_state': confirmed,
+        'fail_state': partnered & (state == FAIL_STATE),
+        'none_state': partnered & state.isna(),
+
+        'great_feedback': confirmed & (feedback_score == GREAT_SCORE),
+        'ok_feedback': confirmed & (feedback_score == OK_SCORE),
+        'bad_feedback': confirmed & (feedback_score == BAD_SCORE),
+        'none_feedback': confirmed & feedback_score.isna(),
+    })
+    counts = counts.groupby('week_index').sum()
+
+    first_time_user_ids = (
+        users[users.first_time]
+        .groupby('week_index')
+        .user_id
+        .agg(lambda _: sorted(int(__) for __ in _))
+    )
+
+    for week_index, row in counts.iterrows():
+        record = WeeksReportRecord(
+            week_index=int(week_index),
+            **{
+                _: int(row[_])
+                for _ in counts.columns
+            }
+        )
+        record.first_time_user_ids = first_time_user_ids.get(week_index)
+        yield record
+
+
+#######
+#
+#   MATCH REPORT
+#
+#######
+
+
+def add_keys(df):
+    # Same as neludim.report.sort2: swap only if both present
+    swap = (df.user_id != 0) & (df.partner_user_id != 0) & (df.user_id > df.partner_user_id)
+    return df.assign(
+        key_a=np.where(swap, df.partner_user_id, df.user_id),
+        key_b=np.where(swap, df.user_id, df.partner_user_id),
+    )
+
+
+def keys_index(df):
+    return pd.MultiIndex.from_arrays([df.key_a, df.key_b])
+
+
+def gen_match_report(week_contacts, prev_contacts, manual_matches):
+    return gen_frame_match_report(
+        contacts_frame(week_contacts),
+        contacts_frame(prev_contacts),
+        manual_matches
+    )
+
+
+def gen_frame_match_report(week_df, prev_df, manual_matches):
+    df = add_keys(week_df)
+    if df.empty:
+        return
+
+    prev_keys = keys_index(add_keys(prev_df))
+    manual_keys = keys_index(add_keys(matches_frame(manual_matches)))
+
+    df['group'] = df.groupby(['key_a', 'key_b'], sort=False).ngroup()
+    df['has_feedback'] = df.feedback_score.notna()
+    df['has_state'] = df.state.notna()
+    df['has_confirm'] = df.state == CONFIRM_STATE
+
+    groups = df.groupby('group').agg(
+        size=('user_id', 'size'),
+        has_feedback=('has_feedback', 'any'),
+        has_state=('has_state', 'any'),
+        has_confirm=('has_confirm', 'any'),
+    )
+    groups['no_partner'] = groups['size'] == 1
+    groups['no_feedback'] = ~groups.has_feedback
+    groups['no_state'] = ~groups.has_state
+    groups['state_order'] = np.where(
+        groups.has_state,
+        np.where(groups.has_confirm, 0, 1),
+        -1
+    )
+    groups = groups.reset_index().sort_values(
+        ['no_partner', 'no_feedback', 'no_state', 'state_order', 'group'],
+        kind='stable'
+    )
+    groups['rank'] = np.arange(len(groups))
+
+    df = df.merge(groups[['group', 'rank', 'no_partner']], on='group', how='left')
+    keys = keys_index(df)
+    df['is_repeat'] = keys.isin(prev_keys)
+    df['is_manual_match'] = keys.isin(manual_keys)
+    df['position'] = np.arange(len(df))
+    df = df.sort_values(['rank', 'position'], kind='stable')
+
+    for row in df.itertuples(index=False):
+        yield MatchReportRecord(
+            user_id=int(row.user_id),
+            no_partner=bool(row.no_partner),
+            state=null_value(row.state),
+            feedback_score=null_value(row.feedback_score),
+            is_repeat=bool(row.is_repeat),
+            is_manual_match=bool(row.is_manual_match)
+        )
@@ -0,0 +1,123 @@
+from time import perf_counter
+from functools import wraps
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from .bot.bot import Bot
+from .schedule import (
+    Schedule,
+    week_index_monday,
+)
+from .metrics import wrap_db_methods
+from .db_memory import (
+    MemoryDB,
+    load_memory_snapshot,
+)
+
+
+# Run trigger task outside of container. Bot only records calls,
+# nothing is sent. Snapshot is loaded to memory and not written back
+
+
+class RecordingBot(Bot):
+    def __init__(self):
+        Bot.__init__(self, '123:recording')
+        self.calls = []
+
+    async def request(self, method, data, files=None):
+        self.calls.append((method, data))
+        return {}
+
+
+def snapshot_db(dir):
+    db = MemoryDB()
+    load_memory_snapshot(db, dir)
+    return db
+
+
+# Tasks read current week from schedule, --week N = Monday 00:00 of
+# week N, same as create_contacts trigger
+
+
+class WeekSchedule(Schedule):
+    def __init__(self, week_index):
+        self.date = week_index_monday(week_index)
+
+    def now(self):
+        return self.date
+
+
+######
+#
+#   DB CALLS
+#
+#####
+
+
+# put_* delete_* set_* reset_* -> no op. Reads after skipped write
+# see old data
+
+
+WRITE_PREFIXES = ('put_', 'delete_', 'set_', 'reset_')
+
+
+async def skip_write(*args, **kwargs):
+    pass
+
+
+def dry_run_db(db):
+    wrap_db_methods(db, lambda name, method: (
+        skip_write if name.startswith(WRITE_PREFIXES)
+        else method
+    ))
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    time: float = 0
+
+
+# DB.put_user calls DB.put_users, count outermost call only
+RECORD_DB_CALL = ContextVar('record_db_call', default=False)
+
+
+def record_db_calls(db):
+    name_stats = {}
+
+    def wrap(name, method):
+        @wraps(method)
+        async def wrapper(*args, **kwargs):
+            if RECORD_DB_CALL.get():
+                return await method(*args, **kwargs)
+
+            token = RECORD_DB_CALL.set(True)
+            start = perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                stats = name_stats.setdefault(name, CallStats())
+                stats.calls += 1
+                stats.time += perf_counter() - start
+                RECORD_DB_CALL.reset(token)
+
+        return wrapper
+
+    wrap_db_methods(db, wrap)
+    return name_stats
+
+
+def bot_call_counts(bot):
+    return Counter(method for method, _ in bot.calls)
+
+
+def format_run_stats(db_stats, bot_counts):
+    yield 'db                      calls  time ms'
+    for name, stats in sorted(db_stats.items()):
+        yield f'{name:<23} {stats.calls:>5} {stats.time * 1000:>8.1f}'
+
+    yield ''
+    yield 'bot                     calls'
+    for method, count in bot_counts.most_common():
+        yield f'{method:<23} {count:>5}'
@@ -0,0 +1,183 @@
+import gzip
+import json
+import asyncio
+from pathlib import Path
+
+from .obj import (
+    Chat,
+    User,
+    Contact,
+    Match,
+    Pair,
+    Participation,
+)
+from .report import WeeksReportRecord
+from .const import (
+    CHATS_TABLE,
+    USERS_TABLE,
+    CONTACTS_TABLE,
+    MANUAL_MATCHES_TABLE,
+    PAIRS_TABLE,
+    WEEKS_REPORT_TABLE,
+    PARTICIPATIONS_TABLE,
+)
+from .aio import gather
+from .dynamo import (
+    dynamo_scan_pages,
+    dynamo_pipeline_put,
+    dynamo_deserialize_item,
+)
+
+
+# Snapshot = dir with <table>.jsonl.gz per table, line = raw item as
+# returned by scan, same as dynamo_serialize_item. Import replays
+# items as is
+
+
+SNAPSHOT_TABLES = {
+    CHATS_TABLE: Chat,
+    USERS_TABLE: User,
+    CONTACTS_TABLE: Contact,
+    MANUAL_MATCHES_TABLE: Match,
+    PAIRS_TABLE: Pair,
+    WEEKS_REPORT_TABLE: WeeksReportRecord,
+    PARTICIPATIONS_TABLE: Participation,
+}
+
+
+def snapshot_path(dir, table):
+    return Path(dir) / f'{table}.jsonl.gz'
+
+
+#######
+#
+#   READ/WRITE
+#
+#####
+
+
+def read_snapshot_items(dir, table):
+    path = snapshot_path(dir, table)
+    if not path.exists():
+        return
+
+    with gzip.open(path, 'rt', encoding='utf8') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def read_snapshot(dir, table):
+    cls = SNAPSHOT_TABLES[table]
+    for item in read_snapshot_items(dir, table):
+        yield dynamo_deserialize_item(item, cls)
+
+
+def write_snapshot_items(dir, table, items):
+    path = snapshot_path(dir, table)
+    tmp_path = path.with_suffix('.tmp')
+
+    count = 0
+    with gzip.open(tmp_path, 'wt', encoding='utf8') as file:
+        for item in items:
+            file.write(json.dumps(item, ensure_ascii=False))
+            file.write('\n')
+            count += 1
+
+    tmp_path.rename(path)
+    return count
+
+
+######
+#
+#   EXPORT
+#
+######
+
+
+# Segments scan in parallel, pages go to bounded queue, single writer
+# drains it. At most ~2 pages per segment in memory
+
+
+async def export_table(client, dir, table, segments=4):
+    queue = asyncio.Queue(maxsize=segments * 2)
+
+    async def scan(segment):
+        pages = dynamo_scan_pages(client, table, segment, segments)
+        try:
+            async for page in pages:
+                await queue.put(page)
+        finally:
+            await pages.aclose()
+
+    # First failed segment cancels the rest, then None tells reader to
+    # stop. Cancelled = reader failed, nobody reads queue
+    async def scan_all():
+        try:
+            await gather(*[
+                scan(_) for _ in range(segments)
+            ])
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    path = snapshot_path(dir, table)
+    tmp_path = path.with_suffix('.tmp')
+
+    count = 0
+    task = asyncio.create_task(scan_all())
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf8') as file:
+            while True:
+                page = await queue.get()
+                if page is None:
+                    break
+                for item in page:
+                    file.write(json.dumps(item, ensure_ascii=False))
+                    file.write('\n')
+                count += len(page)
+
+        await task
+    except BaseException:
+        task.cancel()
+        await asyncio.wait([task])
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    tmp_path.rename(path)
+    return count
+
+
+async def export_snapshot(client, dir, tables=SNAPSHOT_TABLES, segments=4):
+    Path(dir).mkdir(parents=True, exist_ok=True)
+    for table in tables:
+        count = await export_table(client, dir, table, segments)
+        yield table, count
+
+
+######
+#
+#   IMPORT
+#
+#####
+
+
+async def import_table(client, dir, table, concurrency=8):
+    count = 0
+
+    def items():
+        nonlocal count
+        for item in read_snapshot_items(dir, table):
+            count += 1
+            yield item
+
+    await dynamo_pipeline_put(client, table, items(), concurrency)
+    return count
+
+
+async def import_snapshot(client, dir, tables=SNAPSHOT_TABLES, concurrency=8):
+    for table in tables:
+        count = await import_table(client, dir, table, concurrency)
+        yield table, count
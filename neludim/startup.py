@@ -0,0 +1,121 @@
+import os
+import sys
+import subprocess
+from time import perf_counter
+from dataclasses import dataclass
+
+
+# Cold start = everything before first update is served: imports,
+# Context, handlers setup, DB client. Run in fresh interpreter with
+# "-X importtime", stderr has line per import
+# https://docs.python.org/3/using/cmdline.html#cmdoption-X
+
+
+STARTUP_CODE = {
+    'bot-webhook': '''
+import asyncio
+from neludim.context import Context
+from neludim.bot.bot import setup_bot
+from neludim.bot import webhook
+
+context = Context()
+setup_bot(context)
+asyncio.run(context.db.connect())
+''',
+    'trigger-webhook': '''
+import asyncio
+from neludim.context import Context
+from neludim.trigger import build_app
+
+context = Context()
+build_app(context)
+asyncio.run(context.db.connect())
+''',
+}
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+    @property
+    def package(self):
+        return self.module.split('.')[0]
+
+
+def parse_importtime(lines):
+    # import time: self [us] | cumulative | imported package
+    # import time:       120 |        120 |   _io
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+
+        _, values = line.split(':', 1)
+        self_us, cumulative_us, module = values.split('|')
+        if not self_us.strip().isdigit():
+            continue
+
+        yield ImportRecord(
+            module=module.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us)
+        )
+
+
+@dataclass
+class StartupProfile:
+    command: str
+    wall: float
+    records: list
+
+
+def profile_startup(command):
+    # Without keys botocore looks for credentials in metadata service
+    env = dict(os.environ)
+    env.setdefault('AWS_KEY_ID', 'profile')
+    env.setdefault('AWS_KEY', 'profile')
+
+    start = perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE[command]],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    wall = perf_counter() - start
+
+    records = list(parse_importtime(process.stderr.splitlines()))
+    return StartupProfile(command, wall, records)
+
+
+def package_import_times(records):
+    package_us = {}
+    for record in records:
+        package_us[record.package] = package_us.get(record.package, 0) + record.self_us
+    return sorted(package_us.items(), key=lambda _: _[1], reverse=True)
+
+
+def format_startup_profile(profile, top=15):
+    import_us = sum(_.self_us for _ in profile.records)
+    yield f'{profile.command}: wall {profile.wall * 1000:.0f}ms, imports {import_us / 1000:.0f}ms, {len(profile.records)} modules'
+
+    yield ''
+    yield 'package                  self ms'
+    for package, us in package_import_times(profile.records)[:top]:
+        yield f'{package:<24} {us / 1000:>7.1f}'
+
+    yield ''
+    yield 'module                                   cumul ms'
+    records = sorted(profile.records, key=lambda _: _.cumulative_us, reverse=True)
+    for record in records[:top]:
+        yield f'{record.module:<40} {record.cumulative_us / 1000:>8.1f}'
+
+
+def loaded_modules(profile, prefix):
+    return sorted(
+        _.module for _ in profile.records
+        if _.module.startswith(prefix)
+    )
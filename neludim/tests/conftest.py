@@ -4,6 +4,7 @@ import asyncio
 import pytest
 
 from neludim.db import DB
+from neludim.db_sqlite import SqliteDB
 from neludim.tests.fake import (
     FakeContext,
     fake_setup
@@ -27,6 +28,14 @@ async def db():
     await db.close()
 
 
+@pytest.fixture(scope='function')
+async def sqlite_db(tmp_path):
+    db = SqliteDB(tmp_path / 'neludim.db')
+    await db.connect()
+    yield db
+    await db.close()
+
+
 @pytest.fixture(scope='function')
 def context():
     context = FakeContext()
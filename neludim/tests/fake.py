@@ -1,4 +1,5 @@
 
+import random
 from json import (
     loads as parse_json,
     dumps as format_json
@@ -12,11 +13,31 @@ from neludim.bot.bot import (
     setup_bot,
 )
 from neludim.bot.broadcast import Broadcast
+from neludim.bot.webhook import webhook_response
 from neludim.schedule import (
     Schedule,
     START_DATE,
 )
-from neludim.db import DB
+from neludim.db_memory import (
+    MemoryDB,
+    memory_read,
+    memory_load,
+)
+from neludim.obj import Contact
+from neludim.const import (
+    CONFIRM_STATE,
+    FAIL_STATE,
+    GREAT_SCORE,
+    OK_SCORE,
+    BAD_SCORE,
+
+    USERS_TABLE,
+    CONTACTS_TABLE,
+    MANUAL_MATCHES_TABLE,
+    PAIRS_TABLE,
+    WEEKS_REPORT_TABLE,
+    PARTICIPATIONS_TABLE,
+)
 from neludim.context import Context
 
 
@@ -31,93 +52,26 @@ class FakeBot(Bot):
         return {}
 
 
-class FakeDB(DB):
-    def __init__(self):
-        DB.__init__(self)
-        self.chat_states = {}
-        self.users = []
-        self.contacts = []
-        self.manual_matches = []
-
-    async def connect(self):
-        pass
-
-    async def close(self):
-        pass
-
-    async def set_chat_state(self, id, state):
-        self.chat_states[id] = state
-
-    async def reset_chat_state(self, id):
-        await self.set_chat_state(id, state=None)
-
-    async def get_chat_state(self, id):
-        return self.chat_states.get(id)
-
-    async def get_user(self, user_id):
-        for user in self.users:
-            if user.user_id == user_id:
-                return user
-
-    async def read_users(self):
-        return self.users
-
-    async def put_user(self, user):
-        await self.delete_user(user.user_id)
-        self.users.append(user)
+# Tests read and assign whole tables as lists
 
-    async def delete_user(self, user_id):
-        self.users = [
-            _ for _ in self.users
-            if _.user_id != user_id
-        ]
 
-    async def put_users(self, users):
-        for user in users:
-            await self.put_user(user)
+def table_property(table):
+    def get(db):
+        return memory_read(db, table)
 
-    async def delete_users(self, users):
-        for user in users:
-            await self.delete_user(user)
+    def set(db, objs):
+        memory_load(db, table, objs)
 
-    async def get_contact(self, key):
-        for contact in self.contacts:
-            if contact.key == key:
-                return contact
+    return property(get, set)
 
-    async def read_contacts(self):
-        return self.contacts
 
-    async def put_contact(self, contact):
-        await self.delete_contact(contact.key)
-        self.contacts.append(contact)
-
-    async def delete_contact(self, key):
-        self.contacts = [
-            _ for _ in self.contacts
-            if _.key != key
-        ]
-
-    async def put_contacts(self, contacts):
-        for contact in contacts:
-            await self.put_contact(contact)
-
-    async def delete_contacts(self, contacts):
-        for contact in contacts:
-            await self.delete_contact(contact)
-
-    async def read_manual_matches(self):
-        return self.manual_matches
-
-    async def put_manual_match(self, match):
-        await self.delete_manual_match(match.key)
-        self.manual_matches.append(match)
-
-    async def delete_manual_match(self, key):
-        self.manual_matches = [
-            _ for _ in self.manual_matches
-            if _.key != key
-        ]
+class FakeDB(MemoryDB):
+    users = table_property(USERS_TABLE)
+    contacts = table_property(CONTACTS_TABLE)
+    manual_matches = table_property(MANUAL_MATCHES_TABLE)
+    pairs = table_property(PAIRS_TABLE)
+    weeks_report = table_property(WEEKS_REPORT_TABLE)
+    participations = table_property(PARTICIPATIONS_TABLE)
 
 
 class FakeSchedule(Schedule):
@@ -144,10 +98,19 @@ def fake_setup(context):
     Dispatcher.set_current(context.dispatcher)
 
 
+# Same as webhook: response returned by handler goes to trace after
+# all calls made by handler
+
+
 async def process_update(context, json):
     data = parse_json(json)
     update = Update(**data)
-    await context.dispatcher.process_update(update)
+    results = await context.dispatcher.updates_handler.notify(update)
+
+    response = webhook_response(results)
+    if response:
+        json = format_json(response.cleanup(), ensure_ascii=False)
+        context.bot.trace.append([response.method, json])
 
 
 def match_trace(trace, etalon):
@@ -162,3 +125,33 @@ def match_trace(trace, etalon):
             return False
 
     return True
+
+
+# Contacts history for report tests: every week random half of users,
+# random pairs, odd one without partner. Small user pool, pairs repeat
+
+
+def fake_contacts(user_ids, weeks, seed=0):
+    rand = random.Random(seed)
+    for week_index in range(weeks):
+        week_user_ids = [_ for _ in user_ids if rand.random() < 0.5]
+        rand.shuffle(week_user_ids)
+
+        if len(week_user_ids) % 2:
+            yield Contact(week_index, week_user_ids.pop())
+
+        for index in range(0, len(week_user_ids), 2):
+            user_id, partner_user_id = week_user_ids[index:index + 2]
+            state = rand.choice([CONFIRM_STATE, FAIL_STATE, None])
+            for user_id, partner_user_id in [
+                    (user_id, partner_user_id),
+                    (partner_user_id, user_id)
+            ]:
+                feedback_score = None
+                if state == CONFIRM_STATE:
+                    feedback_score = rand.choice([GREAT_SCORE, OK_SCORE, BAD_SCORE, None])
+                yield Contact(
+                    week_index, user_id, partner_user_id,
+                    state=state,
+                    feedback_score=feedback_score
+                )
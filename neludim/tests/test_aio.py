@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from neludim.aio import gather
+
+
+async def test_gather():
+    async def value(x, delay):
+        await asyncio.sleep(delay)
+        return x
+
+    assert await gather(value(1, 0.01), value(2, 0)) == [1, 2]
+
+
+async def test_gather_cancel():
+    trace = []
+
+    async def fail():
+        raise ValueError
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            trace.append('cancelled')
+            raise
+
+    with pytest.raises(ValueError):
+        await gather(slow(), fail())
+    assert trace == ['cancelled']
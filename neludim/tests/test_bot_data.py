@@ -0,0 +1,47 @@
+import pytest
+
+from neludim.const import (
+    CANCEL_EDIT_DATA,
+    CANCEL_FEEDBACK_DATA,
+    NAME_FIELD,
+    CONFIRM_STATE,
+)
+from neludim.bot.data import (
+    EditProfileData,
+    ParticipateData,
+    FeedbackData,
+    ManualMatchData,
+    serialize_data,
+    deserialize_data,
+)
+from neludim.bot.handlers import QueryRouter
+
+
+@pytest.mark.parametrize('obj', [
+    EditProfileData(),
+    EditProfileData(NAME_FIELD),
+    ParticipateData(3, agreed=1),
+    FeedbackData(3, 113947584),
+    FeedbackData(3, 113947584, CONFIRM_STATE, 'great'),
+    ManualMatchData('confirm', 113947584, 5326213467),
+])
+def test_data_roundtrip(obj):
+    assert deserialize_data(serialize_data(obj), type(obj)) == obj
+
+
+def test_query_router():
+    router = QueryRouter()
+    router.add_data(serialize_data(EditProfileData()), 'edit_profile')
+    router.add_data(serialize_data(EditProfileData(NAME_FIELD)), 'edit_name')
+    router.add_data(CANCEL_EDIT_DATA, 'cancel_edit')
+    router.add_prefix(FeedbackData.prefix, 'feedback')
+    router.add_data(CANCEL_FEEDBACK_DATA, 'cancel_feedback')
+
+    assert router.match('edit_profile:') == 'edit_profile'
+    assert router.match('edit_profile:name') == 'edit_name'
+    assert router.match('edit_profile:other') is None
+    assert router.match(CANCEL_EDIT_DATA) == 'cancel_edit'
+    assert router.match(CANCEL_FEEDBACK_DATA) == 'cancel_feedback'
+    assert router.match(serialize_data(FeedbackData(3, 113947584))) == 'feedback'
+    assert router.match('feedbackx:1') is None
+    assert router.match('participate:3:1') is None
@@ -1,8 +1,13 @@
 
+import pytest
+
+from aiogram.utils import exceptions
+
 from neludim.obj import (
     User,
     Contact,
-    Match
+    Match,
+    Pair
 )
 
 from neludim.tests.fake import (
@@ -112,8 +117,8 @@ async def test_cancel_edit(context):
     await process_update(context, query_json('cancel_edit'))
 
     assert match_trace(context.bot.trace, [
+        ['deleteMessage', '{"chat_id": 1, "message_id": 1}'],
         ['answerCallbackQuery', '{"callback_query_id": "1"}'],
-        ['deleteMessage', '{"chat_id": 1, "message_id": 1}']
     ])
 
 
@@ -129,9 +134,9 @@ async def test_participate(context):
     await process_update(context, query_json('participate:1:1'))
 
     assert match_trace(context.bot.trace, [
-        ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['sendSticker', '{"chat_id": 1'],
         ['sendMessage', 'Пометил, что участвуешь'],
+        ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['sendMessage', 'Пожалуйста, заполни'],
     ])
 
@@ -191,16 +196,32 @@ async def test_feedback(context):
         User(user_id=2, partner_user_id=1),
     ]
     context.db.contacts = [Contact(week_index=0, user_id=1, partner_user_id=2)]
+    context.db.pairs = [Pair(1, 2, week_index=0, prev_week_index=-5, prev_state='fail')]
     await process_update(context, query_json('feedback:0:2:confirm:great'))
     await process_update(context, message_json('Все круто'))
 
     assert match_trace(context.bot.trace, [
         ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['sendMessage', 'Дай, пожалуйста, фидбек'],
-        ['sendMessage', 'Спасибо'],
-        ['sendMessage', 'Все круто']
+        ['sendMessage', 'Все круто'],
+        ['sendMessage', 'Спасибо']
     ])
     assert context.db.contacts[0].feedback_text == 'Все круто'
+    assert context.db.pairs == [
+        Pair(
+            1, 2, week_index=0, state='confirm', feedback_score='great',
+            prev_week_index=-5, prev_state='fail'
+        )
+    ]
+
+
+async def test_feedback_no_pair(context):
+    # Pairs table not backfilled, row is left to rebuild-pairs
+    context.db.contacts = [Contact(week_index=0, user_id=1, partner_user_id=2)]
+    await process_update(context, query_json('feedback:0:2:confirm:great'))
+
+    assert context.db.contacts[0].state == 'confirm'
+    assert context.db.pairs == []
 
 
 async def test_bad_feedback(context):
@@ -225,6 +246,56 @@ async def test_fail_feedback(context):
     ])
 
 
+async def test_changed_feedback(context):
+    context.db.users = [
+        User(user_id=1, partner_user_id=2),
+        User(user_id=2, partner_user_id=1),
+    ]
+    context.db.contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1, state='confirm', feedback_score='bad'),
+    ]
+    context.db.pairs = [Pair(1, 2, week_index=0)]
+    await process_update(context, query_json('feedback:0:2:confirm:great'))
+    await process_update(context, query_json('feedback:0:2:fail:'))
+
+    assert context.db.pairs == [
+        Pair(1, 2, week_index=0, state='confirm', feedback_score='bad')
+    ]
+
+    context.db.contacts = [Contact(week_index=0, user_id=1, partner_user_id=2)]
+    await process_update(context, query_json('feedback:0:2:confirm:great'))
+    await process_update(context, query_json('feedback:0:2:fail:'))
+    assert context.db.pairs == [
+        Pair(1, 2, week_index=0, state='fail', feedback_score='great')
+    ]
+
+
+async def test_feedback_error_ack(context):
+    # No contact, handler raises, query is still acked
+    with pytest.raises(AttributeError):
+        await process_update(context, query_json('feedback:0:2:confirm:great'))
+
+    assert match_trace(context.bot.trace, [
+        ['answerCallbackQuery', '{"callback_query_id": "1"}'],
+    ])
+
+
+async def test_ack_error(context):
+    # Query too old to ack, update is still handled, no error to
+    # Telegram, no redelivery
+    async def answer_callback_query(*args, **kwargs):
+        raise exceptions.InvalidQueryID('Query is too old')
+
+    context.bot.answer_callback_query = answer_callback_query
+    context.db.users = [User(user_id=1)]
+    await process_update(context, query_json('participate:1:0'))
+
+    assert match_trace(context.bot.trace, [
+        ['sendMessage', 'Пометил, что не участвуешь'],
+    ])
+
+
 async def test_cancel_feedback(context):
     await process_update(context, query_json('cancel_feedback'))
 
@@ -248,11 +319,11 @@ async def test_manual_match(context):
     await process_update(context, query_json('manual_match:confirm:1:2'))
     assert match_trace(context.bot.trace, [
         ['answerCallbackQuery', '{"callback_query_id": "1"}'],
-        ['editMessageText', '{"text": "user: 1'],
+        ['editMessageText', '"text": "user: 1'],
         ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['editMessageText', 'partner user: 2'],
-        ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['sendMessage', '1 -> 2'],
+        ['answerCallbackQuery', '{"callback_query_id": "1"}'],
         ['editMessageText', 'user: ∅'],
     ])
     assert context.db.manual_matches == [Match(user_id=1, partner_user_id=2)]
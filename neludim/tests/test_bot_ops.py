@@ -4,8 +4,10 @@ from neludim.tests.fake import match_trace
 from neludim.obj import (
     User,
     Contact,
+    Pair,
 )
 from neludim.schedule import week_index_monday
+from neludim.const import CITY_STRATEGY
 
 from neludim.bot.ops import (
     ask_participate,
@@ -40,6 +42,45 @@ async def test_create_contacts(context):
         Contact(week_index=0, user_id=3, partner_user_id=2),
         Contact(week_index=0, user_id=1, partner_user_id=None),
     ]
+    assert context.db.pairs == [
+        Pair(user_id=2, partner_user_id=3, week_index=0)
+    ]
+
+
+async def test_create_contacts_city(context):
+    agreed_participate = week_index_monday(context.schedule.current_week_index() - 1)
+    context.db.users = [
+        User(user_id=1, city='Москва', agreed_participate=agreed_participate),
+        User(user_id=2, city='Москва', agreed_participate=agreed_participate),
+        User(user_id=3, city='Москва', agreed_participate=agreed_participate),
+        User(user_id=4, agreed_participate=agreed_participate),
+    ]
+
+    # Flat matcher gives 1-3, 2-4 on same users
+    await create_contacts(context, strategy=CITY_STRATEGY)
+    assert [_.key for _ in context.db.pairs] == [(2, 3), (1, 4)]
+
+
+async def test_create_contacts_empty_pairs(context):
+    agreed_participate = week_index_monday(context.schedule.current_week_index() - 1)
+    context.db.users = [
+        User(user_id=1, agreed_participate=agreed_participate),
+        User(user_id=2, agreed_participate=agreed_participate),
+    ]
+    context.db.contacts = [
+        Contact(week_index=-1, user_id=1, partner_user_id=2),
+        Contact(week_index=-1, user_id=2, partner_user_id=1),
+    ]
+    await create_contacts(context)
+    assert context.db.contacts[-2:] == [
+        Contact(week_index=0, user_id=1, partner_user_id=None),
+        Contact(week_index=0, user_id=2, partner_user_id=None),
+    ]
+
+    # Backfill is stored, next run reads pairs table
+    assert context.db.pairs == [
+        Pair(user_id=1, partner_user_id=2, week_index=-1)
+    ]
 
 
 async def test_send_contacts(context):
@@ -94,3 +135,92 @@ async def test_manual_match(context):
 
 async def test_send_reports(context):
     await send_reports(context)
+
+
+async def test_send_reports_first_run(context):
+    context.db.users = [
+        User(user_id=1),
+        User(user_id=2),
+    ]
+    context.db.contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+    ]
+    await send_reports(context)
+    assert [_.first_time_user_ids for _ in context.db.weeks_report] == [[1, 2]]
+    assert [_.weeks for _ in context.db.participations] == ['1', '1']
+    assert match_trace(context.bot.trace, [
+        ['sendMessage', ' T FT NP'],
+        ['sendMessage', '   W   N'],
+        ['sendMessage', '∅'],
+        ['sendMessage', '╭'],
+    ])
+
+
+async def test_send_reports_open_weeks(context):
+    context.db.users = [
+        User(user_id=1),
+        User(user_id=2),
+    ]
+    context.db.contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+    ]
+    await send_reports(context)
+
+    # Tables are filled, next run reads open weeks only
+    async def read_contacts():
+        raise AssertionError
+
+    context.db.read_contacts = read_contacts
+    context.db.contacts += [
+        Contact(week_index=5, user_id=1, partner_user_id=2),
+        Contact(week_index=5, user_id=2, partner_user_id=1),
+    ]
+    context.db.pairs = [Pair(1, 2, week_index=5, prev_week_index=0)]
+    context.schedule.date = week_index_monday(5)
+    context.bot.trace.clear()
+    await send_reports(context)
+
+    assert [_.week_index for _ in context.db.weeks_report] == [0, 5]
+    assert [_.weeks for _ in context.db.participations] == ['21', '21']
+    assert match_trace(context.bot.trace, [
+        ['sendMessage', ' T FT NP'],
+        ['sendMessage', '   W   N'],
+        ['sendMessage', '∅'],
+        ['sendMessage', '↻╭'],
+    ])
+
+
+async def test_send_reports_missing_pairs(context):
+    # No pair row, repeat is found in contacts history
+    context.db.users = [
+        User(user_id=1),
+        User(user_id=2),
+    ]
+    context.db.contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+        Contact(week_index=5, user_id=1, partner_user_id=2),
+        Contact(week_index=5, user_id=2, partner_user_id=1),
+    ]
+    context.schedule.date = week_index_monday(5)
+    await send_reports(context)
+
+    assert match_trace(context.bot.trace, [
+        ['sendMessage', ' T FT NP'],
+        ['sendMessage', '   W   N'],
+        ['sendMessage', '∅'],
+        ['sendMessage', '↻╭'],
+    ])
+
+
+async def test_send_long_reports(context):
+    context.db.users = [User(user_id=_) for _ in range(1, 1001)]
+    context.db.contacts = [
+        Contact(week_index=0, user_id=_, partner_user_id=None)
+        for _ in range(1, 1001)
+    ]
+    await send_reports(context)
+    methods = [method for method, _ in context.bot.trace]
+    assert methods[-3:] == ['sendMessage', 'sendMessage', 'sendDocument']
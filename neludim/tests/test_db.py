@@ -2,8 +2,11 @@
 from neludim.obj import (
     User,
     Contact,
-    Match
+    Match,
+    Pair,
+    Participation,
 )
+from neludim.report import WeeksReportRecord
 
 
 async def test_chats(db):
@@ -40,6 +43,21 @@ async def test_contacts(db):
     assert await db.get_contact(contact.key) is None
 
 
+async def test_weeks_contacts(db):
+    contacts = [
+        Contact(week_index=10, user_id=1, partner_user_id=2),
+        Contact(week_index=11, user_id=1, partner_user_id=3),
+        Contact(week_index=12, user_id=1, partner_user_id=4),
+    ]
+
+    await db.put_contacts(contacts)
+    weeks_contacts = await db.read_weeks_contacts([10, 12])
+    assert sorted(weeks_contacts, key=lambda _: _.week_index) == [contacts[0], contacts[2]]
+    assert await db.read_week_contacts(11) == [contacts[1]]
+
+    await db.delete_contacts([_.key for _ in contacts])
+
+
 async def test_manual_matches(db):
     match = Match(
         user_id=1,
@@ -49,3 +67,36 @@ async def test_manual_matches(db):
     await db.put_manual_match(match)
     assert match in await db.read_manual_matches()
     await db.delete_manual_match(match.key)
+
+
+async def test_pairs(db):
+    pair = Pair(
+        user_id=1,
+        partner_user_id=2,
+        week_index=0
+    )
+
+    await db.put_pair(pair)
+    assert pair == await db.get_pair(pair.key)
+    assert pair in await db.read_pairs()
+
+    await db.delete_pair(pair.key)
+    assert await db.get_pair(pair.key) is None
+
+
+async def test_weeks_report(db):
+    record = WeeksReportRecord(
+        week_index=0,
+        total=2,
+        first_time_user_ids=[1, 2]
+    )
+
+    await db.put_weeks_report([record])
+    assert record in await db.read_weeks_report()
+
+
+async def test_participations(db):
+    participation = Participation(user_id=1, weeks='f' * 40)
+
+    await db.put_participations([participation])
+    assert participation in await db.read_participations()
@@ -0,0 +1,57 @@
+from neludim.obj import (
+    User,
+    Contact,
+)
+from neludim.db_memory import MemoryDB
+from neludim.tests import test_db
+
+
+async def test_cases():
+    db = MemoryDB()
+    for name in dir(test_db):
+        if name.startswith('test_'):
+            await getattr(test_db, name)(db)
+
+
+async def test_week_contacts():
+    db = MemoryDB()
+    contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=1, user_id=1, partner_user_id=3),
+        Contact(week_index=1, user_id=3, partner_user_id=1),
+    ]
+    await db.put_contacts(contacts)
+    assert await db.read_week_contacts(1) == contacts[1:]
+
+    await db.delete_contact(contacts[1].key)
+    assert await db.read_week_contacts(1) == contacts[2:]
+
+
+async def test_snapshot(tmp_path):
+    db = MemoryDB(tmp_path)
+    await db.connect()
+    await db.put_users([User(user_id=1), User(user_id=2)])
+    await db.put_contact(Contact(week_index=0, user_id=1, partner_user_id=2))
+    await db.close()
+
+    other = MemoryDB(tmp_path)
+    await other.connect()
+    assert await other.read_users() == [User(user_id=1), User(user_id=2)]
+    assert await other.read_week_contacts(0) == await db.read_contacts()
+
+
+async def test_copies():
+    db = MemoryDB()
+    contact = Contact(week_index=0, user_id=1, partner_user_id=2)
+    await db.put_contact(contact)
+    contact.state = 'confirm'
+
+    contact = await db.get_contact(contact.key)
+    assert contact.state is None
+    contact.state = 'confirm'
+
+    for contact in await db.read_week_contacts(0) + await db.read_contacts():
+        assert contact.state is None
+        contact.state = 'confirm'
+
+    assert (await db.get_contact(contact.key)).state is None
@@ -0,0 +1,26 @@
+from neludim.obj import Contact
+from neludim.tests import test_db
+
+
+# Same cases as test_db.py, no live YDB required
+
+
+async def test_cases(sqlite_db):
+    for name in dir(test_db):
+        if name.startswith('test_'):
+            await getattr(test_db, name)(sqlite_db)
+
+
+async def test_week_contacts(sqlite_db):
+    contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=1, user_id=1, partner_user_id=3),
+        Contact(week_index=1, user_id=3, partner_user_id=1),
+    ]
+    await sqlite_db.put_contacts(contacts)
+    assert await sqlite_db.read_week_contacts(1) == contacts[1:]
+
+    await sqlite_db.put_contact(Contact(week_index=1, user_id=1, partner_user_id=3, state='confirm'))
+    contact = await sqlite_db.get_contact((1, 1, 3))
+    assert contact.state == 'confirm'
+    assert len(await sqlite_db.read_week_contacts(1)) == 2
@@ -0,0 +1,74 @@
+from neludim.obj import (
+    User,
+    Contact,
+)
+from neludim.db import DB
+from neludim.dynamo import (
+    dynamo_client,
+    dynamo_deserialize_value,
+)
+from neludim.metrics import DYNAMO_SECONDS
+from neludim.dynamo_local import (
+    LocalDynamo,
+    build_app,
+)
+from neludim.tests import test_db
+
+
+async def local_db(aiohttp_server, dynamo):
+    server = await aiohttp_server(build_app(dynamo))
+    db = DB()
+    db.exit_stack, db.client = await dynamo_client(
+        endpoint=str(server.make_url('/')),
+        key_id='local',
+        key='local'
+    )
+    return db
+
+
+async def test_cases(aiohttp_server):
+    db = await local_db(aiohttp_server, LocalDynamo(page_size=2))
+    for name in dir(test_db):
+        if name.startswith('test_'):
+            await getattr(test_db, name)(db)
+    await db.close()
+
+
+def test_deserialize_number_set():
+    assert dynamo_deserialize_value(['3', '1', '2'], [int]) == [1, 2, 3]
+
+
+async def test_throttle(aiohttp_server):
+    dynamo = LocalDynamo(throttle=0.1, page_size=7)
+    db = await local_db(aiohttp_server, dynamo)
+
+    users = [User(user_id=_) for _ in range(100)]
+    await db.put_users(users)
+    assert sorted(await db.read_users(), key=lambda _: _.user_id) == users
+
+    await db.delete_users(range(50))
+    assert len(await db.read_users()) == 50
+    await db.close()
+
+
+async def test_metrics(aiohttp_server):
+    db = await local_db(aiohttp_server, LocalDynamo())
+    count = DYNAMO_SECONDS.count(op='GetItem')
+    await db.get_user(1)
+    assert DYNAMO_SECONDS.count(op='GetItem') == count + 1
+    await db.close()
+
+
+async def test_weeks_contacts_scan(aiohttp_server):
+    db = await local_db(aiohttp_server, LocalDynamo())
+    await db.put_contacts([
+        Contact(week_index=_, user_id=1, partner_user_id=2)
+        for _ in range(5)
+    ])
+
+    # Several weeks = one scan, not scan per week
+    count = DYNAMO_SECONDS.count(op='Scan')
+    contacts = await db.read_weeks_contacts([1, 2, 3, 4])
+    assert DYNAMO_SECONDS.count(op='Scan') == count + 1
+    assert len(contacts) == 4
+    await db.close()
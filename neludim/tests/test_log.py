@@ -0,0 +1,56 @@
+import io
+import queue
+import logging
+
+from neludim.log import (
+    BatchStreamHandler,
+    SampleFilter,
+    log,
+    json_msg,
+    stream_handler,
+    start_log_listener,
+)
+
+
+class CountStream(io.StringIO):
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return io.StringIO.write(self, text)
+
+
+def record(msg):
+    return logging.LogRecord('x', logging.INFO, '', 0, msg, (), None)
+
+
+def test_batch_stream_handler():
+    log_queue = queue.SimpleQueue()
+    stream = CountStream()
+    handler = BatchStreamHandler(log_queue, stream)
+
+    log_queue.put(record('b'))
+    handler.handle(record(json_msg(a='б')))
+    assert stream.writes == 0
+
+    handler.handle(log_queue.get())
+    assert stream.writes == 1
+    assert stream.getvalue() == '{"a": "б"}\nb\n'
+
+
+def test_sample_filter():
+    assert SampleFilter(1).filter(record('a'))
+    assert not SampleFilter(0).filter(record('a'))
+
+
+def test_log_listener(capsys):
+    # No thread on import, entry point starts it
+    assert log.handlers == [stream_handler]
+
+    stop_log_listener = start_log_listener()
+    assert log.handlers != [stream_handler]
+    log.info(json_msg(a=1))
+    stop_log_listener()
+
+    assert '{"a": 1}' in capsys.readouterr().err
+    assert log.handlers == [stream_handler]
@@ -1,10 +1,27 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
 
 from neludim.obj import (
     User,
     Match,
-    Contact
+    Contact,
+    Pair
 )
-from neludim.match import gen_matches
+from neludim.const import (
+    CONFIRM_STATE,
+    FAIL_STATE,
+    GREAT_SCORE,
+    OK_SCORE,
+    BAD_SCORE,
+)
+from neludim.match import (
+    SampleMatch,
+    gen_matches,
+    gen_city_matches,
+    match_input,
+    gen_matches_sample,
+)
+from neludim.pair import gen_pairs
 
 
 def test_even():
@@ -54,3 +71,243 @@ def test_skip():
         Match(user_id=2, partner_user_id=3),
         Match(user_id=1, partner_user_id=None),
     ]
+
+
+def test_skip_pairs():
+    users = [User(user_id=_) for _ in range(5)]
+    pairs = [
+        Pair(0, 1, week_index=1),
+        Pair(0, 2, week_index=1),
+        Pair(1, 2, week_index=1),
+        Pair(1, 4, week_index=1)
+    ]
+    matches = list(gen_matches(users, pairs=pairs, current_week_index=2))
+    assert matches == [
+        Match(user_id=0, partner_user_id=4),
+        Match(user_id=2, partner_user_id=3),
+        Match(user_id=1, partner_user_id=None),
+    ]
+
+
+def test_gen_pairs():
+    contacts = [
+        Contact(1, 1, 2, state=CONFIRM_STATE, feedback_score=GREAT_SCORE),
+        Contact(1, 2, 1, state=FAIL_STATE),
+        Contact(3, 2, 1, state=FAIL_STATE, feedback_score=BAD_SCORE),
+        Contact(3, 3, None),
+    ]
+    pairs = gen_pairs(contacts[:2])
+    assert pairs == [
+        Pair(1, 2, week_index=1, state=CONFIRM_STATE, feedback_score=GREAT_SCORE)
+    ]
+
+    pairs = gen_pairs(contacts[2:], pairs)
+    assert pairs == [
+        Pair(
+            1, 2, week_index=3, state=FAIL_STATE, feedback_score=BAD_SCORE,
+            prev_week_index=1, prev_state=CONFIRM_STATE, prev_feedback_score=GREAT_SCORE
+        )
+    ]
+    assert gen_pairs(contacts) == pairs
+
+    # Old week contacts do not override
+    assert gen_pairs(contacts[:2], pairs) == pairs
+
+
+def test_gen_pairs_changed_feedback():
+    pairs = [Pair(1, 2, week_index=1, state=CONFIRM_STATE, feedback_score=BAD_SCORE)]
+    contacts = [
+        Contact(1, 1, 2, state=CONFIRM_STATE, feedback_score=GREAT_SCORE),
+        Contact(1, 2, 1),
+    ]
+    assert gen_pairs(contacts, pairs) == [
+        Pair(1, 2, week_index=1, state=CONFIRM_STATE, feedback_score=GREAT_SCORE)
+    ]
+
+
+def test_pairs_history():
+    # Confirm at week 1, no confirm at week 3. Whole history counts:
+    # met, no repeat after 4 weeks
+    users = [User(user_id=1), User(user_id=2)]
+    pairs = gen_pairs([
+        Contact(1, 1, 2, state=CONFIRM_STATE, feedback_score=OK_SCORE),
+        Contact(1, 2, 1, state=CONFIRM_STATE),
+    ])
+    pairs = gen_pairs([Contact(3, 1, 2), Contact(3, 2, 1)], pairs)
+    assert pairs == [
+        Pair(
+            1, 2, week_index=3,
+            prev_week_index=1, prev_state=CONFIRM_STATE, prev_feedback_score=OK_SCORE
+        )
+    ]
+
+    matches = list(gen_matches(users, pairs=pairs, current_week_index=8))
+    assert matches == [
+        Match(user_id=1, partner_user_id=None),
+        Match(user_id=2, partner_user_id=None),
+    ]
+
+
+def test_city():
+    users = [
+        User(user_id=0, city='Москва'),
+        User(user_id=1, city='Казань'),
+        User(user_id=2, city='москва'),
+        User(user_id=3, city='Казань'),
+        User(user_id=4, city='Москва'),
+        User(user_id=5),
+    ]
+    pairs = [Pair(1, 3, week_index=1)]
+    matches = list(gen_city_matches(users, pairs=pairs, current_week_index=2))
+    assert matches == [
+        Match(user_id=0, partner_user_id=4),
+        Match(user_id=1, partner_user_id=2),
+        Match(user_id=3, partner_user_id=5),
+    ]
+
+
+def test_city_executor_map():
+    users = [
+        User(user_id=_, city=['Москва', 'Казань', 'Пермь', None][_ % 4])
+        for _ in range(40)
+    ]
+    matches = list(gen_city_matches(users))
+    with ThreadPoolExecutor(4) as executor:
+        for _ in range(5):
+            assert list(gen_city_matches(users, city_map=executor.map)) == matches
+
+
+#######
+#
+#   INPUT
+#
+#####
+
+
+def test_match_input_repeats():
+    users = [User(user_id=30), User(user_id=10), User(user_id=20)]
+    stats = (
+        {(10, 30): 1, (20, 30): 0, (10, 40): 0},
+        {(10, 30): None, (20, 30): None, (10, 40): None},
+        {(10, 30): None, (20, 30): None, (10, 40): None},
+        set()
+    )
+    input = match_input(users, stats, current_week_index=3)
+
+    # Indexes in user_id order, 10 -> 0, 20 -> 1, 30 -> 2. Pair (i, j)
+    # -> i * 3 + j. 10-30 blocked, 20-30 no confirm 3 weeks ago, not
+    # blocked yet, 10-40 not in input
+    assert list(input.user_ids) == [10, 20, 30]
+    assert input.repeats == {2: False, 5: False}
+
+    input = match_input(users, stats, current_week_index=5)
+    assert input.repeats == {2: False, 5: True}
+
+    for seed in range(10):
+        # New pair beats allowed repeat
+        sample = list(gen_matches_sample(input, random.Random(seed)))
+        assert sample == [SampleMatch(10, 20, is_new=True)]
+
+
+def test_match_input_manual():
+    users = [User(user_id=_) for _ in range(1, 5)]
+    stats = ({}, {}, {}, {(1, 4)})
+    input = match_input(users, stats, current_week_index=0)
+    assert input.manual_keys == {0 * 4 + 3}
+
+    for seed in range(10):
+        sample = list(gen_matches_sample(input, random.Random(seed)))
+        assert sample[0] == SampleMatch(1, 4, is_new=True)
+
+
+# Matcher before dense int input: tuple score per pair, same random
+# sequence
+
+
+def tuple_matches_sample(users, stats, current_week_index, rng):
+    key_week_indexes, key_states, key_feedback_scores, manual_match_keys = stats
+
+    def score_match(user, partner_user):
+        key = user.user_id, partner_user.user_id
+
+        do_repeat = False
+        week_index = key_week_indexes.get(key)
+        if week_index is not None:
+            if (
+                    key_feedback_scores[key] == GREAT_SCORE
+                    and current_week_index - week_index > 8
+            ):
+                do_repeat = True
+
+            if (
+                    key_states[key] != CONFIRM_STATE
+                    and current_week_index - week_index > 4
+            ):
+                do_repeat = True
+
+            if not do_repeat:
+                return
+
+        has_about = user.links is not None or user.about is not None
+        partner_has_about = partner_user.links is not None or partner_user.about is not None
+
+        same_city = False
+        if user.city and partner_user.city:
+            same_city = user.city == partner_user.city
+
+        return (
+            not do_repeat,
+            key in manual_match_keys,
+            same_city,
+            has_about == partner_has_about,
+            rng.random()
+        )
+
+    score_keys = []
+    for user in users:
+        for partner_user in users:
+            if user.user_id >= partner_user.user_id:
+                continue
+
+            score = score_match(user, partner_user)
+            if score:
+                score_keys.append((score, (user.user_id, partner_user.user_id)))
+
+    matched_user_ids = set()
+    for score, (user_id, partner_user_id) in sorted(score_keys, reverse=True):
+        if user_id in matched_user_ids or partner_user_id in matched_user_ids:
+            continue
+
+        matched_user_ids.update([user_id, partner_user_id])
+        yield SampleMatch(user_id, partner_user_id, is_new=score[0])
+
+
+def test_tuple_score_parity():
+    rand = random.Random(1)
+    users = [
+        User(
+            user_id=user_id,
+            city=rand.choice(['Москва', 'Казань', None]),
+            about=rand.choice(['about', None]),
+        )
+        for user_id in rand.sample(range(1000), 40)
+    ]
+    user_ids = sorted(_.user_id for _ in users)
+    keys = {
+        tuple(sorted(rand.sample(user_ids, 2)))
+        for _ in range(200)
+    }
+    stats = (
+        {_: rand.randrange(10) for _ in keys},
+        {_: rand.choice([CONFIRM_STATE, FAIL_STATE, None]) for _ in keys},
+        {_: rand.choice([GREAT_SCORE, OK_SCORE, BAD_SCORE, None]) for _ in keys},
+        set(rand.sample(sorted(keys), 10))
+    )
+
+    users = sorted(users, key=lambda _: _.user_id)
+    input = match_input(users, stats, current_week_index=12)
+    for seed in range(5):
+        assert (
+            list(gen_matches_sample(input, random.Random(seed)))
+            == list(tuple_matches_sample(users, stats, 12, random.Random(seed)))
+        )
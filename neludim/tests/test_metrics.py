@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from neludim.metrics import (
+    UPDATE_STATS,
+    UPDATE_DB_CALLS,
+    UpdateStats,
+    Registry,
+    format_registry,
+)
+
+from neludim.bot.middlewares import InstrumentMiddleware
+from neludim.tests.fake import process_update
+
+
+def test_registry():
+    registry = Registry()
+    counter = registry.counter('c')
+    histogram = registry.histogram('h', [1, 2])
+
+    counter.inc(error='A')
+    counter.inc(2, error='A')
+    histogram.observe(1)
+    histogram.observe(3)
+    assert list(format_registry(registry)) == [
+        '# TYPE c counter',
+        'c{error="A"} 3',
+        '# TYPE h histogram',
+        'h_bucket{le="1"} 1',
+        'h_bucket{le="2"} 1',
+        'h_bucket{le="+Inf"} 2',
+        'h_sum 4',
+        'h_count 2',
+    ]
+
+
+async def test_update_stats(context):
+    count = UPDATE_DB_CALLS.count()
+    update = {'update_id': 1, 'message': {
+        'message_id': 1, 'date': 1659800990, 'text': '/start',
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'A'},
+        'chat': {'id': 1, 'type': 'private'},
+    }}
+    await process_update(context, json.dumps(update))
+    assert UPDATE_DB_CALLS.count() == count + 1
+
+    # get_user, put_user. put_user -> put_users counted once
+    stats = UpdateStats()
+    token = UPDATE_STATS.set(stats)
+    await context.db.put_user(await context.db.get_user(1))
+    UPDATE_STATS.reset(token)
+    assert stats.db_calls == 2
+
+
+async def test_update_stats_error(context):
+    # Handler raises, post process still observes update
+    count = UPDATE_DB_CALLS.count()
+    update = {'update_id': 1, 'callback_query': {
+        'id': '1', 'chat_instance': '1', 'data': 'feedback:0:2:confirm:great',
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'A'},
+        'message': {'message_id': 1, 'date': 1664010458, 'chat': {'id': 1, 'type': 'private'}},
+    }}
+    with pytest.raises(AttributeError):
+        await process_update(context, json.dumps(update))
+    assert UPDATE_DB_CALLS.count() == count + 1
+
+    # Pre process did not run
+    await InstrumentMiddleware().on_post_process_update(None, [], {})
@@ -0,0 +1,18 @@
+from neludim.profiling import (
+    profile_op,
+    format_op_profile,
+)
+
+
+async def build_list(context):
+    context.items = [str(_) for _ in range(10000)]
+
+
+async def test_profile_op(context):
+    profile = await profile_op(build_list, context, top=5)
+    assert profile.name == 'build_list'
+    assert profile.functions[0].function.endswith('(build_list)')
+    assert profile.allocs[0].size_kb > 100
+
+    lines = list(format_op_profile(profile))
+    assert lines[0].startswith('build_list: wall')
@@ -0,0 +1,67 @@
+from neludim.obj import (
+    User,
+    Contact,
+    Match,
+    Pair
+)
+from neludim.match import gen_matches
+from neludim.quality import (
+    MatchQuality,
+    eval_matches,
+    replay_weeks,
+)
+
+
+def test_eval_matches():
+    users = [
+        User(user_id=1, city='Москва', about='a'),
+        User(user_id=2, city='москва', links='b'),
+        User(user_id=3, about='c'),
+        User(user_id=4),
+        User(user_id=5),
+    ]
+    matches = [
+        Match(1, 2),
+        Match(4, 3),
+        Match(5, None),
+    ]
+    pairs = [Pair(3, 4, week_index=0)]
+    manual_matches = [Match(2, 1), Match(1, 5), Match(1, 6)]
+
+    quality = eval_matches(matches, users, pairs, manual_matches)
+    assert quality == MatchQuality(
+        users=5,
+        matched=4,
+        unmatched=1,
+        repeats=1,
+        same_city=1,
+        about_match=1,
+        manual=2,
+        manual_satisfied=1,
+    )
+    assert quality.same_city_rate == 0.5
+
+
+def test_replay_weeks():
+    users = [User(user_id=_) for _ in range(1, 5)]
+    contacts = [
+        Contact(0, 1, 2),
+        Contact(0, 2, 1),
+        Contact(0, 3, None),
+        Contact(1, 1, 2),
+        Contact(1, 2, 1),
+        Contact(1, 3, 4),
+        Contact(1, 4, 3),
+    ]
+    rows = list(replay_weeks(
+        users, contacts, manual_matches=(),
+        strategies={'flat': gen_matches},
+        week_indexes=[1]
+    ))
+    assert [
+        (week_index, name, quality.repeats)
+        for week_index, name, quality in rows
+    ] == [
+        (1, 'actual', 1),
+        (1, 'flat', 0),
+    ]
@@ -1,20 +1,30 @@
 
+import pytest
+
 from neludim.obj import (
     User,
-    Contact
+    Contact,
+    Match
 )
 from neludim.report import (
     gen_match_report,
     format_match_report,
     gen_weeks_report,
+    update_weeks_report,
     format_weeks_report,
-    report_text
+    update_participations,
+    gen_cohort_report,
+    format_cohort_report,
+    report_text,
+    report_pages,
+    records_csv,
 )
 from neludim.const import (
     FAIL_STATE,
     CONFIRM_STATE,
     BAD_SCORE,
 )
+from neludim.tests.fake import fake_contacts
 
 
 def test_match_report():
@@ -53,3 +63,100 @@ def test_weeks_report():
  2  2  0   0  0  2   0  0  0
  1  0  1   0  0  0   0  0  0
 '''.strip('\n')
+    assert contacts[0].state == FAIL_STATE
+
+
+def test_update_weeks_report():
+    contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+        Contact(week_index=1, user_id=1, partner_user_id=3),
+        Contact(week_index=1, user_id=3, partner_user_id=1),
+        Contact(week_index=2, user_id=2, partner_user_id=None),
+    ]
+    records = list(gen_weeks_report(contacts))
+    assert records[1].first_time_user_ids == [3]
+
+    contacts[2].state = CONFIRM_STATE
+    contacts.append(Contact(week_index=2, user_id=4, partner_user_id=None))
+    stale, _ = update_weeks_report(records, contacts, start_week_index=2)
+    fresh, updates = update_weeks_report(records, contacts, start_week_index=1)
+    assert stale[1].confirm_state == 0
+    assert [_.week_index for _ in updates] == [1, 2]
+    assert fresh == list(gen_weeks_report(contacts))
+
+
+def test_cohort_report():
+    contacts = [
+        Contact(week_index=0, user_id=1, partner_user_id=2),
+        Contact(week_index=0, user_id=2, partner_user_id=1),
+        Contact(week_index=1, user_id=1, partner_user_id=3),
+        Contact(week_index=1, user_id=3, partner_user_id=1),
+        Contact(week_index=2, user_id=2, partner_user_id=3),
+        Contact(week_index=2, user_id=3, partner_user_id=2),
+    ]
+    participations, _ = update_participations([], contacts)
+    assert {_.user_id: _.weeks for _ in participations} == {1: '3', 2: '5', 3: '6'}
+
+    contacts.append(Contact(week_index=3, user_id=1, partner_user_id=None))
+    participations, updates = update_participations(participations, contacts, start_week_index=2)
+    assert [(_.user_id, _.weeks) for _ in updates] == [(1, 'b')]
+
+    records = list(gen_cohort_report(participations, current_week_index=3))
+    assert [(_.week_index, _.size, _.retained) for _ in records] == [
+        (0, 2, [2, 1, 1, 1]),
+        (1, 1, [1, 1, 0]),
+    ]
+    assert report_text(format_cohort_report(records, max_offset=3)) == '''
+   W   N  +1  +2  +3
+   0   2  50  50  50
+   1   1 100   0
+'''.strip('\n')
+
+
+def test_pandas_parity():
+    pytest.importorskip('pandas')
+    from neludim import report_pandas
+
+    contacts = list(fake_contacts(range(1, 21), weeks=10))
+    contacts.extend([
+        Contact(week_index=9, user_id=1000, partner_user_id=1001, state=FAIL_STATE),
+        Contact(week_index=9, user_id=1001, partner_user_id=1000, state=CONFIRM_STATE),
+    ])
+    manual_matches = [Match(1, 2), Match(3, 4)]
+
+    assert (
+        list(report_pandas.gen_weeks_report(contacts, seen_user_ids=[1]))
+        == list(gen_weeks_report(contacts, seen_user_ids=[1]))
+    )
+
+    for week_index in range(10):
+        week_contacts = [_ for _ in contacts if _.week_index == week_index]
+        prev_contacts = [_ for _ in contacts if _.week_index < week_index]
+        assert (
+            list(report_pandas.gen_match_report(week_contacts, prev_contacts, manual_matches))
+            == list(gen_match_report(week_contacts, prev_contacts, manual_matches))
+        )
+
+
+def test_report_pages():
+    lines = ['a' * 5, 'b' * 5, 'c' * 5]
+    assert list(report_pages(lines, max_size=11)) == ['aaaaa\nbbbbb', 'ccccc']
+    assert list(report_pages(lines, html=True, max_size=5)) == [
+        '<pre>aaaaa</pre>',
+        '<pre>bbbbb</pre>',
+        '<pre>ccccc</pre>',
+    ]
+    assert list(report_pages([])) == ['∅']
+
+    lines = ['<a href="tg://user?id=1">aaaaa</a>', 'b' * 5]
+    assert list(report_pages(lines, max_size=11)) == ['…\nbbbbb']
+
+
+def test_records_csv():
+    contacts = [Contact(week_index=0, user_id=1, partner_user_id=None)]
+    records = gen_weeks_report(contacts)
+    assert records_csv(records, exclude=['first_time_user_ids']).splitlines() == [
+        'week_index,total,first_time,no_partner,confirm_state,fail_state,none_state,great_feedback,ok_feedback,bad_feedback,none_feedback',
+        '0,1,1,1,0,0,0,0,0,0,0',
+    ]
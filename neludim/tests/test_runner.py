@@ -0,0 +1,32 @@
+from neludim.obj import User
+from neludim.db_memory import MemoryDB
+from neludim.runner import (
+    WeekSchedule,
+    dry_run_db,
+    record_db_calls,
+)
+
+
+def test_week_schedule():
+    assert WeekSchedule(10).current_week_index() == 10
+
+
+async def test_dry_run_db():
+    db = MemoryDB()
+    await db.put_users([User(user_id=1)])
+
+    dry_run_db(db)
+    await db.put_user(User(user_id=2))
+    await db.delete_user(1)
+    assert await db.read_users() == [User(user_id=1)]
+
+
+async def test_record_db_calls():
+    db = MemoryDB()
+    stats = record_db_calls(db)
+    await db.put_user(User(user_id=1))
+    await db.get_user(1)
+    await db.get_user(1)
+
+    # put_user -> put_users counted once
+    assert {_: stats[_].calls for _ in stats} == {'put_user': 1, 'get_user': 2}
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from neludim.obj import User
+from neludim.const import USERS_TABLE
+from neludim.dynamo import dynamo_serialize_item
+from neludim.snapshot import (
+    export_table,
+    export_snapshot,
+    import_snapshot,
+    read_snapshot,
+)
+
+
+class FakePager:
+    def __init__(self, client):
+        self.client = client
+
+    async def paginate(self, TableName, Segment=0, TotalSegments=1):
+        items = self.client.tables.get(TableName, [])
+        items = items[Segment::TotalSegments]
+        for index in range(0, len(items), 2):
+            yield {'Items': items[index:index + 2]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.tables = {}
+
+    def get_paginator(self, name):
+        return FakePager(self)
+
+    async def batch_write_item(self, RequestItems):
+        for table, requests in RequestItems.items():
+            self.tables.setdefault(table, []).extend(
+                _['PutRequest']['Item'] for _ in requests
+            )
+        return {}
+
+
+async def test_snapshot(tmp_path):
+    users = [User(user_id=_, name=f'user{_}') for _ in range(60)]
+
+    client = FakeClient()
+    client.tables[USERS_TABLE] = [dynamo_serialize_item(_) for _ in users]
+    rows = export_snapshot(client, tmp_path, tables=[USERS_TABLE], segments=3)
+    assert [_ async for _ in rows] == [(USERS_TABLE, 60)]
+
+    snapshot_users = list(read_snapshot(tmp_path, USERS_TABLE))
+    assert sorted(snapshot_users, key=lambda _: _.user_id) == users
+
+    client = FakeClient()
+    rows = import_snapshot(client, tmp_path, tables=[USERS_TABLE], concurrency=2)
+    assert [_ async for _ in rows] == [(USERS_TABLE, 60)]
+    assert len(client.tables[USERS_TABLE]) == 60
+
+
+class FailPager:
+    async def paginate(self, TableName, Segment=0, TotalSegments=1):
+        if Segment == 0:
+            yield {'Items': []}
+            raise ValueError
+
+        # Other segments never end, fill queue and block on put
+        while True:
+            await asyncio.sleep(0)
+            yield {'Items': []}
+
+
+class FailClient:
+    def get_paginator(self, name):
+        return FailPager()
+
+
+async def test_export_segment_error(tmp_path):
+    with pytest.raises(ValueError):
+        await export_table(FailClient(), tmp_path, USERS_TABLE, segments=3)
+
+    assert asyncio.all_tasks() == {asyncio.current_task()}
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,16 @@
+from neludim.startup import (
+    parse_importtime,
+    package_import_times,
+)
+
+
+def test_parse_importtime():
+    lines = [
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |   _io',
+        'import time:      1500 |       2000 |     botocore.compat',
+        'import time:       500 |       2500 |   botocore',
+    ]
+    records = list(parse_importtime(lines))
+    assert [_.module for _ in records] == ['_io', 'botocore.compat', 'botocore']
+    assert package_import_times(records) == [('botocore', 2000), ('_io', 120)]
@@ -1,5 +1,9 @@
 
-from neludim.trigger import build_app
+from neludim.trigger import (
+    build_app,
+    broadcast_errors,
+)
+from neludim.bot.broadcast import BroadcastResult
 
 
 PAYLOAD = {
@@ -20,3 +24,43 @@ async def test_trigger(aiohttp_client, context):
     app = build_app(context)
     client = await aiohttp_client(app)
     await client.post('/', json=PAYLOAD)
+
+
+SUNDAY_PAYLOAD = {
+    'messages': [{
+        'event_metadata': {
+            'created_at': '2022-08-28T09:31:10.869181208Z',  # sunday
+        }
+    }],
+}
+
+
+async def test_trigger_profile(aiohttp_client, context, caplog):
+    app = build_app(context, profile_tasks=True)
+    client = await aiohttp_client(app)
+    await client.post('/', json=SUNDAY_PAYLOAD)
+    assert 'peak_kb' in caplog.text
+
+
+async def test_trigger_profile_body(aiohttp_client, context, caplog):
+    # Request body can not turn profiler on
+    app = build_app(context, profile_tasks=False)
+    client = await aiohttp_client(app)
+    await client.post('/', json=dict(SUNDAY_PAYLOAD, profile=True))
+    assert 'peak_kb' not in caplog.text
+
+
+async def test_metrics(aiohttp_client, context):
+    app = build_app(context)
+    client = await aiohttp_client(app)
+    response = await client.get('/metrics')
+    assert '# TYPE neludim_loop_lag_seconds gauge' in await response.text()
+
+
+def test_broadcast_errors():
+    results = [
+        BroadcastResult(1, error='BotBlocked'),
+        BroadcastResult(2, message_id=1),
+        BroadcastResult(3, error='BotBlocked'),
+    ]
+    assert broadcast_errors(results) == {'BotBlocked': 2}
@@ -0,0 +1,41 @@
+from neludim.bot.webhook import build_app
+
+
+START_UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1, 'date': 1659800990, 'text': '/start',
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'A'},
+        'chat': {'id': 1, 'type': 'private'},
+    }
+}
+
+
+async def test_webhook(aiohttp_client, context):
+    client = await aiohttp_client(build_app(context, metrics_token='secret'))
+
+    response = await client.post('/', json=START_UPDATE)
+    data = await response.json()
+    assert data['method'] == 'sendMessage'
+    assert 'random coffee' in data['text']
+
+    headers = {'Authorization': 'Bearer secret'}
+    response = await client.get('/', headers=headers)
+    data = await response.json()
+    assert data['updates'] >= 1
+
+    response = await client.get('/metrics', headers=headers)
+    assert 'neludim_update_seconds' in await response.text()
+
+    for path in ['/', '/metrics']:
+        response = await client.get(path)
+        assert response.status == 404
+
+        response = await client.get(path, headers={'Authorization': 'Bearer other'})
+        assert response.status == 404
+
+
+async def test_webhook_no_metrics_token(aiohttp_client, context):
+    client = await aiohttp_client(build_app(context, metrics_token=None))
+    response = await client.get('/metrics', headers={'Authorization': 'Bearer None'})
+    assert response.status == 404
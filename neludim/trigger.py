@@ -1,4 +1,5 @@
 
+from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime as Datetime
 from functools import partial
@@ -8,6 +9,7 @@ from aiohttp import web
 from .log import (
     log,
     json_msg,
+    start_log_listener,
 )
 from .const import (
     MONDAY,
@@ -15,6 +17,12 @@ from .const import (
     SUNDAY,
 
     WEEKDAYS,
+
+    PROFILE_TASKS,
+)
+from .metrics import (
+    handle_metrics,
+    loop_lag_ctx,
 )
 from .bot import ops
 
@@ -80,21 +88,45 @@ def parse_trigger(data):
         return Datetime.fromisoformat(datetime)
 
 
+# One line per task, not per failed recipient. Weekly broadcast to
+# all users gets hundreds of BotBlocked
+
+
+def broadcast_errors(results):
+    return dict(Counter(
+        _.error for _ in results
+        if _.error
+    ))
+
+
 async def handle_trigger(context, request):
     data = await request.json()
     datetime = parse_trigger(data)
 
+    # Env only, not request body, anyone who reaches trigger URL would
+    # turn on profiler cost
+    profile = request.app[PROFILE_TASKS_KEY]
+
     tasks = select_tasks(TASKS, datetime)
     for task in tasks:
         log.info(json_msg(task=task.name))
-        await task.op(context)
-
-        total = len(context.broadcast.results)
-        if total:
-            log.info(json_msg(task=task.name, total=total))
-            for result in context.broadcast.results:
-                if result.error:
-                    log.info(json_msg(chat_id=result.chat_id, error=result.error))
+        if profile:
+            from .profiling import (
+                profile_op,
+                log_op_profile,
+            )
+
+            log_op_profile(await profile_op(task.op, context))
+        else:
+            await task.op(context)
+
+        results = context.broadcast.results
+        if results:
+            log.info(json_msg(
+                task=task.name,
+                total=len(results),
+                errors=broadcast_errors(results)
+            ))
         context.broadcast.reset()
 
     return web.Response()
@@ -108,12 +140,18 @@ async def on_shutdown(context, _):
     await context.db.close()
 
 
-def build_app(context):
+PROFILE_TASKS_KEY = 'profile_tasks'
+
+
+def build_app(context, profile_tasks=PROFILE_TASKS):
     app = web.Application()
+    app[PROFILE_TASKS_KEY] = profile_tasks
 
     app.add_routes([
-        web.post('/', partial(handle_trigger, context))
+        web.post('/', partial(handle_trigger, context)),
+        web.get('/metrics', handle_metrics),
     ])
+    app.cleanup_ctx.append(loop_lag_ctx)
 
     app.on_startup.append(partial(on_startup, context))
     app.on_shutdown.append(partial(on_shutdown, context))
@@ -122,7 +160,11 @@ def build_app(context):
 
 
 def start_webhook(context):
-    web.run_app(
-        build_app(context),
-        print=None
-    )
+    stop_log_listener = start_log_listener()
+    try:
+        web.run_app(
+            build_app(context),
+            print=None
+        )
+    finally:
+        stop_log_listener()